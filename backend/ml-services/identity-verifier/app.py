@@ -1,9 +1,12 @@
 import os
+import io
 import logging
 import time
+import threading
 from datetime import datetime
 from functools import wraps
-from flask import Flask, request, jsonify
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from flask import Flask, Request, request, jsonify
 from werkzeug.utils import secure_filename
 from pathlib import Path
 
@@ -28,25 +31,56 @@ except ImportError:
 
 # --- Phase 2: Pipeline Imports ---
 try:
-    from pipeline.orchestrator import orchestrate_verification
-    from pipeline.stage1 import run_stage1
+    from pipeline.stage1 import run_stage1, run_context_checks
     from pipeline.stage2 import run_stage2
     from models.policy_engine import get_policy_engine
-    from ingest.capture import IngestCapture
+    from ingest.capture import IngestCapture, probe_video
+    from pipeline.timeouts import RequestBudget, VerificationTimeout
+    from pipeline.audit_id import generate_audit_id
     from ops.logging_config import setup_logging
+    from ops.job_queue import JobQueue, JobWorkerPool, QueueFull, webhook_allowed, DEFAULT_DB_PATH, DEFAULT_LEASE_SEC
+    from ops.result_cache import get_result_cache, cache_key
     PHASE2_ENABLED = True
 except ImportError as e:
     logging.warning(f"Phase 2 pipeline modules not fully available: {e}")
     PHASE2_ENABLED = False
 
+# --- Upload Ingestion Helpers ---
+try:
+    from ingest.stream_utils import VideoSource, spool_stream, sha256_stream, sha256_file
+except ImportError:
+    VideoSource = None
+    spool_stream = None
+
+
+class InMemoryUploadRequest(Request):
+    """
+    Keeps uploaded files in memory instead of werkzeug's on-disk temporary
+    file for uploads over 500 KB. Bounded by MAX_CONTENT_LENGTH.
+    """
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return io.BytesIO()
+
+
 # --- App Setup ---
 app = Flask(__name__)
+app.request_class = InMemoryUploadRequest
 
 # --- Configuration ---
 UPLOAD_FOLDER = 'temp_uploads'
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024 
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# Uploads for asynchronous jobs must outlive the request (and a restart)
+JOB_UPLOAD_FOLDER = os.environ.get('JOB_UPLOAD_DIR', 'temp_storage/job_uploads')
+
+# Per-modality deadlines for the legacy /verify endpoint (seconds, from the
+# start of the analyses); a late modality is reported instead of awaited
+MODALITY_TIMEOUTS = {
+    'face': float(os.environ.get('VERIFY_FACE_TIMEOUT_SEC', 30)),
+    'voice': float(os.environ.get('VERIFY_VOICE_TIMEOUT_SEC', 20)),
+    'document': float(os.environ.get('VERIFY_DOCUMENT_TIMEOUT_SEC', 20)),
+}
 
 # API Key for authentication
 API_KEY = os.environ.get('ML_IDENTITY_API_KEY') or os.environ.get('X_API_KEY', 'dev-api-key-identity-verifier')
@@ -77,7 +111,19 @@ def require_api_key(f):
         return f(*args, **kwargs)
     return decorated_function
 
-# --- Helper Function ---
+# --- Helper Functions ---
+def save_upload(file_storage, prefix):
+    """
+    Writes an upload to a file for the path-based processors.
+    Uses the tmpfs spool dir when available, else UPLOAD_FOLDER.
+    """
+    suffix = os.path.splitext(secure_filename(file_storage.filename or ''))[1]
+    if spool_stream is not None:
+        return spool_stream(file_storage.stream, suffix=suffix)
+    path = os.path.join(app.config['UPLOAD_FOLDER'], secure_filename(f"{prefix}_{os.urandom(8).hex()}{suffix}"))
+    file_storage.save(path)
+    return path
+
 def cleanup_files(paths):
     """
     Deletes temporary files after processing.
@@ -90,6 +136,55 @@ def cleanup_files(paths):
             except Exception as e:
                 logging.error(f"Error cleaning up file {path}: {e}")
 
+_modality_executor = None
+_modality_executor_lock = threading.Lock()
+
+
+def get_modality_executor():
+    """
+    Thread pool shared by all /verify requests (created lazily, so forked
+    workers each get their own). Sized by VERIFY_MODALITY_WORKERS (default 6).
+    """
+    global _modality_executor
+    if _modality_executor is None:
+        with _modality_executor_lock:
+            if _modality_executor is None:
+                _modality_executor = ThreadPoolExecutor(
+                    max_workers=int(os.environ.get('VERIFY_MODALITY_WORKERS', 6)),
+                    thread_name_prefix='verify-modality'
+                )
+    return _modality_executor
+
+def run_modalities(analyses):
+    """
+    Runs independent modality analyses concurrently.
+    
+    Args:
+        analyses (dict): modality name -> (analyze function, file path).
+    
+    Returns:
+        dict: modality name -> result. A modality that raised or missed its
+              deadline (MODALITY_TIMEOUTS) gets a status 'error' / 'timeout'
+              result, so the others are still returned.
+    """
+    start = time.time()
+    executor = get_modality_executor()
+    futures = {name: executor.submit(func, path) for name, (func, path) in analyses.items()}
+    results = {}
+    for name, future in futures.items():
+        limit = MODALITY_TIMEOUTS[name]
+        try:
+            results[name] = future.result(timeout=max(0.0, start + limit - time.time()))
+        except FuturesTimeout:
+            # Threads cannot be killed: a late analysis finishes in the background, unused
+            future.cancel()
+            logger.warning(f"{name} analysis missed its {limit:.0f}s deadline")
+            results[name] = {'status': 'timeout', 'message': f'{name} analysis timed out after {limit:.0f}s'}
+        except Exception as e:
+            logger.error(f"{name} analysis failed: {e}", exc_info=True)
+            results[name] = {'status': 'error', 'message': f'{name} analysis failed: {e}'}
+    return results
+
 # --- API Endpoints ---
 
 @app.route('/health', methods=['GET'])
@@ -138,30 +233,22 @@ def verify_identity():
         audio_file = request.files['audio']
         doc_file = request.files['document']
 
-        # Save files temporarily
-        video_filename = secure_filename(f"video_{os.urandom(8).hex()}")
-        audio_filename = secure_filename(f"audio_{os.urandom(8).hex()}")
-        doc_filename = secure_filename(f"doc_{os.urandom(8).hex()}")
-
-        video_path = os.path.join(app.config['UPLOAD_FOLDER'], video_filename)
-        audio_path = os.path.join(app.config['UPLOAD_FOLDER'], audio_filename)
-        doc_path = os.path.join(app.config['UPLOAD_FOLDER'], doc_filename)
-
-        video_file.save(video_path)
-        audio_file.save(audio_path)
-        doc_file.save(doc_path)
+        # The processors read from paths: spool the uploads (tmpfs when available)
+        video_path = save_upload(video_file, 'video')
+        audio_path = save_upload(audio_file, 'audio')
+        doc_path = save_upload(doc_file, 'doc')
         
-        logger.info(f"Files saved temporarily to: {video_path}, {audio_path}, {doc_path}")
+        logger.info(f"Files spooled temporarily to: {video_path}, {audio_path}, {doc_path}")
 
-        # Perform analysis
-        logger.info("Starting face analysis...")
-        face_result = analyze_face(video_path)
-        
-        logger.info("Starting voice analysis...")
-        voice_result = analyze_voice(audio_path)
-        
-        logger.info("Starting document analysis...")
-        doc_result = analyze_document(doc_path)
+        # The three analyses read different files and share no state: run them concurrently
+        logger.info("Starting face, voice and document analysis...")
+        results = run_modalities({
+            'face': (analyze_face, video_path),
+            'voice': (analyze_voice, audio_path),
+            'document': (analyze_document, doc_path),
+        })
+        face_result, voice_result, doc_result = results['face'], results['voice'], results['document']
+        incomplete = [name for name, result in results.items() if result.get('status') in ('error', 'timeout')]
 
         # Calculate confidence and verification status
         is_verified = (
@@ -188,6 +275,7 @@ def verify_identity():
             'result': {
                 'identity_verified': is_verified,
                 'confidence': round(confidence, 3),
+                'incomplete_modalities': incomplete,
                 'details': {
                     'face_analysis': face_result,
                     'voice_analysis': voice_result,
@@ -254,8 +342,7 @@ def verify_identity_phase2():
     
     logger.info("Received Phase 2 identity verification request.")
     
-    video_path = None
-    temp_file = False
+    source = None
     start_time = time.time()
     
     try:
@@ -265,6 +352,7 @@ def verify_identity_phase2():
             video_path = data.get('video_path')
             if not video_path or not os.path.exists(video_path):
                 return jsonify({'error': 'Invalid or missing video_path in JSON body'}), 400
+            media_sha256 = sha256_file(video_path) if get_result_cache() else None
             user_id = data.get('user_id', 'anonymous')
             action = data.get('action', 'login')
             model_name = data.get('model_name', 'xception')
@@ -273,37 +361,118 @@ def verify_identity_phase2():
             if 'video' not in request.files:
                 return jsonify({'error': 'Missing "video" file in multipart request'}), 400
             
+            # Spooled to tmpfs (memory-backed, no disk I/O) rather than decoded from
+            # a pipe: a path can be probed, so stage 1 rejects blurry videos and
+            # replays before the full decode
             video_file = request.files['video']
-            video_filename = secure_filename(f"video_{os.urandom(8).hex()}.mp4")
-            video_path = os.path.join(app.config['UPLOAD_FOLDER'], video_filename)
-            video_file.save(video_path)
-            temp_file = True
+            media_sha256 = sha256_stream(video_file.stream) if get_result_cache() else None
+            suffix = os.path.splitext(secure_filename(video_file.filename or ''))[1] or '.mp4'
+            source = VideoSource.from_stream(video_file.stream, suffix=suffix, allow_pipe=False)
+            video_path = source.path
             
             user_id = request.form.get('user_id', 'anonymous')
             action = request.form.get('action', 'login')
             model_name = request.form.get('model_name', 'xception')
         
-        logger.info(f"Processing video: {video_path} for user: {user_id}, action: {action}")
+        context = {'user_id': user_id, 'action': action, 'model_name': model_name,
+                   'ip': request.remote_addr}
+        response, status = run_identity_verification(
+            video_path=video_path,
+            video_stream=source.stream if source is not None else None,
+            context=context,
+            start_time=start_time,
+            media_sha256=media_sha256
+        )
+        return jsonify(response), status
         
-        # Create capture object
-        capture = IngestCapture(video_path=video_path)
+    except Exception as e:
+        logger.error(f"Error during Phase 2 verification: {e}", exc_info=True)
+        return jsonify({
+            'error': 'Internal server error during verification',
+            'details': str(e),
+            'processing_ms': (time.time() - start_time) * 1000
+        }), 500
+        
+    finally:
+        if source is not None:
+            source.cleanup()
+
+
+def run_identity_verification(video_path=None, video_stream=None, context=None, start_time=None,
+                              media_sha256=None):
+    """
+    Runs the Phase 2 pipeline (stage 1, decode, stage 2, policy) on one video.
+    Shared by the synchronous endpoint and the job workers.
+    
+    Args:
+        video_path (str): Video file, or None when decoding from `video_stream`.
+        video_stream: Pipe-decodable stream (no random access, so no probe; only
+                      the context checks run before it is decoded).
+        context (dict): user_id, action, model_name, ip, and optionally audit_id.
+        start_time (float): When the request started (the time budget counts from it).
+        media_sha256 (str): Content hash of the video. When given, a result cached for
+                            the same media and context is returned without rerunning
+                            the pipeline, flagged as a replay. Only results with every
+                            stage 2 signal present are cached.
+    
+    Returns:
+        tuple: (response dict, HTTP status)
+    """
+    start_time = start_time or time.time()
+    context = dict(context or {})
+    # Assigned up front so stage 1 (replay index) and stage 2 record the same id
+    context.setdefault('audit_id', generate_audit_id())
+    
+    result_cache = get_result_cache() if media_sha256 else None
+    if result_cache is not None:
+        key = cache_key(media_sha256, context)
+        hit = result_cache.get(key)
+        if hit is not None:
+            return replayed_response(hit, context, start_time), 200
+    
+    # Request-wide time budget shared by ingest and every stage
+    budget = RequestBudget(start_time=start_time)
+    context['budget'] = budget
+    capture = None
+    
+    try:
+        logger.info(f"Processing video: {video_path or 'upload stream'} for user: "
+                    f"{context.get('user_id')}, action: {context.get('action')}")
         
         # Stage 1: Lightweight checks
         logger.info("Running stage 1 checks...")
-        stage1_result = run_stage1(capture)
+        if video_path:
+            # Probe (metadata + middle frame only), so rejected submissions
+            # never pay for a full decode
+            stage1_result = run_stage1(probe_video(video_path, fingerprint=True), context)
+        else:
+            # A piped stream has no random access for a probe: run the checks
+            # that need no media first, then decode (frames and audio track in
+            # one pass) and check the rest
+            stage1_result = run_context_checks(context)
+            if stage1_result.get('passed', False):
+                capture = IngestCapture(video_stream=video_stream, decode_audio=True,
+                                        cancel_token=budget.token)
+                stage1_result = run_stage1(capture, context)
         
-        if not stage1_result.get('pass', False):
-            logger.warning(f"Stage 1 failed: {stage1_result.get('reason')}")
-            return jsonify({
+        if not stage1_result.get('passed', False):
+            reasons = stage1_result.get('reasons') or ['Stage 1 checks failed']
+            logger.warning(f"Stage 1 failed: {reasons[0]}")
+            return {
                 'overall_pass': False,
-                'reason': stage1_result.get('reason', 'Stage 1 checks failed'),
-                'audit_id': stage1_result.get('audit_id'),
+                'reason': reasons[0],
+                'audit_id': context.get('audit_id') or stage1_result.get('audit_id'),
                 'processing_ms': (time.time() - start_time) * 1000
-            }), 200
+            }, 200
+        
+        # Full decode (frames and audio track in one pass) only after stage 1 passed
+        if capture is None:
+            capture = IngestCapture(video_path=video_path, decode_audio=True,
+                                    cancel_token=budget.token)
+        budget.check("Stage 2")
         
         # Stage 2: ML/DL checks with deepfake detection
         logger.info("Running stage 2 checks (deepfake + fusion)...")
-        context = {'user_id': user_id, 'action': action, 'model_name': model_name}
         stage2_result = run_stage2(capture, stage1_result, video_path, context)
         
         # Policy Engine
@@ -314,7 +483,8 @@ def verify_identity_phase2():
             'video_fake_prob': stage2_result.get('video_fake_prob', 0.0),
             'liveness_ok': stage2_result.get('signals', {}).get('liveness_ok', True),
             'blur_score': stage2_result.get('signals', {}).get('blur_score', 100.0),
-            'rppg_ok': stage2_result.get('signals', {}).get('rppg_ok', True)
+            'rppg_ok': stage2_result.get('signals', {}).get('rppg_ok', True),
+            'missing_signals': stage2_result.get('missing_signals', [])
         }
         
         policy_result = policy.apply_policy(
@@ -340,23 +510,199 @@ def verify_identity_phase2():
         }
         
         logger.info(f"Verification complete: {response['policy_decision']} (score={response['final_score']:.3f})")
-        return jsonify(response), 200
+        # A verdict reached without some signals (timeout, failure) is not
+        # cached: the client's retry deserves a full run, not the same result
+        if result_cache is not None and not stage2_result.get('missing_signals'):
+            result_cache.put(key, response, audit_id=response['audit_id'])
+        return response, 200
         
-    except Exception as e:
-        logger.error(f"Error during Phase 2 verification: {e}", exc_info=True)
-        return jsonify({
-            'error': 'Internal server error during verification',
+    except VerificationTimeout as e:
+        logger.warning(f"Phase 2 verification timed out: {e}")
+        return {
+            'error': 'Verification timed out, please try again',
             'details': str(e),
             'processing_ms': (time.time() - start_time) * 1000
-        }), 500
+        }, 503
         
     finally:
-        if temp_file and video_path:
+        if capture is not None:
+            capture.close()
+
+
+def replayed_response(hit, context, start_time):
+    """
+    Response for media already verified with the same context: the cached
+    result under a new audit_id, with a 'replay' indicator.
+    """
+    response = hit['response']
+    response.update({
+        'audit_id': context.get('audit_id') or generate_audit_id(),
+        'processing_ms': (time.time() - start_time) * 1000,
+        'replay': {
+            'detected': True,
+            'original_audit_id': hit['audit_id'],
+            'first_seen': datetime.utcfromtimestamp(hit['created_at']).isoformat() + 'Z',
+            'repeat_count': hit['hits']
+        }
+    })
+    logger.warning(f"[{response['audit_id']}] Replay of {hit['audit_id']} "
+                   f"(repeat #{hit['hits']}); returning the cached result")
+    return response
+
+
+# --- Asynchronous Verification Jobs ---
+_job_pool = None
+_job_pool_lock = threading.Lock()
+
+
+def get_job_pool():
+    """
+    Get the process-wide job worker pool (started on first use; gunicorn
+    workers start it right after the fork, see gunicorn.conf.py).
+    
+    Configured by JOB_DB_PATH, JOB_MAX_PENDING (default 100 queued jobs),
+    JOB_WORKERS (concurrent jobs per serving process, default 1) and
+    JOB_LEASE_SEC (seconds without a heartbeat before a running job is
+    requeued, default 60).
+    """
+    global _job_pool
+    if _job_pool is None:
+        with _job_pool_lock:
+            if _job_pool is None:
+                queue = JobQueue(
+                    db_path=os.environ.get('JOB_DB_PATH', DEFAULT_DB_PATH),
+                    max_pending=int(os.environ.get('JOB_MAX_PENDING', 100)),
+                    lease_sec=float(os.environ.get('JOB_LEASE_SEC', DEFAULT_LEASE_SEC))
+                )
+                _job_pool = JobWorkerPool(queue, run_verification_job,
+                                          workers=int(os.environ.get('JOB_WORKERS', 1)))
+    _job_pool.start()
+    return _job_pool
+
+
+def run_verification_job(payload, audit_id):
+    """Job handler: runs the pipeline on a queued job and deletes its upload."""
+    context = {k: payload.get(k) for k in ('user_id', 'action', 'model_name', 'ip')}
+    context['audit_id'] = audit_id
+    try:
+        media_sha256 = sha256_file(payload['video_path']) if get_result_cache() else None
+        return run_identity_verification(video_path=payload['video_path'], context=context,
+                                         media_sha256=media_sha256)
+    finally:
+        if payload.get('uploaded'):
+            cleanup_files([payload['video_path']])
+
+
+@app.route('/verify/identity/jobs', methods=['POST'])
+@require_api_key
+def submit_identity_job():
+    """
+    Queues a Phase 2 verification and returns its audit_id at once.
+    
+    Accepts the same input as /verify/identity, plus an optional
+    'webhook_url' (host must be listed in JOB_WEBHOOK_HOSTS) that is
+    POSTed the finished job.
+    
+    Returns:
+        202 with {audit_id, status, status_url}; 429 when the queue is full.
+    """
+    if not PHASE2_ENABLED:
+        return jsonify({'error': 'Phase 2 pipeline not available'}), 501
+    
+    video_path = None
+    uploaded = False
+    try:
+        if request.is_json:
+            data = request.get_json()
+            video_path = data.get('video_path')
+            if not video_path or not os.path.exists(video_path):
+                return jsonify({'error': 'Invalid or missing video_path in JSON body'}), 400
+        else:
+            data = request.form
+            if 'video' not in request.files:
+                return jsonify({'error': 'Missing "video" file in multipart request'}), 400
+        
+        webhook_url = data.get('webhook_url')
+        if webhook_url and not webhook_allowed(webhook_url):
+            return jsonify({'error': 'webhook_url host is not allowed'}), 400
+        
+        audit_id = generate_audit_id()
+        if video_path is None:
+            video_file = request.files['video']
+            suffix = os.path.splitext(secure_filename(video_file.filename or ''))[1] or '.mp4'
+            os.makedirs(JOB_UPLOAD_FOLDER, exist_ok=True)
+            video_path = os.path.join(JOB_UPLOAD_FOLDER, f"{audit_id}{suffix}")
+            video_file.save(video_path)
+            uploaded = True
+        
+        payload = {
+            'video_path': video_path,
+            'uploaded': uploaded,
+            'user_id': data.get('user_id', 'anonymous'),
+            'action': data.get('action', 'login'),
+            'model_name': data.get('model_name', 'xception'),
+            'ip': request.remote_addr
+        }
+        pool = get_job_pool()
+        pool.queue.submit(audit_id, payload, webhook_url=webhook_url)
+        pool.notify()
+        logger.info(f"[{audit_id}] Verification job queued")
+        
+        return jsonify({
+            'audit_id': audit_id,
+            'status': 'QUEUED',
+            'status_url': f"/verify/identity/jobs/{audit_id}"
+        }), 202
+        
+    except QueueFull as e:
+        if uploaded:
+            cleanup_files([video_path])
+        logger.warning(f"Verification job rejected: {e}")
+        return jsonify({'error': 'Too many pending verification jobs, please retry later'}), 429
+        
+    except Exception as e:
+        if uploaded:
             cleanup_files([video_path])
+        logger.error(f"Error queueing verification job: {e}", exc_info=True)
+        return jsonify({'error': 'Internal server error while queueing verification', 'details': str(e)}), 500
+
+
+@app.route('/verify/identity/jobs/<audit_id>', methods=['GET'])
+@require_api_key
+def get_identity_job(audit_id):
+    """
+    Status of a queued verification job.
+    
+    Returns:
+        {audit_id, status (QUEUED/RUNNING/DONE/FAILED), result, http_status, error};
+        result is the /verify/identity response once DONE.
+    """
+    if not PHASE2_ENABLED:
+        return jsonify({'error': 'Phase 2 pipeline not available'}), 501
+    
+    job = get_job_pool().queue.get(audit_id)
+    if job is None:
+        return jsonify({'error': f'Unknown job {audit_id}'}), 404
+    return jsonify({
+        'audit_id': job['audit_id'],
+        'status': job['status'],
+        'result': job['result'],
+        'http_status': job['http_status'],
+        'error': job['error'],
+        'queued_ms': ((job['started_at'] or time.time()) - job['created_at']) * 1000
+    }), 200
+
 
 # --- Run the App ---
 if __name__ == '__main__':
     # Get port from environment variable or default to 5002
     port = int(os.environ.get('ML_IDENTITY_PORT') or os.environ.get('PORT', 5002))
     logger.info(f"Starting Identity Verifier Service on port {port}")
+    # Load the models before serving, as gunicorn.conf.py does, so the first
+    # request's time budget is not spent loading weights. Only in the serving
+    # process: the debug reloader's watcher process never handles requests.
+    if PHASE2_ENABLED and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        from ops.warmup import preload_models
+        preload_models()
+        get_job_pool()  # resume jobs a previous run left behind
     app.run(host='0.0.0.0', port=port, debug=True)
\ No newline at end of file
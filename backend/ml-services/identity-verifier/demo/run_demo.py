@@ -105,10 +105,10 @@ def run_demo(video_path: str, model_name: str = 'xception',
         stage1_result = run_stage1(capture)
         stage1_time = (time.time() - stage1_start) * 1000
         
-        logger.info(f"Pass: {stage1_result.get('pass', False)}")
+        logger.info(f"Pass: {stage1_result.get('passed', False)}")
         logger.info(f"Audit ID: {stage1_result.get('audit_id')}")
-        if not stage1_result.get('pass', False):
-            logger.warning(f"Reason: {stage1_result.get('reason')}")
+        if not stage1_result.get('passed', False):
+            logger.warning(f"Reason: {stage1_result.get('reasons')}")
             logger.warning("Stage 1 failed. Stopping pipeline.")
             return stage1_result
         logger.info(f"Processing time: {stage1_time:.1f}ms")
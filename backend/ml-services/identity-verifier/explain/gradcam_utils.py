@@ -173,9 +173,9 @@ def explain(
             dummy_heatmaps.append(overlay)
         return dummy_heatmaps
     
-    # Import model
+    # Import model (private instance: Grad-CAM hooks must not land on the pooled model)
     from models.cnn_deepfake import get_detector
-    detector = get_detector(name=model_name)
+    detector = get_detector(name=model_name, use_pool=False)
     
     # Get predictions to find top suspicious frames
     predictions = detector.predict(frames, batch_size=32)
@@ -312,9 +312,9 @@ def explain_captum(
         
         logger.info(f"Using Captum {method} for explanations")
         
-        # Import model
+        # Import model (private instance, see explain())
         from models.cnn_deepfake import get_detector
-        detector = get_detector(name=model_name)
+        detector = get_detector(name=model_name, use_pool=False)
         
         # Get predictions
         predictions = detector.predict(frames, batch_size=32)
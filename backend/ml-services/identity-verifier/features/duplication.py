@@ -1,23 +1,103 @@
 import cv2
 import numpy as np
-from typing import List, Dict, Any
+from collections import defaultdict
+from typing import List, Dict, Any, Tuple
 
-def frame_duplication_ratio(frames: List[np.ndarray], threshold: float = 1.0) -> Dict[str, Any]:
+# Earlier frames of the same hash bucket compared against each frame (loop search)
+MAX_LOOP_CANDIDATES = 32
+
+
+def thumbnail_stack(frames, size: Tuple[int, int] = (64, 64)) -> np.ndarray:
+    """
+    Stack of small grayscale thumbnails, shape (N, h, w).
+
+    Accepts a thumbnail stack as is, uses the cached thumbnails of a
+    FrameStore (IngestCapture.frames), and otherwise resizes each frame.
+
+    Args:
+        frames: (N, h, w) uint8 array, FrameStore, or list of BGR/gray frames.
+        size (tuple): (width, height) of the thumbnails.
+    """
+    w, h = size
+    if isinstance(frames, np.ndarray) and frames.ndim == 3 and frames.shape[1:] == (h, w):
+        return frames
+    if hasattr(frames, 'thumbnails'):
+        return frames.thumbnails(size)
+
+    stack = np.empty((len(frames), h, w), dtype=np.uint8)
+    for i, f in enumerate(frames):
+        small = cv2.resize(f, (w, h))
+        stack[i] = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+    return stack
+
+
+def _block_hashes(stack: np.ndarray, grid: int = 8) -> np.ndarray:
+    """Average hash of every thumbnail (grid x grid block means vs. their mean), one row of bits per frame."""
+    n, h, w = stack.shape
+    bh, bw = h // grid, w // grid
+    blocks = stack[:, :bh * grid, :bw * grid].reshape(n, grid, bh, grid, bw).mean(axis=(2, 4))
+    bits = blocks.reshape(n, -1) > blocks.reshape(n, -1).mean(axis=1, keepdims=True)
+    return np.packbits(bits, axis=1)
+
+
+def find_loops(stack: np.ndarray, diffs: np.ndarray, threshold: float = 1.0) -> List[Tuple[int, int]]:
+    """
+    Frames that repeat an earlier, non-adjacent frame (a looped clip).
+
+    Thumbnails are bucketed by their average hash, so each frame is only
+    compared with earlier frames of its bucket; a pair counts when its mean
+    absolute difference is below `threshold` and the video moved in between
+    (so a frozen run is not reported as a loop).
+
+    Args:
+        stack (np.ndarray): (N, h, w) grayscale thumbnails.
+        diffs (np.ndarray): Adjacent-frame mean differences, shape (N - 1,).
+        threshold (float): Mean pixel difference below which frames are the same.
+
+    Returns:
+        list of (earlier index, index) pairs, one per looped frame.
+    """
+    # moved[j] - moved[i] > 0 iff some transition between frames i and j changed the image
+    moved = np.concatenate([[0], np.cumsum(diffs >= threshold)])
+    buckets = defaultdict(list)
+    loops = []
+    for j, key in enumerate(map(bytes, _block_hashes(stack))):
+        earlier = [i for i in buckets[key][-MAX_LOOP_CANDIDATES:] if moved[j] > moved[i]]
+        if earlier:
+            dist = np.abs(stack[earlier].astype(np.int16) - stack[j]).mean(axis=(1, 2))
+            k = int(np.argmin(dist))
+            if dist[k] < threshold:
+                loops.append((earlier[k], j))
+        buckets[key].append(j)
+    return loops
+
+
+def frame_duplication_ratio(frames: List[np.ndarray], threshold: float = 1.0,
+                            detect_loops: bool = False, size: Tuple[int, int] = (64, 64)) -> Dict[str, Any]:
     """
     Calculates the ratio of frames that are identical (or nearly identical) to their predecessor.
-    
-    A high duplication ratio suggests a static image attack (holding a photo) or a 
+
+    A high duplication ratio suggests a static image attack (holding a photo) or a
     frozen video feed, failing the liveness check.
 
+    The comparison runs on a stack of small grayscale thumbnails, all
+    adjacent differences in one array expression; pass IngestCapture.frames
+    (a FrameStore) or a precomputed thumbnail stack to reuse cached thumbnails.
+
     Args:
-        frames (List[np.ndarray]): A list of consecutive video frames (BGR or Gray).
-        threshold (float): The mean pixel difference threshold below which frames are 
+        frames: Consecutive video frames (list of BGR or Gray, a FrameStore, or
+                an (N, h, w) thumbnail stack of `size`).
+        threshold (float): The mean pixel difference threshold below which frames are
                            considered "duplicates". Defaults to 1.0 (very strict).
+        detect_loops (bool): Also look for frames repeating an earlier, non-adjacent
+                             frame (a replayed loop); adds 'loop_ratio'.
+        size (tuple): Thumbnail (width, height).
 
     Returns:
         dict: {
             'value': float,      # Ratio of duplicates (0.0 to 1.0). High = suspicious.
             'confidence': float, # Reliability of the check based on input size.
+            'loop_ratio': float, # Share of frames repeating an earlier frame (detect_loops only)
             'debug': dict        # Metadata including per-frame diffs.
         }
     """
@@ -28,66 +108,48 @@ def frame_duplication_ratio(frames: List[np.ndarray], threshold: float = 1.0) ->
     }
 
     # 1. Validation
-    if not frames or len(frames) < 2:
+    if frames is None or len(frames) < 2:
         result['debug']['error'] = "Insufficient frames for duplication check (need >= 2)"
         return result
 
     try:
-        # 2. Preprocessing
-        # We perform the check on grayscale resized frames for speed
-        gray_frames = []
-        for f in frames:
-            # Resize to a small fixed size (e.g., 64x64) to ignore minor compression noise
-            # and speed up calculation.
-            small = cv2.resize(f, (64, 64))
-            if len(small.shape) == 3:
-                gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
-            else:
-                gray = small
-            gray_frames.append(gray)
-
-        # 3. Calculate Differences
-        duplicates_count = 0
-        diffs = []
-        
-        # We iterate from the second frame and compare it to the previous one
-        for i in range(1, len(gray_frames)):
-            curr = gray_frames[i].astype(np.float32)
-            prev = gray_frames[i-1].astype(np.float32)
-            
-            # Calculate Mean Absolute Difference (L1 norm)
-            diff = np.abs(curr - prev)
-            mean_diff = np.mean(diff)
-            diffs.append(float(mean_diff))
-            
-            # If the difference is negligible, it's a duplicate
-            # Real cameras always have sensor noise (diff > 0), even on a tripod.
-            # A diff of ~0.0 implies a digital freeze or exact copy.
-            if mean_diff < threshold:
-                duplicates_count += 1
+        # 2. Thumbnails: small size ignores minor compression noise
+        stack = thumbnail_stack(frames, size)
+
+        # 3. Mean Absolute Difference (L1 norm) of every adjacent pair at once.
+        # Real cameras always have sensor noise (diff > 0), even on a tripod;
+        # a diff of ~0.0 implies a digital freeze or exact copy.
+        diffs = np.abs(np.diff(stack.astype(np.int16), axis=0)).mean(axis=(1, 2))
+        duplicates_count = int(np.count_nonzero(diffs < threshold))
 
         # 4. Calculate Ratio
-        total_transitions = len(frames) - 1
+        total_transitions = len(stack) - 1
         ratio = duplicates_count / total_transitions
 
         # 5. Populate Result
         result['value'] = float(ratio)
-        
+
         # Confidence logic:
         # If we have very few frames (e.g., < 10), the ratio is statistically weak.
         # If we have > 30 frames (e.g., 1 sec at 30fps), confidence is high.
         frame_count_reliability = min(1.0, total_transitions / 30.0)
         result['confidence'] = float(frame_count_reliability)
-        
+
         result['debug'] = {
             'total_transitions': total_transitions,
             'duplicates_found': duplicates_count,
-            'avg_diff': float(np.mean(diffs)) if diffs else 0.0,
-            'min_diff': float(np.min(diffs)) if diffs else 0.0
+            'avg_diff': float(diffs.mean()),
+            'min_diff': float(diffs.min())
         }
 
+        if detect_loops:
+            loops = find_loops(stack, diffs, threshold)
+            result['loop_ratio'] = len(loops) / float(len(stack))
+            result['debug']['loops_found'] = len(loops)
+            result['debug']['first_loop'] = list(loops[0]) if loops else None
+
     except Exception as e:
         result['debug']['error'] = str(e)
         print(f"Duplication Check Error: {e}")
 
-    return result
\ No newline at end of file
+    return result
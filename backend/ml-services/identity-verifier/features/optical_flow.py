@@ -1,10 +1,120 @@
+import os
+import threading
 import cv2
 import numpy as np
-from typing import List, Dict, Any, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+
+# We define a standard size for flow calculation to ensure speed
+# and consistency across different video resolutions.
+PROCESS_SIZE = (128, 128)
+FLOW_METHODS = ('dense', 'sparse')
+
+# Sparse (Lucas-Kanade) settings: corners tracked inside the face core
+LK_MAX_CORNERS = 32
+LK_MIN_POINTS = 8
+# Tracks whose backward flow misses the start point by more than this (px) are dropped
+LK_MAX_FB_ERROR = 1.0
+LK_PARAMS = dict(winSize=(11, 11), maxLevel=2,
+                 criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+
+# Threads shared by every flow_consistency(workers > 1) call (FLOW_WORKERS)
+_flow_executor = None
+_flow_executor_lock = threading.Lock()
+
+
+def get_flow_executor() -> ThreadPoolExecutor:
+    """
+    Thread pool computing frame pairs for all requests (created lazily, so
+    forked workers each get their own). Sized by FLOW_WORKERS (default 1).
+    """
+    global _flow_executor
+    if _flow_executor is None:
+        with _flow_executor_lock:
+            if _flow_executor is None:
+                _flow_executor = ThreadPoolExecutor(
+                    max_workers=max(1, int(os.environ.get('FLOW_WORKERS', 1))),
+                    thread_name_prefix='flow'
+                )
+    return _flow_executor
+
+
+def _face_crops(prev_gray: np.ndarray, curr_gray: np.ndarray,
+                box: Tuple[int, int, int, int]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """Face + 20% margin cut from both frames and resized to PROCESS_SIZE, or None."""
+    # Skip if box is invalid
+    if not box or box[2] <= 0 or box[3] <= 0:
+        return None
+
+    # Crop face + 20% margin to see relative motion
+    x, y, w, h = box
+    margin = int(w * 0.2)
+    h_img, w_img = curr_gray.shape
+
+    x1 = max(0, x - margin)
+    y1 = max(0, y - margin)
+    x2 = min(w_img, x + w + margin)
+    y2 = min(h_img, y + h + margin)
+
+    curr_crop = curr_gray[y1:y2, x1:x2]
+    prev_crop = prev_gray[y1:y2, x1:x2]
+
+    if curr_crop.size == 0 or prev_crop.size == 0 or curr_crop.shape != prev_crop.shape:
+        return None
+
+    # Resize for consistent flow analysis
+    return cv2.resize(prev_crop, PROCESS_SIZE), cv2.resize(curr_crop, PROCESS_SIZE)
+
+
+def _core_slices(shape: Tuple[int, int]) -> Tuple[slice, slice]:
+    """The central 50% of the crop, taken as the "Face Core" (background filtered out)."""
+    ch, cw = shape
+    cx, cy = cw // 2, ch // 2
+    roi_w, roi_h = cw // 2, ch // 2
+    return slice(cy - roi_h // 2, cy + roi_h // 2), slice(cx - roi_w // 2, cx + roi_w // 2)
+
+
+def _dense_magnitudes(prev_small: np.ndarray, curr_small: np.ndarray) -> np.ndarray:
+    """Farneback flow magnitude of every pixel of the face core."""
+    # flow has shape (h, w, 2) -> (dx, dy)
+    flow = cv2.calcOpticalFlowFarneback(
+        prev_small, curr_small, None,
+        pyr_scale=0.5, levels=3, winsize=15,
+        iterations=3, poly_n=5, poly_sigma=1.2, flags=0
+    )
+    mag, _ = cv2.cartToPolar(flow[..., 0], flow[..., 1])
+    rows, cols = _core_slices(mag.shape)
+    return mag[rows, cols]
+
+
+def _sparse_magnitudes(prev_small: np.ndarray, curr_small: np.ndarray) -> Optional[np.ndarray]:
+    """Lucas-Kanade displacement of corners tracked inside the face core, or None if too few."""
+    rows, cols = _core_slices(prev_small.shape)
+    mask = np.zeros_like(prev_small)
+    mask[rows, cols] = 255
+    points = cv2.goodFeaturesToTrack(prev_small, maxCorners=LK_MAX_CORNERS, qualityLevel=0.01,
+                                     minDistance=5, mask=mask)
+    if points is None or len(points) < LK_MIN_POINTS:
+        return None
+
+    # Forward-backward check: keep tracks that lead back to where they started
+    tracked, status, _ = cv2.calcOpticalFlowPyrLK(prev_small, curr_small, points, None, **LK_PARAMS)
+    back, back_status, _ = cv2.calcOpticalFlowPyrLK(curr_small, prev_small, tracked, None, **LK_PARAMS)
+    fb_error = np.linalg.norm((points - back).reshape(-1, 2), axis=1)
+    good = (status.ravel() == 1) & (back_status.ravel() == 1) & (fb_error < LK_MAX_FB_ERROR)
+    if np.count_nonzero(good) < LK_MIN_POINTS:
+        return None
+    return np.linalg.norm((tracked - points).reshape(-1, 2)[good], axis=1)
+
 
 def flow_consistency(
     frames: List[np.ndarray], 
-    face_boxes: List[Tuple[int, int, int, int]]
+    face_boxes: List[Tuple[int, int, int, int]],
+    cancel_token=None,
+    gray_frames=None,
+    method: str = 'dense',
+    stride: int = 1,
+    workers: int = 1
 ) -> Dict[str, Any]:
     """
     Computes the consistency of Optical Flow within the face region across frames.
@@ -13,9 +123,23 @@ def flow_consistency(
     Deepfakes often exhibit inconsistent "warping" flow or high variance 
     within the face mask as the AI tries to align features frame-by-frame.
 
+    Every adjacent frame pair is analyzed on its own, so pairs can be
+    sampled (`stride`) and run concurrently on the shared flow pool
+    (`workers`; OpenCV releases the GIL while computing flow). Both methods report the same statistics:
+    the spread of motion magnitudes in the face core relative to their mean.
+
     Args:
-        frames (List[np.ndarray]): List of consecutive video frames (BGR or Gray).
+        frames (List[np.ndarray]): List of consecutive video frames (BGR), or a
+                                   FrameStore (its cached grayscale stack is used).
         face_boxes (List[Tuple]): List of (x, y, w, h) for each frame.
+        cancel_token: Optional pipeline.timeouts.CancellationToken, polled once per frame pair.
+        gray_frames: Optional grayscale stack already computed for `frames` (e.g. the
+                     Stage 2 'gray' artifact); skips the per-frame conversion.
+        method (str): 'dense' (Farneback, every pixel of the face core) or 'sparse'
+                      (Lucas-Kanade on corners tracked in the face core, much cheaper).
+        stride (int): Analyze the pair ending at every `stride`-th frame (1 = all pairs).
+        workers (int): Pairs computed concurrently on the shared pool (see
+                       get_flow_executor; its FLOW_WORKERS threads bound all calls).
 
     Returns:
         dict: {
@@ -35,6 +159,10 @@ def flow_consistency(
         result['debug']['error'] = "Insufficient frames (need >= 2)"
         return result
 
+    if method not in FLOW_METHODS:
+        result['debug']['error'] = f"Unknown flow method: {method}"
+        return result
+
     if len(frames) != len(face_boxes):
         # Trim to match shortest length
         min_len = min(len(frames), len(face_boxes))
@@ -44,65 +172,41 @@ def flow_consistency(
     try:
         flow_variances = []
         motion_magnitudes = []
-        
-        # We define a standard size for flow calculation to ensure speed
-        # and consistency across different video resolutions.
-        Process_Size = (128, 128)
 
-        # Pre-process first frame
-        prev_gray = cv2.cvtColor(frames[0], cv2.COLOR_BGR2GRAY)
-        
-        # 2. Iterate through frame pairs
-        for i in range(1, len(frames)):
-            curr_gray = cv2.cvtColor(frames[i], cv2.COLOR_BGR2GRAY)
-            box = face_boxes[i]
-            
-            # Skip if box is invalid
-            if not box or box[2] <= 0 or box[3] <= 0:
-                prev_gray = curr_gray
-                continue
+        # Grayscale stack shared by the caller or cached by a FrameStore, if available
+        grays = gray_frames
+        if grays is None and hasattr(frames, 'gray'):
+            grays = frames.gray()
 
-            # Resize whole frames for flow calculation (expensive otherwise)
-            # Alternatively, we can just crop the face + margin first.
-            # Let's crop face + 20% margin to see relative motion
-            x, y, w, h = box
-            margin = int(w * 0.2)
-            h_img, w_img = curr_gray.shape
-            
-            x1 = max(0, x - margin)
-            y1 = max(0, y - margin)
-            x2 = min(w_img, x + w + margin)
-            y2 = min(h_img, y + h + margin)
-            
-            curr_crop = curr_gray[y1:y2, x1:x2]
-            prev_crop = prev_gray[y1:y2, x1:x2]
+        def to_gray(i):
+            return grays[i] if grays is not None else cv2.cvtColor(frames[i], cv2.COLOR_BGR2GRAY)
 
-            if curr_crop.size == 0 or prev_crop.size == 0 or curr_crop.shape != prev_crop.shape:
-                prev_gray = curr_gray
-                continue
+        magnitudes_of = _dense_magnitudes if method == 'dense' else _sparse_magnitudes
 
-            # Resize for consistent flow analysis
-            curr_small = cv2.resize(curr_crop, Process_Size)
-            prev_small = cv2.resize(prev_crop, Process_Size)
-
-            # 3. Calculate Dense Optical Flow (Farneback)
-            # flow has shape (h, w, 2) -> (dx, dy)
-            flow = cv2.calcOpticalFlowFarneback(
-                prev_small, curr_small, None, 
-                pyr_scale=0.5, levels=3, winsize=15, 
-                iterations=3, poly_n=5, poly_sigma=1.2, flags=0
-            )
-
-            # 4. Analyze Flow Statistics
-            # Calculate magnitude and angle
-            mag, _ = cv2.cartToPolar(flow[..., 0], flow[..., 1])
-            
-            # Filter out background (assume face is in the center of our crop)
-            # We take the central 50% of the crop as the "Face Core"
-            ch, cw = mag.shape
-            cx, cy = cw // 2, ch // 2
-            roi_w, roi_h = cw // 2, ch // 2
-            face_mag = mag[cy - roi_h//2 : cy + roi_h//2, cx - roi_w//2 : cx + roi_w//2]
+        # 2. Flow of one frame pair (i - 1, i): face-core motion magnitudes or None
+        def analyze_pair(i):
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            crops = _face_crops(to_gray(i - 1), to_gray(i), face_boxes[i])
+            return magnitudes_of(*crops) if crops is not None else None
+
+        pairs = range(1, len(frames), max(1, int(stride)))
+        if workers > 1 and len(pairs) > 1:
+            # One task per interleaved slice of the pairs, so a call holds at
+            # most `workers` pool threads
+            chunks = [pairs[k::workers] for k in range(min(workers, len(pairs)))]
+            futures = [get_flow_executor().submit(lambda chunk: [analyze_pair(i) for i in chunk], chunk)
+                       for chunk in chunks]
+            chunk_results = [f.result() for f in futures]
+            pair_magnitudes = [chunk_results[j % len(chunks)][j // len(chunks)]
+                               for j in range(len(pairs))]
+        else:
+            pair_magnitudes = [analyze_pair(i) for i in pairs]
+
+        # 3. Analyze Flow Statistics
+        for face_mag in pair_magnitudes:
+            if face_mag is None:
+                continue
 
             # Metric: Variance of Motion Magnitude
             # If the face is moving rigidly, all pixels should have roughly similar motion vectors.
@@ -118,11 +222,8 @@ def flow_consistency(
             if mean_motion > 0.5: # Threshold for "significant motion"
                 normalized_variance = std_motion / mean_motion
                 flow_variances.append(normalized_variance)
-            
-            # Prepare for next iteration
-            prev_gray = curr_gray
 
-        # 5. Aggregate Results
+        # 4. Aggregate Results
         if not flow_variances:
             # No significant motion detected -> cannot judge consistency
             result['value'] = 0.0
@@ -133,7 +234,7 @@ def flow_consistency(
         avg_variance = np.mean(flow_variances)
         avg_motion = np.mean(motion_magnitudes)
 
-        # 6. Normalize Score
+        # 5. Normalize Score
         # Real faces usually have normalized variance < 0.3 during motion.
         # Deepfakes often > 0.5 due to "swimming" pixels.
         result['value'] = float(avg_variance)
@@ -146,10 +247,14 @@ def flow_consistency(
         result['debug'] = {
             'avg_motion_magnitude': float(avg_motion),
             'flow_variance_raw': float(avg_variance),
-            'frames_analyzed': len(flow_variances)
+            'frames_analyzed': len(flow_variances),
+            'pairs_sampled': len(pair_magnitudes),
+            'method': method
         }
 
     except Exception as e:
+        if cancel_token is not None and cancel_token.cancelled:
+            raise  # the caller stopped us; this is not a flow result
         result['debug']['error'] = str(e)
         print(f"Optical Flow Error: {e}")
 
@@ -1,12 +1,144 @@
 import cv2
 import numpy as np
 from scipy import signal, fftpack
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional
+
+# Frames per reduction in roi_means (bounds the float copy of the ROI stack)
+ROI_CHUNK_SIZE = 64
+
+
+def skin_roi_mean(frame: np.ndarray, box: Tuple[int, int, int, int]) -> Optional[float]:
+    """
+    Mean green value of the central skin region of a face box.
+
+    We focus on the central part of the face (cheeks/nose) to avoid
+    hair/background noise: the centre 50% of the box width and height.
+    Green light is absorbed most by hemoglobin.
+
+    Args:
+        frame (np.ndarray): BGR frame.
+        box (Tuple): Face box (x, y, w, h).
+
+    Returns:
+        float, or None if the box or ROI is empty.
+    """
+    x, y, w, h = box
+    if w <= 0 or h <= 0:
+        return None
+
+    roi_x = int(x + w * 0.25)
+    roi_y = int(y + h * 0.25)
+    roi_w = int(w * 0.5)
+    roi_h = int(h * 0.5)
+
+    roi = frame[roi_y:roi_y+roi_h, roi_x:roi_x+roi_w]
+    if roi.size == 0:
+        return None
+
+    # Extract Green Channel (Index 1 in BGR)
+    return float(np.mean(roi[:, :, 1]))
+
+
+def roi_means(frames, face_boxes, chunk_size: int = ROI_CHUNK_SIZE, cancel_token=None) -> np.ndarray:
+    """
+    skin_roi_mean of every frame, as array reductions rather than a per-frame loop.
+
+    The ROI rectangles are computed for all frames at once; the green channel
+    of the region they span is then reduced chunk by chunk with separable row
+    and column masks (one einsum per chunk), so each frame keeps its own ROI.
+    Empty ROIs repeat the previous value (0 at the start), as in extract_rppg.
+
+    Args:
+        frames: (N, H, W, 3) BGR stack, FrameStore, or list of frames.
+        face_boxes: Face boxes (x, y, w, h), one per frame.
+        chunk_size (int): Frames per reduction.
+        cancel_token: Optional CancellationToken, polled once per chunk.
+
+    Returns:
+        np.ndarray of shape (N,).
+    """
+    n = min(len(frames), len(face_boxes))
+    if n == 0:
+        return np.zeros(0)
+    stack = frames
+    height, width = stack[0].shape[:2]
+
+    x, y, w, h = np.asarray(face_boxes[:n], dtype=np.float64).reshape(n, 4).T
+    valid = (w > 0) & (h > 0)
+    x0 = np.clip((x + w * 0.25).astype(int), 0, width)
+    y0 = np.clip((y + h * 0.25).astype(int), 0, height)
+    x1 = np.clip(x0 + (w * 0.5).astype(int), 0, width)
+    y1 = np.clip(y0 + (h * 0.5).astype(int), 0, height)
+    area = np.where(valid, (x1 - x0).clip(0) * (y1 - y0).clip(0), 0)
+
+    means = np.full(n, np.nan)
+    if area.any():
+        span = area > 0
+        X0, X1, Y0, Y1 = x0[span].min(), x1[span].max(), y0[span].min(), y1[span].max()
+        rows, cols = np.arange(Y0, Y1), np.arange(X0, X1)
+        for s in range(0, n, chunk_size):
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            e = min(s + chunk_size, n)
+            if isinstance(stack, np.ndarray) or hasattr(stack, 'array'):
+                # FrameStore: a chunk view of one segment (copied only across a spill boundary)
+                chunk = stack[s:e].array if hasattr(stack, 'array') else stack[s:e]
+                green = chunk[:, Y0:Y1, X0:X1, 1]
+            else:
+                green = np.stack([f[Y0:Y1, X0:X1, 1] for f in stack[s:e]])
+            row_mask = ((rows >= y0[s:e, None]) & (rows < y1[s:e, None])).astype(np.float32)
+            col_mask = ((cols >= x0[s:e, None]) & (cols < x1[s:e, None])).astype(np.float32)
+            sums = np.einsum('nh,nhw,nw->n', row_mask, green.astype(np.float32), col_mask)
+            chunk_area = area[s:e]
+            means[s:e] = np.where(chunk_area > 0, sums / np.maximum(chunk_area, 1), np.nan)
+
+    # Forward-fill empty ROIs
+    filled = np.where(np.isnan(means), 0, np.arange(n))
+    np.maximum.accumulate(filled, out=filled)
+    means = means[filled]
+    return np.nan_to_num(means, nan=0.0)
+
+
+class RPPGTracker:
+    """
+    Incremental rPPG: keeps only the ROI trace, updated as frames arrive.
+
+    Feed frames straight from the decoder (see ingest.frame_pipeline) and
+    drop them afterwards; estimate() runs the same processing as extract_rppg.
+
+    Usage:
+        tracker = RPPGTracker(fps=30.0)
+        for frame, box in decoded:
+            tracker.update(frame, box)
+        result = tracker.estimate()
+    """
+
+    def __init__(self, fps: float = 30.0):
+        self.fps = fps
+        self.trace: List[float] = []
+
+    def __len__(self) -> int:
+        return len(self.trace)
+
+    def update(self, frame: np.ndarray, box: Tuple[int, int, int, int]) -> float:
+        """Appends the frame's skin ROI mean (the previous value if the ROI is empty)."""
+        val = skin_roi_mean(frame, box)
+        if val is None:
+            val = self.trace[-1] if self.trace else 0
+        self.trace.append(val)
+        return val
+
+    def estimate(self, fps: Optional[float] = None) -> Dict[str, Any]:
+        """Pulse estimate from the trace so far (see extract_rppg for the result)."""
+        return extract_rppg(None, None, fps=fps or self.fps, roi_signal=self.trace)
+
 
 def extract_rppg(
     frames: List[np.ndarray], 
     face_boxes: List[Tuple[int, int, int, int]], 
-    fps: float = 30.0
+    fps: float = 30.0,
+    roi_signal: Optional[List[float]] = None,
+    cancel_token=None
 ) -> Dict[str, Any]:
     """
     Extracts the heart rate signal (rPPG) from a video sequence.
@@ -15,9 +147,14 @@ def extract_rppg(
     caused by blood volume pulse.
 
     Args:
-        frames (List[np.ndarray]): List of video frames (BGR).
+        frames (List[np.ndarray]): List of video frames (BGR), a FrameStore or a stack.
+                                   Not needed when roi_signal is given.
         face_boxes (List[Tuple]): Bounding boxes (x, y, w, h) for each frame.
         fps (float): Frames per second of the video.
+        roi_signal (List[float]): Optional per-frame skin ROI means already computed
+                                  with skin_roi_mean (skips the ROI pass over the frames).
+        cancel_token: Optional pipeline.timeouts.CancellationToken, polled between
+                      ROI chunks.
 
     Returns:
         dict: {
@@ -37,52 +174,20 @@ def extract_rppg(
     # 1. Validation
     # We need at least ~64 frames (~2 seconds) to detect a pulse reliably
     min_frames = 30
-    if not frames or len(frames) < min_frames:
+    n_frames = len(frames) if frames is not None else 0
+    if roi_signal is not None:
+        n_frames = min(n_frames, len(roi_signal)) if frames is not None else len(roi_signal)
+    if n_frames < min_frames:
         result['debug']['error'] = f"Insufficient frames for rPPG (need > {min_frames})"
         return result
 
-    if len(frames) != len(face_boxes):
-        min_len = min(len(frames), len(face_boxes))
-        frames = frames[:min_len]
-        face_boxes = face_boxes[:min_len]
-
     try:
-        raw_signal = []
-
-        # 2. ROI Extraction & Averaging
-        # We focus on the central part of the face (cheeks/nose) or forehead
-        # to avoid hair/background noise.
-        for i, frame in enumerate(frames):
-            x, y, w, h = face_boxes[i]
-            
-            # Skip invalid boxes
-            if w <= 0 or h <= 0:
-                # Pad with previous value or 0
-                val = raw_signal[-1] if raw_signal else 0
-                raw_signal.append(val)
-                continue
-
-            # Define ROI: Center 50% width, Center 50% height
-            # This generally captures the skin area with good blood perfusion.
-            roi_x = int(x + w * 0.25)
-            roi_y = int(y + h * 0.25)
-            roi_w = int(w * 0.5)
-            roi_h = int(h * 0.5)
-
-            roi = frame[roi_y:roi_y+roi_h, roi_x:roi_x+roi_w]
-            
-            if roi.size == 0:
-                val = raw_signal[-1] if raw_signal else 0
-                raw_signal.append(val)
-                continue
-
-            # Extract Green Channel (Index 1 in BGR)
-            # Green light is absorbed most by hemoglobin.
-            g_channel = roi[:, :, 1]
-            avg_val = np.mean(g_channel)
-            raw_signal.append(avg_val)
-
-        raw_signal = np.array(raw_signal)
+        if roi_signal is not None:
+            # Precomputed while decoding (see ingest.frame_pipeline / RPPGTracker)
+            raw_signal = np.asarray(roi_signal[:n_frames], dtype=np.float64)
+        else:
+            # 2. ROI Extraction & Averaging
+            raw_signal = roi_means(frames, face_boxes, cancel_token=cancel_token)
 
         # 3. Signal Processing
         # Detrending: Remove non-biological trends (head movement, lighting changes)
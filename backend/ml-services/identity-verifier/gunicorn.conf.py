@@ -0,0 +1,42 @@
+"""
+Gunicorn configuration for identity-verifier (production serving).
+
+    gunicorn -c gunicorn.conf.py app:app
+
+The app and every model are loaded once in the master (preload_app +
+ops.warmup.preload_models), then N workers are forked and share the
+weights copy-on-write. Each worker gets cores // workers torch/OpenCV
+threads, so adding cores adds workers without adding model copies.
+
+Environment:
+    PORT / ML_IDENTITY_PORT  Listen port (default 5002)
+    WEB_CONCURRENCY          Worker processes (default: one per core)
+    GUNICORN_TIMEOUT         Worker timeout in seconds (default 120)
+"""
+import os
+
+from ops.warmup import configure_worker_threads, freeze_heap, preload_models
+
+_cores = os.cpu_count() or 1
+
+bind = f"0.0.0.0:{os.environ.get('ML_IDENTITY_PORT') or os.environ.get('PORT', 5002)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', _cores))
+worker_class = 'sync'   # one request per process; Stage 2 fans out on its own threads
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+preload_app = True
+
+
+def on_starting(server):
+    # Runs in the master after the app was imported and before any fork
+    preload_models()
+    freeze_heap()
+
+
+def post_fork(server, worker):
+    threads = configure_worker_threads(server.cfg.workers, _cores)
+    server.log.info(f"Worker {worker.pid}: {threads} intra-op threads")
+    # Job threads cannot survive the fork, so every worker starts its own pool;
+    # it also requeues jobs a dead worker left RUNNING
+    import app
+    if app.PHASE2_ENABLED:
+        app.get_job_pool()
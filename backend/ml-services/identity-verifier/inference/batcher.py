@@ -0,0 +1,193 @@
+"""
+Cross-request dynamic micro-batching for CNN inference.
+Face crops from concurrent requests are merged into one forward pass.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BATCH_SIZE = 32
+DEFAULT_MAX_WAIT_MS = 5.0
+
+
+class InferenceBatcher:
+    """
+    Collects frames submitted by concurrent requests into shared batches.
+
+    A single worker thread owns the model. It takes the oldest pending
+    request, then keeps adding requests until the batch holds
+    `max_batch_size` frames or `max_wait_ms` has passed since that first
+    request arrived, runs one forward pass and resolves each request's
+    future with its own slice of the results. Requests are never split;
+    one larger than `max_batch_size` runs on its own (predict_fn chunks it).
+
+    Usage:
+        batcher = InferenceBatcher(lambda frames, batch_size: model.predict(frames, batch_size))
+        probs = batcher.predict(face_crops)
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[..., List[float]],
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+        name: str = 'batcher'
+    ):
+        """
+        Args:
+            predict_fn: Called as predict_fn(frames, batch_size=n); returns one score per frame.
+            max_batch_size: Frames per forward pass.
+            max_wait_ms: Longest a request waits for others to join its batch.
+            name: Worker thread name suffix (for logs).
+        """
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.name = name
+        self._queue = deque()   # (frames, future, arrival time)
+        self._cond = threading.Condition()
+        self._closed = False
+        self.batches_run = 0
+        self.frames_run = 0
+        self._worker = threading.Thread(target=self._run, name=f'infer-{name}', daemon=True)
+        self._worker.start()
+
+    def submit(self, frames: List[np.ndarray]) -> Future:
+        """
+        Queue frames for the next batch.
+
+        Returns:
+            Future resolving to the list of scores for `frames`.
+        """
+        future = Future()
+        if not frames:
+            future.set_result([])
+            return future
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"InferenceBatcher '{self.name}' is closed")
+            self._queue.append((list(frames), future, time.monotonic()))
+            self._cond.notify()
+        return future
+
+    def predict(self, frames: List[np.ndarray], timeout: Optional[float] = None) -> List[float]:
+        """
+        Submit frames and wait for their scores.
+
+        Raises:
+            concurrent.futures.TimeoutError: If the scores are not ready within
+                `timeout` seconds. The request is withdrawn if its batch has not
+                started yet.
+        """
+        future = self.submit(frames)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    def close(self):
+        """Stop the worker after the pending requests are served."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._worker.join()
+
+    def _next_batch(self):
+        """Block until a batch is ready. Returns [(frames, future)], or None when closed."""
+        with self._cond:
+            while not self._queue:
+                if self._closed:
+                    return None
+                self._cond.wait()
+
+            deadline = self._queue[0][2] + self.max_wait_ms / 1000.0
+            while not self._closed:
+                queued = sum(len(frames) for frames, _, _ in self._queue)
+                remaining = deadline - time.monotonic()
+                if queued >= self.max_batch_size or remaining <= 0:
+                    break
+                self._cond.wait(timeout=remaining)
+
+            batch = [self._queue.popleft()[:2]]
+            size = len(batch[0][0])
+            while self._queue and size + len(self._queue[0][0]) <= self.max_batch_size:
+                frames, future, _ = self._queue.popleft()
+                batch.append((frames, future))
+                size += len(frames)
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            batch = [(frames, future) for frames, future in batch
+                     if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            all_frames = [f for frames, _ in batch for f in frames]
+            try:
+                scores = self.predict_fn(all_frames, batch_size=max(len(all_frames), 1))
+                if len(scores) != len(all_frames):
+                    raise ValueError(f"Got {len(scores)} scores for {len(all_frames)} frames")
+            except Exception as e:
+                logger.error(f"Batched inference failed ({len(batch)} requests): {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches_run += 1
+            self.frames_run += len(all_frames)
+            logger.debug(f"Batched {len(batch)} requests / {len(all_frames)} frames")
+            start = 0
+            for frames, future in batch:
+                future.set_result(list(scores[start:start + len(frames)]))
+                start += len(frames)
+
+
+# Singleton instances (one batcher per model)
+_batchers: Dict[str, InferenceBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+def get_inference_batcher(model_name: str = 'xception') -> InferenceBatcher:
+    """
+    Get the shared batcher for a deepfake model.
+
+    The detector is looked up on every batch (see models.cnn_deepfake.get_detector),
+    so it is loaded lazily and follows the DetectorPool. Batch limits come from
+    DEEPFAKE_BATCH_MAX_SIZE and DEEPFAKE_BATCH_WAIT_MS if set.
+
+    Args:
+        model_name: 'xception' or 'efficientnet'
+
+    Returns:
+        InferenceBatcher instance
+    """
+    batcher = _batchers.get(model_name)
+    if batcher is None:
+        with _batchers_lock:
+            batcher = _batchers.get(model_name)
+            if batcher is None:
+                def predict(frames, batch_size):
+                    from models.cnn_deepfake import get_detector
+                    return get_detector(name=model_name).predict(frames, batch_size=batch_size)
+                batcher = InferenceBatcher(
+                    predict,
+                    max_batch_size=int(os.environ.get('DEEPFAKE_BATCH_MAX_SIZE', DEFAULT_MAX_BATCH_SIZE)),
+                    max_wait_ms=float(os.environ.get('DEEPFAKE_BATCH_WAIT_MS', DEFAULT_MAX_WAIT_MS)),
+                    name=model_name
+                )
+                _batchers[model_name] = batcher
+    return batcher
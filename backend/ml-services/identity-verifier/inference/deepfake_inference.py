@@ -3,17 +3,33 @@ Deepfake inference utilities.
 High-level API for running CNN-based deepfake detection and score aggregation.
 """
 
+import os
 import logging
-from typing import List, Optional
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable, List, Optional, Sequence
 import numpy as np
 
 logger = logging.getLogger(__name__)
 
+# Route CNN calls through the cross-request batcher (DEEPFAKE_BATCHING=1 enables).
+# Off by default: sync gunicorn workers serve one request at a time, so there
+# is nothing to batch with and the wait only adds latency. Worth enabling
+# with threaded workers (gthread) under concurrent load.
+BATCHING_ENABLED = os.environ.get('DEEPFAKE_BATCHING', '0') != '0'
+
+# Adaptive sampling defaults (see adaptive_deepfake_inference)
+ADAPTIVE_MIN_FRAMES = 8
+ADAPTIVE_MAX_FRAMES = 48
+# Video-level decision points: stage 2 pass/fail and the policy's hard block
+DECISION_THRESHOLDS = (0.5, 0.85)
+
 
 def run_deepfake_model(
     frames: List[np.ndarray],
     model_name: str = 'xception',
-    batch_size: int = 32
+    batch_size: int = 32,
+    batched: Optional[bool] = None,
+    timeout: Optional[float] = None
 ) -> List[float]:
     """
     Run deepfake detection model on face-cropped frames.
@@ -21,7 +37,11 @@ def run_deepfake_model(
     Args:
         frames: List of HxWx3 uint8 RGB face-crop images (unaligned allowed)
         model_name: Model to use ('xception' or 'efficientnet')
-        batch_size: Batch size for GPU inference
+        batch_size: Batch size for GPU inference (unbatched calls only)
+        batched: Share forward passes with concurrent requests through the
+                 model's InferenceBatcher (see inference.batcher).
+                 Default: BATCHING_ENABLED
+        timeout: Longest wait for a batched result, in seconds (None = no limit)
         
     Returns:
         List of probabilities (0.0=real, 1.0=fake), same length as input
@@ -39,11 +59,15 @@ def run_deepfake_model(
     from models.cnn_deepfake import get_detector
     
     try:
-        # Get model detector
-        detector = get_detector(name=model_name)
-        
-        # Run inference
-        probabilities = detector.predict(frames, batch_size=batch_size)
+        if batched if batched is not None else BATCHING_ENABLED:
+            from inference.batcher import get_inference_batcher
+            probabilities = get_inference_batcher(model_name).predict(frames, timeout=timeout)
+        else:
+            # Get model detector
+            detector = get_detector(name=model_name)
+            
+            # Run inference
+            probabilities = detector.predict(frames, batch_size=batch_size)
         
         # Validate output
         if len(probabilities) != len(frames):
@@ -195,3 +219,140 @@ def batch_inference(
         'frames_processed': len(face_crops),
         'frames_skipped': frames_skipped
     }
+
+
+def stratified_order(n: int) -> List[int]:
+    """
+    Order frame indices so that every prefix covers the video evenly.
+
+    Uses the bit-reversal permutation scaled to `n`: the first 2 indices
+    split the video in halves, the first 4 in quarters, and so on.
+
+    Example:
+        >>> stratified_order(8)
+        [0, 4, 2, 6, 1, 5, 3, 7]
+    """
+    if n <= 0:
+        return []
+    bits = max(1, (n - 1).bit_length())
+    order = []
+    seen = set()
+    for i in range(1 << bits):
+        # Stratum midpoints; steps of n / 2**bits <= 1, so every index in [0, n) is reached
+        idx = ((2 * int(format(i, f'0{bits}b')[::-1], 2) + 1) * n) >> (bits + 1)
+        if idx not in seen:
+            seen.add(idx)
+            order.append(idx)
+    return order
+
+
+def adaptive_deepfake_inference(
+    face_crops: Sequence[np.ndarray],
+    model_name: str = 'xception',
+    batch_size: int = 8,
+    min_frames: int = ADAPTIVE_MIN_FRAMES,
+    max_frames: int = ADAPTIVE_MAX_FRAMES,
+    thresholds: Sequence[float] = DECISION_THRESHOLDS,
+    z: float = 1.96,
+    preprocess: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+    cancel_token=None
+) -> dict:
+    """
+    Sequential-test sampling of face crops for the deepfake CNN.
+
+    Crops are inferred in stratified mini-batches (see stratified_order),
+    and a confidence interval on the mean fake probability is updated
+    after each batch. Sampling stops as soon as the interval lies
+    entirely on one side of every decision threshold, so the verdict
+    cannot change with more frames, or when `max_frames` is reached.
+    The CNN cost per request is therefore bounded independently of
+    video length.
+
+    Args:
+        face_crops: Candidate HxWx3 face crops, in frame order.
+        model_name: Deepfake model to use.
+        batch_size: Crops per mini-batch (one CNN call each).
+        min_frames: Crops to infer before the first stopping test.
+        max_frames: Upper bound on crops inferred.
+        thresholds: Decision points the mean is compared against.
+        z: Normal quantile of the interval (1.96 = ~95% two-sided).
+        preprocess: Optional per-crop transform applied only to sampled crops
+                    (e.g. BGR -> RGB).
+        cancel_token: Optional pipeline.timeouts.CancellationToken, polled between batches;
+                      its remaining time also bounds the wait for a batched CNN call.
+
+    Returns:
+        Dictionary with:
+            - 'video_fake_prob': mean probability of the sampled crops
+            - 'frame_scores': per-crop probabilities, in sampling order
+            - 'frame_indices': indices into face_crops that were inferred
+            - 'frames_processed': number of crops inferred
+            - 'ci': (low, high) interval on the mean at the stop
+            - 'stopped_early': True if the interval cleared every threshold
+    """
+    n = len(face_crops)
+    order = stratified_order(n)[:max(1, max_frames)]
+    min_frames = min(max(1, min_frames), len(order))
+
+    scores: List[float] = []
+    indices: List[int] = []
+    ci = (0.0, 1.0)
+    stopped_early = False
+
+    while len(indices) < len(order):
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        # First batch goes straight to min_frames
+        take = max(batch_size, min_frames - len(indices))
+        batch = order[len(indices):len(indices) + take]
+        crops = [face_crops[i] for i in batch]
+        if preprocess is not None:
+            crops = [preprocess(c) for c in crops]
+        try:
+            scores.extend(run_deepfake_model(crops, model_name=model_name, batch_size=len(crops),
+                                             timeout=_wait_limit(cancel_token)))
+        except FutureTimeoutError:
+            cancel_token.raise_if_cancelled()  # budget ran out while queued for a batch
+            raise
+        indices.extend(batch)
+
+        ci = _mean_interval(scores, n, z)
+        if len(indices) >= min_frames and \
+                all(ci[1] < t or ci[0] >= t for t in thresholds):
+            stopped_early = len(indices) < len(order)
+            break
+
+    video_fake_prob = aggregate_scores(scores, method='mean') if scores else 0.0
+    logger.debug(
+        f"Adaptive deepfake sampling: {len(indices)}/{n} crops, "
+        f"mean={video_fake_prob:.3f}, ci=({ci[0]:.3f}, {ci[1]:.3f}), early={stopped_early}"
+    )
+    return {
+        'video_fake_prob': video_fake_prob,
+        'frame_scores': scores,
+        'frame_indices': indices,
+        'frames_processed': len(indices),
+        'ci': ci,
+        'stopped_early': stopped_early
+    }
+
+
+def _wait_limit(cancel_token) -> Optional[float]:
+    """Seconds a CNN call may wait before the request's budget runs out (None = unbounded)."""
+    if cancel_token is None:
+        return None
+    remaining = cancel_token.remaining()
+    return None if remaining == float('inf') else remaining
+
+
+def _mean_interval(scores: List[float], population: int, z: float):
+    """Normal-approximation interval on the mean, with finite population correction."""
+    k = len(scores)
+    mean = float(np.mean(scores))
+    if k >= population:
+        return (mean, mean)  # every frame seen: the mean is exact
+    if k < 2:
+        return (0.0, 1.0)
+    fpc = np.sqrt((population - k) / (population - 1))
+    half = z * float(np.std(scores, ddof=1)) / np.sqrt(k) * fpc
+    return (max(0.0, mean - half), min(1.0, mean + half))
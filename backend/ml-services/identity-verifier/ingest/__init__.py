@@ -5,16 +5,26 @@ Purpose: Capture and normalize raw inputs (video/audio/doc) and produce Processe
 
 Exposes:
 - IngestCapture (class from capture.py)
-- capture_from_file, capture_from_stream (from capture.py)
-- extract_frames, align_face_crop (from frame_utils.py)
+- capture_from_file, capture_from_stream, probe_video (from capture.py)
+- extract_frames, align_face_crop, select_changed_frames, propagate_scores (from frame_utils.py)
+- FaceLocalizer, localize_faces (from face_localizer.py)
+- FrameStore (from frame_store.py)
+- AVDemuxer, ffmpeg_available (from demux.py)
+- VideoSource, spool_stream, needs_seeking, sha256_stream, sha256_file (from stream_utils.py)
+- phash, video_fingerprint (from fingerprint.py)
 - load_audio, get_vad_segments (from audio_utils.py)
 - load_document_image, normalize_orientation, extract_exif (from doc_ingest.py)
 - collect_meta (from meta_collector.py)
 - ProcessedCapture, FrameInfo, AudioSegment (from schemas.py)
 """
 
-from .capture import IngestCapture, capture_from_file, capture_from_stream
-from .frame_utils import extract_frames, align_face_crop
+from .capture import IngestCapture, capture_from_file, capture_from_stream, probe_video
+from .frame_utils import extract_frames, align_face_crop, select_changed_frames, propagate_scores
+from .face_localizer import FaceLocalizer, localize_faces
+from .frame_store import FrameStore
+from .demux import AVDemuxer, ffmpeg_available
+from .stream_utils import VideoSource, spool_stream, needs_seeking, sha256_stream, sha256_file
+from .fingerprint import phash, video_fingerprint
 from .audio_utils import load_audio, get_vad_segments
 from .doc_ingest import load_document_image, normalize_orientation, extract_exif
 from .meta_collector import collect_meta
@@ -7,17 +7,85 @@ from .frame_utils import extract_frames, align_face_crop
 from .audio_utils import load_audio, get_vad_segments
 from .doc_ingest import load_document_image, normalize_orientation, extract_exif
 from .meta_collector import collect_meta
+from .face_localizer import FaceLocalizer
+from .frame_store import FrameStore
+from .frame_pipeline import (FramePipeline, FaceBoxConsumer, RoiMeanConsumer, CacheConsumer,
+                             RPPG_AVAILABLE)
+from .demux import AVDemuxer, ffmpeg_available
+from .stream_utils import VideoSource
+from .fingerprint import video_fingerprint, fingerprint_frames, second_indices
 import os
+import itertools
 import cv2
 import numpy as np
 
 
+def working_geometry(src_w, src_h, pixel_bytes=3, max_side=None, max_frames=None, max_bytes=None):
+    """
+    Working frame size and frame cap IngestCapture derives for a source resolution.
+    
+    Args:
+        src_w, src_h (int): Source frame size.
+        pixel_bytes (int): Bytes per stored pixel (3 for BGR uint8).
+        max_side (int): Longest side of stored frames (None = keep source size).
+        max_frames (int): Frame cap (None = no cap).
+        max_bytes (int): Byte budget for stored frames (None = no budget).
+    
+    Returns:
+        tuple: ((work_w, work_h), scale, frame_cap); frame_cap is None when unbounded.
+    """
+    scale = 1.0
+    if max_side and max(src_w, src_h) > max_side:
+        scale = max_side / float(max(src_w, src_h))
+    work_w = max(1, int(round(src_w * scale)))
+    work_h = max(1, int(round(src_h * scale)))
+    
+    frame_cap = max_frames
+    if max_bytes is not None:
+        budget_frames = max(1, max_bytes // (work_w * work_h * pixel_bytes))
+        frame_cap = budget_frames if frame_cap is None else min(frame_cap, budget_frames)
+    return (work_w, work_h), scale, frame_cap
+
+
 class IngestCapture:
     """
     IngestCapture class for processing video/audio/document inputs.
     Compatible with Phase 2 pipeline requirements.
+    
+    Decoded frames are bounded while decoding: each frame is downscaled to
+    the working resolution as soon as it is read, and decoding stops once
+    the frame cap or the per-request byte budget is reached.
+    
+    Frames are kept in a contiguous FrameStore; if they exceed
+    memory_budget bytes the store spills to a memory-mapped temp file.
+    
+    Audio is decoded at most once. With decode_audio=True and ffmpeg
+    available, frames and the video's audio track come from a single demux
+    pass; otherwise audio is decoded lazily on first access. When
+    audio_path is given, the video's own audio track is never decoded.
+    
+    A video can also be given as a stream (video_stream). It is decoded
+    through an ffmpeg pipe when the container allows it, and only spooled
+    to tmpfs when random access is needed (see stream_utils.VideoSource).
+    
+    With pipelined=True (the default), decoding runs on its own thread and
+    per-frame analysis overlaps it (see frame_pipeline.FramePipeline): face
+    localisation, the rPPG ROI trace, and the grayscale and thumbnail
+    caches of the FrameStore are all ready when decoding ends.
     """
-    def __init__(self, video_path=None, audio_path=None, doc_path=None, meta_request=None):
+    # Decode limits (None disables a limit)
+    MAX_SIDE = 960                  # Longest side of stored frames, in pixels
+    MAX_FRAMES = 450                # ~15 s at 30 fps
+    MAX_BYTES = 512 * 1024 * 1024   # Budget for stored frames per request
+    MEMORY_BUDGET = 256 * 1024 * 1024  # Resident frame bytes before spilling to disk
+    THUMBNAIL_SIZE = (64, 64)       # Thumbnails cached for frame selection and the duplication check
+    PIPE_CAPACITY_HINT = 64         # Initial frame capacity for piped streams (doubled as needed)
+    
+    def __init__(self, video_path=None, audio_path=None, doc_path=None, meta_request=None,
+                 detect_faces=True, face_detect_every=5,
+                 max_side=MAX_SIDE, max_frames=MAX_FRAMES, max_bytes=MAX_BYTES,
+                 memory_budget=MEMORY_BUDGET, spill_dir=None, decode_audio=False,
+                 video_stream=None, video_suffix='.mp4', pipelined=True, cancel_token=None):
         """
         Initialize IngestCapture with file paths.
         
@@ -26,18 +94,50 @@ class IngestCapture:
             audio_path: Path to audio file (optional if video has audio)
             doc_path: Path to document image
             meta_request: Optional metadata request object
+            detect_faces: Localise the face in each frame (False = full-frame boxes)
+            face_detect_every: Run the face detector every K frames and
+                               interpolate boxes in between
+            max_side: Downscale frames so the longest side is at most this (None = keep source size)
+            max_frames: Stop decoding after this many frames (None = no cap)
+            max_bytes: Stop decoding once stored frames would exceed this many bytes (None = no budget)
+            memory_budget: Resident bytes for frames and derived views before spilling
+                           to a memory-mapped temp file (None = never spill)
+            spill_dir: Directory for spill files (default: system temp dir)
+            decode_audio: Decode audio while ingesting (single pass with the video when
+                          possible). If False, audio is decoded on first access
+                          (not possible for pipe-decoded streams).
+            video_stream: Readable binary stream with the video, used instead of video_path
+            video_suffix: File suffix used if video_stream has to be spooled
+            pipelined: Run per-frame analysis concurrently with decoding
+            cancel_token: Optional pipeline.timeouts.CancellationToken; decoding stops
+                          (with a warning) once it is cancelled
         """
         self.video_path = video_path
         self.audio_path = audio_path
         self.doc_path = doc_path
         self.meta_request = meta_request
+        self.detect_faces = detect_faces
+        self.face_detect_every = face_detect_every
+        self.max_side = max_side
+        self.max_frames = max_frames
+        self.max_bytes = max_bytes
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self.decode_audio = decode_audio
+        self.video_stream = video_stream
+        self.video_suffix = video_suffix
+        self.pipelined = pipelined
+        self.cancel_token = cancel_token
+        self._source = None  # VideoSource for stream input
         
         # Initialize data containers
-        self._frames = []
+        self._frames = FrameStore(memory_budget=memory_budget, spill_dir=spill_dir)
         self._face_boxes = []
+        self._rppg_trace = None
         self._audio = None
         self._sample_rate = 16000
         self._audio_segments = []
+        self._audio_loaded = False
         self._doc_image = None
         self._metadata = {}
         
@@ -45,35 +145,34 @@ class IngestCapture:
         self.total_frames = 0
         self.fps = 0.0
         
+        # Working-resolution bookkeeping. Frames and face boxes are in working
+        # coordinates; divide by scale_factor to map back to the source video.
+        self.source_size = (0, 0)   # (width, height) of the decoded video
+        self.frame_size = (0, 0)    # (width, height) of stored frames
+        self.scale_factor = 1.0
+        self.truncated = False      # True if a frame cap or byte budget stopped decoding
+        self._fingerprint = None
+        
         # Process files on initialization
         self._process()
     
     def _process(self):
         """Process input files and extract frames/audio/metadata."""
-        # Process video
-        if self.video_path and os.path.exists(self.video_path):
+        # Process video (and its audio track, when demuxed in the same pass)
+        if self.video_stream is not None:
+            try:
+                self._extract_video_stream()
+            except Exception as e:
+                print(f"Warning: Error processing video stream: {e}")
+        elif self.video_path and os.path.exists(self.video_path):
             try:
                 self._extract_video_frames()
-                # Try to extract audio from video
-                try:
-                    waveform, sr = load_audio(self.video_path)
-                    self._audio = waveform
-                    self._sample_rate = sr
-                    self._audio_segments = get_vad_segments(waveform, sr)
-                except Exception:
-                    pass
             except Exception as e:
                 print(f"Warning: Error processing video: {e}")
         
-        # Process separate audio file if provided
-        if self.audio_path and os.path.exists(self.audio_path):
-            try:
-                waveform, sr = load_audio(self.audio_path)
-                self._audio = waveform
-                self._sample_rate = sr
-                self._audio_segments = get_vad_segments(waveform, sr)
-            except Exception as e:
-                print(f"Warning: Error processing audio: {e}")
+        # Remaining audio work: separate file, or video audio without ffmpeg
+        if self.decode_audio:
+            self._ensure_audio()
         
         # Process document
         if self.doc_path and os.path.exists(self.doc_path):
@@ -87,8 +186,30 @@ class IngestCapture:
         if self.meta_request is not None:
             self._metadata = collect_meta(self.meta_request)
     
+    def _ensure_audio(self):
+        """Decode audio once, from audio_path if given, else from the video."""
+        if self._audio_loaded:
+            return
+        self._audio_loaded = True
+        
+        source = self.audio_path if self.audio_path else self.video_path
+        if not source or not os.path.exists(source):
+            return
+        try:
+            waveform, sr = load_audio(source, target_sr=self._sample_rate)
+            self._set_audio(waveform, sr)
+        except Exception as e:
+            if self.audio_path:
+                print(f"Warning: Error processing audio: {e}")
+    
+    def _set_audio(self, waveform, sr):
+        self._audio = waveform
+        self._sample_rate = sr
+        self._audio_segments = get_vad_segments(waveform, sr) if waveform is not None else []
+        self._audio_loaded = True
+    
     def _extract_video_frames(self):
-        """Extract frames from video file using OpenCV."""
+        """Extract frames (and, if requested, the audio track) from the video file."""
         if not self.video_path or not os.path.exists(self.video_path):
             return
         
@@ -98,24 +219,190 @@ class IngestCapture:
         self.total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         self.fps = cap.get(cv2.CAP_PROP_FPS)
         
-        frame_id = 0
+        # The first frame fixes the working size (after any rotation OpenCV applies)
+        ret, first_frame = cap.read()
+        if not ret:
+            cap.release()
+            self._face_boxes = []
+            return
+        frame_cap = self._init_working_size(first_frame)
+        
+        # Preallocate the contiguous store for the expected frame count
+        expected = frame_cap
+        if self.total_frames > 0:
+            expected = self.total_frames if expected is None else min(expected, self.total_frames)
+        self._frames = FrameStore(capacity=expected, memory_budget=self.memory_budget,
+                                  spill_dir=self.spill_dir)
+        
+        demuxer = None
+        if self.decode_audio and not self.audio_path and ffmpeg_available():
+            cap.release()
+            demuxer = AVDemuxer(self.video_path, self.frame_size, sample_rate=self._sample_rate)
+            try:
+                self._decode_frames(demuxer.frames(), frame_cap)
+            except RuntimeError as e:
+                # Not decodable by ffmpeg; fall back to OpenCV for frames
+                print(f"Warning: {e}")
+                demuxer.close()
+                demuxer = None
+                cap = cv2.VideoCapture(self.video_path)
+                cap.read()
+        
+        if demuxer is None:
+            self._decode_frames(self._opencv_frames(cap, first_frame), frame_cap)
+            cap.release()
+        else:
+            self._finish_demux(demuxer)
+        
+        if self.truncated:
+            print(f"Warning: Video decoding stopped at {len(self._frames)} frames "
+                  f"(frame cap / memory budget reached)")
+    
+    def _extract_video_stream(self):
+        """Extract frames (and, if requested, the audio track) from video_stream."""
+        self._source = VideoSource.from_stream(self.video_stream, suffix=self.video_suffix,
+                                               allow_pipe=ffmpeg_available())
+        if not self._source.is_pipe:
+            # Spooled (removed again in close()): decode it like any file
+            self.video_path = self._source.path
+            self._extract_video_frames()
+            return
+        
+        demuxer = AVDemuxer(self._source.stream, sample_rate=self._sample_rate,
+                            decode_audio=self.decode_audio)
+        frame_iter = demuxer.frames()
+        try:
+            first_frame = next(frame_iter, None)
+        except RuntimeError as e:
+            print(f"Warning: {e}")
+            first_frame = None
+        if first_frame is None:
+            demuxer.close()
+            self._face_boxes = []
+            return
+        
+        frame_cap = self._init_working_size(first_frame)
+        # The frame count of a pipe is unknown: start small and let the store grow
+        expected = self.PIPE_CAPACITY_HINT if frame_cap is None else min(frame_cap, self.PIPE_CAPACITY_HINT)
+        self._frames = FrameStore(capacity=expected, memory_budget=self.memory_budget,
+                                  spill_dir=self.spill_dir)
+        self._decode_frames(itertools.chain([first_frame], frame_iter), frame_cap)
+        
+        # Container properties (fps) are only known once ffmpeg has read the stream
+        self._finish_demux(demuxer)
+        if not self.truncated:
+            self.total_frames = len(self._frames)
         
+        if self.truncated:
+            print(f"Warning: Video decoding stopped at {len(self._frames)} frames "
+                  f"(frame cap / memory budget reached)")
+    
+    def _finish_demux(self, demuxer):
+        """Stop the demuxer and keep its audio (if it decoded any)."""
+        demuxer.close()
+        if not self.fps:
+            self.fps = demuxer.fps
+        if not demuxer.decode_audio:
+            return
+        waveform = demuxer.audio
+        if waveform is not None and self.truncated and self.fps > 0:
+            # Audio is decoded slightly ahead of the frames; keep the same span
+            waveform = waveform[:int(round(len(self._frames) / self.fps * demuxer.sample_rate))]
+        self._set_audio(waveform, demuxer.sample_rate)
+    
+    @staticmethod
+    def _opencv_frames(cap, first_frame):
+        """Yields the already-read first frame, then the rest of the video."""
+        yield first_frame
         while True:
             ret, frame = cap.read()
             if not ret:
+                return
+            yield frame
+    
+    def _decode_frames(self, frame_iter, frame_cap):
+        """
+        Store frames from `frame_iter` at working size and localise faces as they arrive.
+        
+        Args:
+            frame_iter: Iterator of decoded BGR frames
+            frame_cap: Maximum number of frames to store (None = unbounded)
+        """
+        localizer = FaceLocalizer(detect_every=self.face_detect_every) if self.detect_faces else None
+        
+        if self.pipelined:
+            self._decode_pipelined(self._stored_frames(frame_iter, frame_cap), localizer)
+        else:
+            for frame_id, frame in enumerate(self._stored_frames(frame_iter, frame_cap)):
+                # Face detection runs on keyframes while decoding
+                if localizer is not None:
+                    localizer.observe(frame_id, frame)
+            if localizer is not None:
+                self._face_boxes = localizer.finalize(len(self._frames))
+        
+        if localizer is None:
+            w, h = self.frame_size
+            self._face_boxes = [(0, 0, w, h)] * len(self._frames)
+    
+    def _stored_frames(self, frame_iter, frame_cap):
+        """Copy frames into the store at working size; yields the stored frame views."""
+        frame_id = 0
+        for frame in frame_iter:
+            if self.cancel_token is not None:
+                self.cancel_token.raise_if_cancelled()
+            if frame_cap is not None and frame_id >= frame_cap:
+                # The video had more frames than we are allowed to keep
+                self.truncated = True
                 break
             
-            # Store frame as numpy array
-            self._frames.append(frame)
-            
-            # Create dummy face box (full frame) - real implementation would use face detector
-            h, w = frame.shape[:2]
-            box = (0, 0, w, h)
-            self._face_boxes.append(box)
+            # Downscale immediately so the full-resolution frame is never retained
+            if (frame.shape[1], frame.shape[0]) != self.frame_size:
+                frame = cv2.resize(frame, self.frame_size, interpolation=cv2.INTER_AREA)
             
+            # Copy into the contiguous frame store
+            self._frames.append(frame)
+            yield self._frames[frame_id]
             frame_id += 1
+    
+    def _decode_pipelined(self, stored_frames, localizer):
+        """Decode on a background thread while the per-frame consumers run."""
+        pipeline = FramePipeline()
+        faces = None
+        roi = None
+        if localizer is not None:
+            faces = pipeline.add(FaceBoxConsumer(localizer))
+            if RPPG_AVAILABLE:
+                roi = pipeline.add(RoiMeanConsumer(), source=faces)
+        pipeline.add(CacheConsumer(self._frames.gray))
+        pipeline.add(CacheConsumer(lambda: self._frames.thumbnails(self.THUMBNAIL_SIZE)))
+        
+        pipeline.run(stored_frames)
+        
+        if faces is not None:
+            self._face_boxes = faces.boxes
+        if roi is not None:
+            self._rppg_trace = roi.trace
+    
+    def _init_working_size(self, first_frame):
+        """
+        Derive the working resolution and effective frame cap from the first frame.
         
-        cap.release()
+        Returns:
+            Maximum number of frames to store (None = unbounded)
+        """
+        src_h, src_w = first_frame.shape[:2]
+        self.source_size = (src_w, src_h)
+        channels = first_frame.shape[2] if first_frame.ndim == 3 else 1
+        self.frame_size, self.scale_factor, frame_cap = working_geometry(
+            src_w, src_h, channels * first_frame.itemsize,
+            self.max_side, self.max_frames, self.max_bytes)
+        return frame_cap
+    
+    def scale_box_to_source(self, box):
+        """Map an (x, y, w, h) box from working to source-video coordinates."""
+        if self.scale_factor == 1.0:
+            return tuple(box)
+        return tuple(int(round(v / self.scale_factor)) for v in box)
     
     def get(self, key, default=None):
         """Dict-like access for pipeline compatibility."""
@@ -123,16 +410,22 @@ class IngestCapture:
             return self._frames
         elif key == 'face_boxes':
             return self._face_boxes
+        elif key == 'rppg_trace':
+            return self._rppg_trace
         elif key == 'audio':
-            return self._audio
+            return self.audio
         elif key == 'sample_rate':
-            return self._sample_rate
+            return self.sample_rate
         elif key == 'audio_segments':
-            return self._audio_segments
+            return self.audio_segments
         elif key == 'doc_image':
             return self._doc_image
         elif key == 'metadata':
             return self._metadata
+        elif key == 'scale_factor':
+            return self.scale_factor
+        elif key == 'fingerprint':
+            return self.fingerprint
         else:
             return default
     
@@ -143,9 +436,15 @@ class IngestCapture:
             raise KeyError(f"Key '{key}' not found in IngestCapture")
         return value
     
+    def close(self):
+        """Release decoded frames, spill files and any spooled upload."""
+        self._frames.close()
+        if self._source is not None:
+            self._source.cleanup()
+    
     @property
     def frames(self):
-        """Get extracted video frames."""
+        """Get extracted video frames (FrameStore; list-like, .array for the stack)."""
         return self._frames
     
     @property
@@ -153,19 +452,27 @@ class IngestCapture:
         """Get face bounding boxes."""
         return self._face_boxes
     
+    @property
+    def rppg_trace(self):
+        """Per-frame skin ROI means computed while decoding (None if not pipelined)."""
+        return self._rppg_trace
+    
     @property
     def audio(self):
-        """Get audio waveform."""
+        """Get audio waveform (decoded on first access if not done during ingest)."""
+        self._ensure_audio()
         return self._audio
     
     @property
     def sample_rate(self):
         """Get audio sample rate."""
+        self._ensure_audio()
         return self._sample_rate
     
     @property
     def audio_segments(self):
         """Get voice activity segments."""
+        self._ensure_audio()
         return self._audio_segments
     
     @property
@@ -177,14 +484,98 @@ class IngestCapture:
     def metadata(self):
         """Get metadata."""
         return self._metadata
+    
+    @property
+    def fingerprint(self):
+        """Per-second perceptual hashes of the video (see ingest.fingerprint), computed on first access."""
+        if self._fingerprint is None:
+            self._fingerprint = video_fingerprint(self._frames, self.fps) if len(self._frames) else []
+        return self._fingerprint
 
 
-def capture_from_file(path, meta_request=None):
+def probe_video(video_path, n_frames=1, meta_request=None,
+                max_side=IngestCapture.MAX_SIDE, max_frames=IngestCapture.MAX_FRAMES,
+                max_bytes=IngestCapture.MAX_BYTES, fingerprint=False):
+    """
+    Cheap look at a video for stage 1: container metadata plus a few frames.
+    
+    Only the sampled frames are decoded (by seeking), so quality and
+    metadata checks can reject a submission before the full IngestCapture.
+    The frames are centred on the middle of the span IngestCapture would keep
+    (frame cap and byte budget, see working_geometry) and downscaled the same
+    way, so stage 1 sees the same middle frame.
+    
+    Args:
+        video_path (str): Path to video file.
+        n_frames (int): Number of frames to decode around the middle.
+        meta_request: Optional request object for metadata collection.
+        max_side (int): Downscale frames so the longest side is at most this.
+        max_frames (int): Frame cap of the full capture (used to locate its middle).
+        max_bytes (int): Byte budget of the full capture (also caps the span).
+        fingerprint (bool): Also decode one frame per second of that span and
+                            return its perceptual fingerprint (same as
+                            IngestCapture.fingerprint) under 'fingerprint'.
+    Returns:
+        dict with 'frames', 'frame_indices', 'metadata' and 'container'
+        (fps, total_frames, width, height, duration_sec); usable as a
+        stage 1 capture.
+    """
+    cap = cv2.VideoCapture(video_path)
+    opened = cap.isOpened()
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) if opened else 0
+    fps = cap.get(cv2.CAP_PROP_FPS) if opened else 0.0
+    container = {
+        'fps': fps,
+        'total_frames': total,
+        'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) if opened else 0,
+        'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) if opened else 0,
+        'duration_sec': total / fps if fps > 0 else 0.0
+    }
+    cap.release()
+    
+    frames, indices, hashes = [], [], []
+    if opened:
+        _, _, frame_cap = working_geometry(container['width'], container['height'], 3,
+                                           max_side, max_frames, max_bytes)
+        span = total if frame_cap is None else min(total, frame_cap)
+        middle = max(0, span // 2)
+        if n_frames <= 1 or span <= 1:
+            wanted = [middle]
+        else:
+            wanted = sorted(set(np.linspace(0, span - 1, n_frames + 2, dtype=int)[1:-1].tolist()) | {middle})
+        per_second = second_indices(fps, span) if fingerprint else []
+        # One decode pass for both sets of frames
+        frames, indices = extract_frames(video_path, indices=sorted(set(wanted) | set(per_second)),
+                                         return_indices=True)
+        if per_second:
+            per_second, wanted = set(per_second), set(wanted)
+            hashes = fingerprint_frames([f for f, i in zip(frames, indices) if i in per_second])
+            keep = [k for k, i in enumerate(indices) if i in wanted]
+            frames, indices = [frames[k] for k in keep], [indices[k] for k in keep]
+        
+        if frames:
+            h, w = frames[0].shape[:2]
+            size, scale, _ = working_geometry(w, h, 3, max_side)
+            if scale != 1.0:
+                frames = [cv2.resize(f, size, interpolation=cv2.INTER_AREA) for f in frames]
+    
+    return {
+        'frames': frames,
+        'frame_indices': indices,
+        'metadata': collect_meta(meta_request) if meta_request is not None else {},
+        'container': container,
+        'fingerprint': hashes,
+        'doc_image': None
+    }
+
+
+def capture_from_file(path, meta_request=None, face_detect_every=5):
     """
     Ingest from file path. Returns ProcessedCapture.
     Args:
         path (str): Path to video/audio/document file.
         meta_request: Optional request object for metadata collection.
+        face_detect_every (int): Run the face detector every K frames.
     Returns:
         ProcessedCapture
     """
@@ -199,13 +590,9 @@ def capture_from_file(path, meta_request=None):
     if ext in ['.mp4', '.avi', '.mov', '.mkv']:
         # Extract frames (list of np.ndarray)
         raw_frames = extract_frames(path)
-        # For demo, create FrameInfo with dummy face boxes (real impl: run detector)
-        for i, frame in enumerate(raw_frames):
-            # Dummy: no face detection, just full frame box
-            h, w = frame.shape[:2]
-            box = (0, 0, w, h)
+        face_boxes = FaceLocalizer(detect_every=face_detect_every).localize(raw_frames)
+        for i, box in enumerate(face_boxes):
             frames.append(FrameInfo(frame_id=i, box=box, timestamp=None))
-            face_boxes.append(box)
         # Extract audio from video (librosa can do this if ffmpeg installed)
         try:
             waveform, sr = load_audio(path)
@@ -236,14 +623,34 @@ def capture_from_file(path, meta_request=None):
         meta=meta
     )
 
-def capture_from_stream(stream, meta_request=None):
+def capture_from_stream(stream, meta_request=None, face_detect_every=5, suffix='.mp4'):
     """
-    Ingest from stream. Returns ProcessedCapture.
+    Ingest a video from a stream without writing it to disk. Returns ProcessedCapture.
+    
+    The stream is decoded through an ffmpeg pipe (frames and audio track in
+    one pass) and is only spooled to tmpfs when the container needs random
+    access, e.g. an mp4 whose index is stored after the media data.
     Args:
-        stream: File-like object or video/audio stream.
+        stream: Readable binary file-like object (e.g. io.BytesIO, an upload stream).
         meta_request: Optional request object for metadata collection.
+        face_detect_every (int): Run the face detector every K frames.
+        suffix (str): File suffix used if the stream has to be spooled.
     Returns:
         ProcessedCapture
     """
-    # TODO: Implement stream-based extraction (e.g., OpenCV VideoCapture, BytesIO)
-    raise NotImplementedError("Stream ingestion not implemented yet.")
+    cap = IngestCapture(video_stream=stream, video_suffix=suffix, meta_request=meta_request,
+                        face_detect_every=face_detect_every, decode_audio=True)
+    try:
+        frames = [
+            FrameInfo(frame_id=i, box=box, timestamp=(i / cap.fps) if cap.fps else None)
+            for i, box in enumerate(cap.face_boxes)
+        ]
+        return ProcessedCapture(
+            frames=frames,
+            face_boxes=list(cap.face_boxes),
+            audio_segments=cap.audio_segments,
+            doc_image=None,
+            meta=cap.metadata if meta_request is not None else None
+        )
+    finally:
+        cap.close()
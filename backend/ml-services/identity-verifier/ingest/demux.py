@@ -0,0 +1,269 @@
+"""
+demux.py
+Purpose: Single-pass decoding of video frames and embedded audio with ffmpeg.
+"""
+import os
+import re
+import shutil
+import struct
+import logging
+import tempfile
+import threading
+import subprocess
+import numpy as np
+from typing import Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ffmpeg executable (override with the FFMPEG_BIN environment variable)
+FFMPEG_BIN = os.environ.get('FFMPEG_BIN', 'ffmpeg')
+
+
+def ffmpeg_available() -> bool:
+    """True if the ffmpeg executable can be found."""
+    return shutil.which(FFMPEG_BIN) is not None
+
+
+class AVDemuxer:
+    """
+    Decodes a container once, producing BGR frames and mono PCM together.
+
+    A single ffmpeg process writes raw frames to stdout and 16-bit PCM to a
+    second pipe; a background thread drains the audio pipe so neither output
+    can stall the other. Frames are scaled to `frame_size` by ffmpeg and
+    passed through without frame-rate conversion, like cv2.VideoCapture.
+
+    The source may be a path or a readable file-like object, which is fed
+    to ffmpeg's stdin (the container must then be pipe-decodable, see
+    stream_utils.needs_seeking). Without `frame_size`, frames keep their
+    native size, which is read from each frame's BMP header.
+
+    Usage:
+        demuxer = AVDemuxer(path, (w, h))
+        for frame in demuxer.frames():
+            ...
+        demuxer.close()
+        waveform = demuxer.audio   # float32 in [-1, 1], or None
+    """
+
+    def __init__(self, source, frame_size: Optional[Tuple[int, int]] = None, sample_rate: int = 16000,
+                 decode_audio: bool = True):
+        """
+        Args:
+            source: Video file path, or a readable (ideally seekable) binary stream.
+            frame_size (tuple): (width, height) of the frames to produce (None = native size).
+            sample_rate (int): Output audio sample rate.
+            decode_audio (bool): Also decode the first audio track.
+        """
+        self.source = source
+        self.is_stream = not isinstance(source, str)
+        self.path = '<stream>' if self.is_stream else source
+        self.frame_size = frame_size
+        self.sample_rate = sample_rate
+        self.decode_audio = decode_audio
+
+        self._proc = None
+        self._stderr = None
+        self._audio_thread = None
+        self._feed_thread = None
+        self._audio_chunks = []
+        self._audio = None
+        self._fps = 0.0
+        self._start_pos = None
+        if self.is_stream:
+            try:
+                self._start_pos = source.tell() if source.seekable() else None
+            except (AttributeError, ValueError, OSError):
+                self._start_pos = None
+
+    def _start(self, with_audio: bool):
+        # Stream info (for fps) is only logged at 'info' level
+        cmd = [FFMPEG_BIN, '-v', 'info' if self.is_stream else 'error', '-nostats',
+               '-i', 'pipe:0' if self.is_stream else self.source, '-map', '0:v:0']
+        if self.frame_size is not None:
+            w, h = self.frame_size
+            cmd += ['-vf', f'scale={w}:{h}:flags=area',
+                    '-vsync', '0', '-f', 'rawvideo', '-pix_fmt', 'bgr24', 'pipe:1']
+        else:
+            cmd += ['-vsync', '0', '-f', 'image2pipe', '-c:v', 'bmp', '-pix_fmt', 'bgr24', 'pipe:1']
+
+        audio_r = audio_w = None
+        if with_audio:
+            audio_r, audio_w = os.pipe()
+            cmd += ['-map', '0:a:0', '-ac', '1', '-ar', str(self.sample_rate),
+                    '-f', 's16le', f'pipe:{audio_w}']
+
+        if self._stderr is not None:
+            self._stderr.close()
+        self._stderr = tempfile.TemporaryFile()
+        self._audio_chunks = []
+        try:
+            self._proc = subprocess.Popen(
+                cmd, stdout=subprocess.PIPE, stderr=self._stderr,
+                stdin=subprocess.PIPE if self.is_stream else subprocess.DEVNULL,
+                pass_fds=(audio_w,) if with_audio else ()
+            )
+        finally:
+            if audio_w is not None:
+                os.close(audio_w)
+
+        if self.is_stream:
+            self._feed_thread = threading.Thread(target=self._feed, daemon=True)
+            self._feed_thread.start()
+
+        if with_audio:
+            self._audio_thread = threading.Thread(
+                target=self._drain_audio, args=(audio_r,), daemon=True
+            )
+            self._audio_thread.start()
+
+    def _feed(self):
+        """Copies the source stream into ffmpeg's stdin."""
+        stdin = self._proc.stdin
+        try:
+            while True:
+                chunk = self.source.read(1024 * 1024)
+                if not chunk:
+                    break
+                stdin.write(chunk)
+        except (BrokenPipeError, OSError, ValueError):
+            # ffmpeg exited (error or early close); nothing left to feed
+            pass
+        finally:
+            try:
+                stdin.close()
+            except (BrokenPipeError, OSError):
+                pass
+
+    def _rewind(self) -> bool:
+        """Rewinds a stream source for a retry. Paths need no rewinding."""
+        if not self.is_stream:
+            return True
+        if self._start_pos is None:
+            return False
+        self.source.seek(self._start_pos)
+        return True
+
+    def _drain_audio(self, fd: int):
+        with os.fdopen(fd, 'rb') as pipe:
+            while True:
+                chunk = pipe.read(65536)
+                if not chunk:
+                    break
+                self._audio_chunks.append(chunk)
+
+    def _read_frames(self) -> Iterator[np.ndarray]:
+        if self.frame_size is None:
+            yield from self._read_bmp_frames()
+            return
+        w, h = self.frame_size
+        frame_bytes = w * h * 3
+        while True:
+            buf = self._proc.stdout.read(frame_bytes)
+            if len(buf) < frame_bytes:
+                return
+            yield np.frombuffer(buf, dtype=np.uint8).reshape(h, w, 3)
+
+    def _read_bmp_frames(self) -> Iterator[np.ndarray]:
+        """Parses a stream of 24-bit BMP images (size is in each header)."""
+        while True:
+            header = self._proc.stdout.read(54)
+            if len(header) < 54:
+                return
+            file_size, = struct.unpack_from('<I', header, 2)
+            data_offset, = struct.unpack_from('<I', header, 10)
+            w, h = struct.unpack_from('<ii', header, 18)
+            body = self._proc.stdout.read(file_size - 54)
+            if len(body) < file_size - 54:
+                return
+
+            # Rows are padded to 4 bytes and stored bottom-up when h > 0
+            rows = abs(h)
+            stride = (w * 3 + 3) // 4 * 4
+            start = data_offset - 54
+            pixels = np.frombuffer(body, dtype=np.uint8, count=stride * rows, offset=start)
+            frame = pixels.reshape(rows, stride)[:, :w * 3].reshape(rows, w, 3)
+            yield frame[::-1] if h > 0 else frame
+
+    def frames(self) -> Iterator[np.ndarray]:
+        """
+        Yields decoded frames (read-only HxWx3 uint8 arrays).
+
+        If the file has no audio track, decoding is retried video-only.
+
+        Raises:
+            RuntimeError: If ffmpeg fails before producing any frame.
+        """
+        self._start(self.decode_audio)
+        produced = 0
+        for frame in self._read_frames():
+            produced += 1
+            yield frame
+
+        if produced == 0 and self._finish() != 0:
+            if self.decode_audio and self._rewind():
+                # Most likely no audio stream: ffmpeg rejects the unmatched map
+                logger.debug(f"Demux with audio failed for {self.path}; retrying video-only")
+                self._start(False)
+                for frame in self._read_frames():
+                    produced += 1
+                    yield frame
+            if produced == 0 and self._finish() != 0:
+                raise RuntimeError(f"ffmpeg failed to decode {self.path}: {self._error_text()}")
+
+    def _finish(self) -> int:
+        """Waits for ffmpeg and the audio reader. Returns the exit code."""
+        if self._proc is None:
+            return 0
+        self._proc.stdout.close()
+        code = self._proc.wait()
+        if self._feed_thread is not None:
+            self._feed_thread.join()
+            self._feed_thread = None
+        if self._audio_thread is not None:
+            self._audio_thread.join()
+            self._audio_thread = None
+        return code
+
+    def _log_text(self) -> str:
+        self._stderr.seek(0)
+        return self._stderr.read().decode('utf-8', 'replace')
+
+    def _error_text(self) -> str:
+        lines = self._log_text().strip().splitlines()
+        return '\n'.join(lines[-5:])
+
+    def close(self):
+        """
+        Stops decoding and collects the audio decoded so far.
+
+        When called before all frames were read, the audio holds whatever
+        ffmpeg decoded so far, which may run ahead of the frames read.
+        """
+        if self._proc is None:
+            return
+        if self._proc.poll() is None:
+            self._proc.kill()
+        self._finish()
+        self._proc = None
+        if self._stderr is not None:
+            if self.is_stream:
+                match = re.search(r'Stream #0:\d+.*?Video:.*?([\d.]+) fps', self._log_text())
+                self._fps = float(match.group(1)) if match else 0.0
+            self._stderr.close()
+            self._stderr = None
+
+        if self._audio_chunks:
+            pcm = np.frombuffer(b''.join(self._audio_chunks), dtype=np.int16)
+            self._audio = pcm.astype(np.float32) / 32768.0
+        self._audio_chunks = []
+
+    @property
+    def fps(self) -> float:
+        """Source frame rate reported by ffmpeg for stream sources (0.0 if unknown)."""
+        return self._fps
+
+    @property
+    def audio(self) -> Optional[np.ndarray]:
+        """Mono float32 waveform at `sample_rate`, or None if there was no audio."""
+        return self._audio
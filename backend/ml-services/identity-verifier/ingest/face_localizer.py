@@ -0,0 +1,209 @@
+"""
+face_localizer.py
+Purpose: Face localisation for captured video (detect every K frames, interpolate in between).
+"""
+import os
+import logging
+import threading
+import cv2
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Box = Tuple[int, int, int, int]  # (x, y, w, h)
+
+# OpenCV cascade objects are not safe to share between threads,
+# so each request thread lazily loads its own copy.
+_thread_local = threading.local()
+_CASCADE_FILE = 'haarcascade_frontalface_default.xml'
+
+
+def _get_face_cascade():
+    """Returns this thread's Haar face cascade, or None if it cannot be loaded."""
+    if not hasattr(_thread_local, 'face_cascade'):
+        cascade = None
+        try:
+            cascade = cv2.CascadeClassifier(os.path.join(cv2.data.haarcascades, _CASCADE_FILE))
+            if cascade.empty():
+                logger.warning(f"Face cascade {_CASCADE_FILE} could not be loaded; using full-frame boxes.")
+                cascade = None
+        except Exception as e:
+            logger.warning(f"Face cascade unavailable ({e}); using full-frame boxes.")
+            cascade = None
+        _thread_local.face_cascade = cascade
+    return _thread_local.face_cascade
+
+
+class FaceLocalizer:
+    """
+    Produces one face box per frame for a video sequence.
+
+    The detector runs only on every `detect_every`-th frame; boxes for the
+    frames in between are linearly interpolated from the surrounding
+    detections (and held constant before the first / after the last one).
+    Frames can be fed one at a time with observe() while decoding, since
+    only keyframe boxes need to be remembered.
+    """
+
+    def __init__(
+        self,
+        detect_every: int = 5,
+        detect_width: int = 320,
+        box_scale: float = 1.2,
+        min_face_ratio: float = 0.1
+    ):
+        """
+        Args:
+            detect_every (int): Run the detector every K frames.
+            detect_width (int): Frames are downscaled to this width for detection.
+            box_scale (float): Detected boxes are enlarged by this factor around their
+                               centre so crops include the face boundary.
+            min_face_ratio (float): Minimum face size as a fraction of the detection frame width.
+        """
+        self.detect_every = max(1, int(detect_every))
+        self.detect_width = detect_width
+        self.box_scale = box_scale
+        self.min_face_ratio = min_face_ratio
+        self.reset()
+
+    def reset(self):
+        """Clears state so the localizer can be reused for another sequence."""
+        self._keyframes: Dict[int, Box] = {}
+        self._frame_shape: Optional[Tuple[int, int]] = None
+        self._detections_run = 0
+
+    def detect(self, frame: np.ndarray) -> Optional[Box]:
+        """
+        Detects the largest face in a single frame.
+
+        Args:
+            frame (np.ndarray): BGR or grayscale frame.
+
+        Returns:
+            (x, y, w, h) in frame coordinates, or None if no face was found.
+        """
+        cascade = _get_face_cascade()
+        if cascade is None or frame is None or frame.size == 0:
+            return None
+
+        h, w = frame.shape[:2]
+        scale = min(1.0, self.detect_width / float(w))
+        small = frame if scale == 1.0 else cv2.resize(
+            frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA
+        )
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+        min_side = max(20, int(gray.shape[1] * self.min_face_ratio))
+        faces = cascade.detectMultiScale(
+            gray, scaleFactor=1.1, minNeighbors=5, minSize=(min_side, min_side)
+        )
+        if len(faces) == 0:
+            return None
+
+        # Assume the largest face is the subject
+        fx, fy, fw, fh = max(faces, key=lambda f: f[2] * f[3])
+        return self._expand_box((fx / scale, fy / scale, fw / scale, fh / scale), w, h)
+
+    def observe(self, frame_idx: int, frame: np.ndarray) -> Optional[Box]:
+        """
+        Feeds one decoded frame. Detection runs only on keyframes.
+
+        Args:
+            frame_idx (int): Index of the frame in the sequence.
+            frame (np.ndarray): The decoded frame.
+
+        Returns:
+            The box detected on this frame, or None (not a keyframe, or no face).
+        """
+        if self._frame_shape is None:
+            self._frame_shape = frame.shape[:2]
+        if frame_idx % self.detect_every != 0:
+            return None
+        self._detections_run += 1
+        box = self.detect(frame)
+        if box is not None:
+            self._keyframes[frame_idx] = box
+        return box
+
+    def finalize(self, n_frames: int) -> List[Box]:
+        """
+        Builds the per-frame box list for a sequence of `n_frames` frames.
+
+        Returns:
+            List of (x, y, w, h), one per frame. If no face was ever detected,
+            every box covers the full frame (the legacy behaviour).
+        """
+        if n_frames <= 0:
+            return []
+
+        if not self._keyframes:
+            h, w = self._frame_shape if self._frame_shape else (0, 0)
+            if self._detections_run:
+                logger.info("No face detected in sequence; using full-frame boxes.")
+            return [(0, 0, w, h)] * n_frames
+
+        key_idx = sorted(self._keyframes)
+        return interpolate_boxes(key_idx, [self._keyframes[i] for i in key_idx], range(n_frames))
+
+    def localize(self, frames: List[np.ndarray]) -> List[Box]:
+        """
+        Convenience wrapper: observe every frame and return the per-frame boxes.
+        """
+        self.reset()
+        for i, frame in enumerate(frames):
+            self.observe(i, frame)
+        return self.finalize(len(frames))
+
+    @property
+    def detections_run(self) -> int:
+        """Number of detector invocations for the current sequence."""
+        return self._detections_run
+
+    def _expand_box(self, box, frame_w: int, frame_h: int) -> Box:
+        """Scales a box around its centre and clips it to the frame."""
+        x, y, w, h = box
+        cx, cy = x + w / 2.0, y + h / 2.0
+        w, h = w * self.box_scale, h * self.box_scale
+        x1 = int(max(0, round(cx - w / 2.0)))
+        y1 = int(max(0, round(cy - h / 2.0)))
+        x2 = int(min(frame_w, round(cx + w / 2.0)))
+        y2 = int(min(frame_h, round(cy + h / 2.0)))
+        return (x1, y1, x2 - x1, y2 - y1)
+
+
+def interpolate_boxes(key_idx: List[int], key_boxes: List[Box], frame_idx) -> List[Box]:
+    """
+    Linearly interpolates boxes between keyframes (edge boxes are held).
+
+    Args:
+        key_idx (list): Sorted keyframe indices with a detection.
+        key_boxes (list): The (x, y, w, h) box detected on each keyframe.
+        frame_idx (iterable): Frame indices to produce boxes for.
+
+    Returns:
+        List of integer (x, y, w, h) boxes, one per entry of frame_idx.
+    """
+    key_idx = np.asarray(key_idx, dtype=np.float64)
+    key_boxes = np.asarray(key_boxes, dtype=np.float64)
+    all_idx = np.asarray(list(frame_idx), dtype=np.float64)
+
+    # np.interp holds the edge values outside the keyframe range
+    cols = [np.interp(all_idx, key_idx, key_boxes[:, c]) for c in range(4)]
+    boxes = np.rint(np.stack(cols, axis=1)).astype(int)
+
+    return [tuple(int(v) for v in b) for b in boxes]
+
+
+def localize_faces(frames: List[np.ndarray], detect_every: int = 5) -> List[Box]:
+    """
+    Returns one (x, y, w, h) face box per frame.
+
+    Args:
+        frames (list of np.ndarray): Consecutive BGR frames.
+        detect_every (int): Run the face detector every K frames.
+
+    Returns:
+        List of boxes with the same length as `frames`.
+    """
+    return FaceLocalizer(detect_every=detect_every).localize(frames)
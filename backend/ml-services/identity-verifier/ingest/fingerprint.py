@@ -0,0 +1,92 @@
+"""
+fingerprint.py
+Purpose: Compact perceptual fingerprints of videos for near-duplicate (replay) detection.
+
+A fingerprint is one 64-bit pHash per second of video. pHash keeps the
+signs of the lowest DCT frequencies of a 32x32 grayscale thumbnail, so it
+survives re-encoding, rescaling, mild cropping and colour changes; frames
+of the same video re-encoded stay within a few bits of each other.
+"""
+import cv2
+import numpy as np
+from typing import List, Optional, Sequence
+
+# Seconds of video fingerprinted (one hash per second)
+FINGERPRINT_MAX_SECONDS = 30
+# Frames flatter than this (grayscale std) carry no content (black/blank) and are skipped
+FLAT_FRAME_STD = 2.0
+
+
+def phash(image: np.ndarray, hash_size: int = 8, highfreq_factor: int = 4) -> Optional[int]:
+    """
+    Perceptual hash of an image.
+
+    Args:
+        image (np.ndarray): Grayscale or BGR image (any size).
+        hash_size (int): The hash has hash_size**2 bits (64 by default).
+        highfreq_factor (int): The DCT is taken on a (hash_size * factor)^2 thumbnail.
+
+    Returns:
+        int: The hash as an unsigned integer, or None for a flat (contentless) frame.
+    """
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    side = hash_size * highfreq_factor
+    small = cv2.resize(image, (side, side), interpolation=cv2.INTER_AREA).astype(np.float32)
+    if small.std() < FLAT_FRAME_STD:
+        return None
+    low = cv2.dct(small)[:hash_size, :hash_size]
+    # The DC term is the mean brightness; leave it out of the median
+    bits = (low > np.median(low.ravel()[1:])).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming(a: int, b: int) -> int:
+    """Number of differing bits between two hashes."""
+    return bin(a ^ b).count('1')
+
+
+def second_indices(fps: float, total_frames: int, max_seconds: int = FINGERPRINT_MAX_SECONDS) -> List[int]:
+    """
+    Frame index sampled for each second of video (the middle of the second).
+
+    Args:
+        fps (float): Frame rate.
+        total_frames (int): Frames available.
+        max_seconds (int): Cap on the number of seconds.
+
+    Returns:
+        list of int: One index per whole or partial second.
+    """
+    if fps <= 0 or total_frames <= 0:
+        return []
+    indices = []
+    for second in range(max_seconds):
+        idx = int((second + 0.5) * fps)
+        if idx >= total_frames:
+            break
+        indices.append(idx)
+    # Shorter than half a second: use the middle frame
+    return indices or [total_frames // 2]
+
+
+def fingerprint_frames(frames: Sequence[np.ndarray]) -> List[int]:
+    """Hashes of the given (per-second) frames, skipping flat ones."""
+    hashes = [phash(f) for f in frames]
+    return [h for h in hashes if h is not None]
+
+
+def video_fingerprint(frames: Sequence[np.ndarray], fps: float,
+                      max_seconds: int = FINGERPRINT_MAX_SECONDS) -> List[int]:
+    """
+    Per-second fingerprint of decoded frames (e.g. IngestCapture.frames).
+
+    Args:
+        frames (sequence): Frames from the start of the video.
+        fps (float): Frame rate.
+        max_seconds (int): Cap on the number of seconds hashed.
+
+    Returns:
+        list of int: One pHash per second (flat frames omitted).
+    """
+    return fingerprint_frames([frames[i] for i in second_indices(fps, len(frames), max_seconds)])
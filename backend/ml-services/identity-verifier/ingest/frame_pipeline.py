@@ -0,0 +1,255 @@
+"""
+frame_pipeline.py
+Purpose: Overlap frame decoding with per-frame analysis (producer/consumer queues).
+"""
+import queue
+import logging
+import threading
+import numpy as np
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from .face_localizer import FaceLocalizer, interpolate_boxes
+
+logger = logging.getLogger(__name__)
+
+try:
+    from features.rppg import RPPGTracker
+    RPPG_AVAILABLE = True
+except ImportError:
+    RPPG_AVAILABLE = False
+    RPPGTracker = None
+
+_DONE = object()
+
+
+class FrameConsumer:
+    """
+    One per-frame analysis step in a FramePipeline.
+
+    consume() is called once per item, in frame order, on the consumer's
+    own thread; finish() after the last item. A consumer can pass results
+    on to consumers that were added with it as their source via emit().
+    """
+
+    def __init__(self):
+        self._outputs = []
+        self.error = None
+
+    def consume(self, frame_id: int, item):
+        raise NotImplementedError
+
+    def finish(self):
+        """Called after the last item (not called if consume() failed)."""
+
+    def emit(self, frame_id: int, item):
+        """Send an item to the downstream consumers."""
+        for q in self._outputs:
+            q.put((frame_id, item))
+
+
+class FramePipeline:
+    """
+    Runs frame decoding and per-frame consumers concurrently.
+
+    A decoder thread pulls frames from an iterator and puts each one on a
+    bounded queue per consumer, so decoding runs at most `queue_size`
+    frames ahead of the slowest consumer. The first decoder-fed consumer
+    runs on the calling thread (so thread-local state such as the face
+    cascade is reused across requests); every other consumer gets its own
+    thread. OpenCV and NumPy release the GIL, so the stages overlap.
+
+    Usage:
+        pipeline = FramePipeline()
+        faces = pipeline.add(FaceBoxConsumer(localizer))
+        pipeline.add(RoiMeanConsumer(), source=faces)
+        pipeline.add(CacheConsumer(store.gray))
+        n_frames = pipeline.run(frame_iter)
+    """
+
+    def __init__(self, queue_size: int = 16):
+        """
+        Args:
+            queue_size (int): Capacity of each consumer's frame queue.
+        """
+        self.queue_size = queue_size
+        self._stages = []  # (consumer, source consumer or None)
+
+    def add(self, consumer: FrameConsumer, source: Optional[FrameConsumer] = None) -> FrameConsumer:
+        """
+        Register a consumer, fed by the decoder or by another consumer's emit().
+
+        Returns:
+            The consumer (for chaining).
+        """
+        self._stages.append((consumer, source))
+        return consumer
+
+    def run(self, frames: Iterable[np.ndarray]) -> int:
+        """
+        Decode `frames` on a background thread and feed every consumer.
+
+        Args:
+            frames: Iterator of frames. It is consumed on the decoder thread.
+
+        Returns:
+            int: Number of frames decoded.
+
+        Raises:
+            The first exception raised by the decoder or by a consumer,
+            after all threads have stopped.
+        """
+        queues = {}
+        for consumer, _ in self._stages:
+            queues[id(consumer)] = queue.Queue(maxsize=self.queue_size)
+            consumer._outputs = []
+            consumer.error = None
+        for consumer, source in self._stages:
+            if source is not None:
+                source._outputs.append(queues[id(consumer)])
+
+        roots = [queues[id(c)] for c, source in self._stages if source is None]
+        decoded = [0]
+        decode_error = []
+
+        def decode():
+            try:
+                for frame_id, frame in enumerate(frames):
+                    for q in roots:
+                        q.put((frame_id, frame))
+                    decoded[0] = frame_id + 1
+            except BaseException as e:
+                decode_error.append(e)
+            finally:
+                for q in roots:
+                    q.put(_DONE)
+
+        threads = [threading.Thread(target=decode, name='frame-decoder', daemon=True)]
+        inline = None
+        for consumer, source in self._stages:
+            if inline is None and source is None:
+                inline = consumer
+                continue
+            threads.append(threading.Thread(
+                target=self._work, args=(consumer, queues[id(consumer)]),
+                name=f'frame-{type(consumer).__name__}', daemon=True
+            ))
+
+        for t in threads:
+            t.start()
+        if inline is not None:
+            self._work(inline, queues[id(inline)])
+        for t in threads:
+            t.join()
+
+        if decode_error:
+            raise decode_error[0]
+        for consumer, _ in self._stages:
+            if consumer.error is not None:
+                raise consumer.error
+        return decoded[0]
+
+    @staticmethod
+    def _work(consumer: FrameConsumer, q: queue.Queue):
+        """Consumer loop. After a failure it keeps draining so the decoder never blocks."""
+        while True:
+            entry = q.get()
+            if entry is _DONE:
+                break
+            if consumer.error is not None:
+                continue
+            try:
+                consumer.consume(*entry)
+            except Exception as e:
+                logger.warning(f"{type(consumer).__name__} failed: {e}")
+                consumer.error = e
+
+        try:
+            if consumer.error is None:
+                consumer.finish()
+        except Exception as e:
+            logger.warning(f"{type(consumer).__name__} failed: {e}")
+            consumer.error = e
+        finally:
+            for out in consumer._outputs:
+                out.put(_DONE)
+
+
+class FaceBoxConsumer(FrameConsumer):
+    """
+    Runs a FaceLocalizer on the frames and emits (frame, box) pairs.
+
+    A frame's interpolated box is final once the next keyframe with a
+    detection has been seen, so frames are held only until then and
+    emitted in order; `boxes` equals localizer.finalize() at the end.
+    """
+
+    def __init__(self, localizer: FaceLocalizer):
+        super().__init__()
+        self.localizer = localizer
+        self.boxes = []
+        self._pending = []      # [(frame_id, frame)] awaiting a final box
+        self._last_key = None   # (frame_id, box) of the latest detection
+        self._n = 0
+
+    def consume(self, frame_id: int, frame: np.ndarray):
+        self._n = frame_id + 1
+        self._pending.append((frame_id, frame))
+        box = self.localizer.observe(frame_id, frame)
+        if box is None:
+            return
+
+        if self._last_key is None:
+            # Frames before the first detection hold its box
+            boxes = [box] * len(self._pending)
+        else:
+            key_id, key_box = self._last_key
+            boxes = interpolate_boxes([key_id, frame_id], [key_box, box],
+                                      [i for i, _ in self._pending])
+        self._flush(boxes)
+        self._last_key = (frame_id, box)
+
+    def finish(self):
+        self.boxes = self.localizer.finalize(self._n)
+        self._flush([self.boxes[i] for i, _ in self._pending])
+
+    def _flush(self, boxes: List[Tuple[int, int, int, int]]):
+        for (frame_id, frame), box in zip(self._pending, boxes):
+            self.emit(frame_id, (frame, box))
+        self._pending = []
+
+
+class RoiMeanConsumer(FrameConsumer):
+    """
+    Builds the rPPG trace (green mean of the skin ROI) from (frame, box) pairs.
+
+    Feed it from a FaceBoxConsumer. Wraps a features.rppg.RPPGTracker, so
+    the pulse can be estimated without keeping the frames.
+    """
+
+    def __init__(self, fps: float = 30.0):
+        super().__init__()
+        self.tracker = RPPGTracker(fps=fps)
+
+    @property
+    def trace(self) -> List[float]:
+        return self.tracker.trace
+
+    def consume(self, frame_id: int, item):
+        frame, box = item
+        self.tracker.update(frame, box)
+
+
+class CacheConsumer(FrameConsumer):
+    """
+    Extends a FrameStore cache as frames arrive, e.g. CacheConsumer(store.gray).
+
+    The callable fills the cache up to the frames stored so far, so it is
+    cheap to call once per frame.
+    """
+
+    def __init__(self, fill: Callable[[], np.ndarray]):
+        super().__init__()
+        self.fill = fill
+
+    def consume(self, frame_id: int, frame: np.ndarray):
+        self.fill()
@@ -0,0 +1,335 @@
+"""
+frame_store.py
+Purpose: Contiguous storage for decoded video frames with cached derived views.
+"""
+import bisect
+import logging
+import tempfile
+import threading
+import cv2
+import numpy as np
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _Segments:
+    """
+    Rows of one logical (capacity, *row_shape) uint8 array, stored as a
+    resident head followed by spilled tail segments.
+
+    The head is regrown (doubled) in RAM while it fits the owning store's
+    memory budget; rows beyond the budget go to memory-mapped segments that
+    are appended, never reallocated, so each spill file is written once and
+    held only while its rows are.
+    """
+
+    def __init__(self, store: 'FrameStore', row_shape: Tuple[int, ...]):
+        self.store = store
+        self.row_shape = tuple(row_shape)
+        self.row_bytes = int(np.prod(self.row_shape))
+        self.parts = []      # backing arrays, head first
+        self.starts = []     # first row of each part
+        self.capacity = 0
+
+    def reserve(self, rows: int, preferred: Optional[int] = None):
+        """
+        Make room for at least `rows` rows.
+
+        Args:
+            rows (int): Rows that must fit.
+            preferred (int): Size to grow to if it fits in RAM (default: double,
+                             like list growth); spilled only as far as `rows` needs.
+        """
+        if rows <= self.capacity:
+            return
+        target = max(rows, preferred or self.capacity * 2)
+        if not self.spilled:
+            head_rows = min(target, self.store._fitting_rows(self.row_bytes, self._head_bytes()))
+            if head_rows > (self.parts[0].shape[0] if self.parts else 0):
+                self._regrow_head(head_rows)
+        if rows > self.capacity:
+            self._append(self.store._spill((target - self.capacity,) + self.row_shape))
+
+    def _head_bytes(self) -> int:
+        return self.parts[0].nbytes if self.parts else 0
+
+    def _regrow_head(self, rows: int):
+        head = np.empty((rows,) + self.row_shape, dtype=np.uint8)
+        self.store._resident_bytes += head.nbytes
+        if self.parts:
+            old = self.parts[0]
+            head[:old.shape[0]] = old
+            self.store._resident_bytes -= old.nbytes
+            self.parts[0] = head
+        else:
+            self.parts, self.starts = [head], [0]
+        self.capacity = sum(p.shape[0] for p in self.parts)
+
+    def _append(self, part: np.ndarray):
+        self.starts.append(self.capacity)
+        self.parts.append(part)
+        self.capacity += part.shape[0]
+
+    def row(self, i: int) -> np.ndarray:
+        """Writable view of row i."""
+        k = bisect.bisect_right(self.starts, i) - 1
+        return self.parts[k][i - self.starts[k]]
+
+    def take(self, rows: range) -> np.ndarray:
+        """
+        Rows as one array: a view when they lie in a single part, else a copy.
+        """
+        if len(rows) == 0:
+            return np.empty((0,) + self.row_shape, dtype=np.uint8)
+        first, last = sorted((rows[0], rows[-1]))
+        k = bisect.bisect_right(self.starts, first) - 1
+        if last < self.starts[k] + self.parts[k].shape[0]:
+            base = self.starts[k]
+            stop = rows.stop - base if rows.stop - base >= 0 else None
+            return self.parts[k][rows.start - base:stop:rows.step]
+        return np.stack([self.row(i) for i in rows])
+
+    def iter_rows(self, n: int):
+        """Rows 0..n-1, segment by segment (no copies)."""
+        for start, part in zip(self.starts, self.parts):
+            if start >= n:
+                break
+            yield from part[:n - start]
+
+    @property
+    def spilled(self) -> bool:
+        return any(isinstance(p, np.memmap) for p in self.parts)
+
+
+class FrameStore:
+    """
+    Frame sequence backed by contiguous uint8 (n, H, W, 3) segments.
+
+    Behaves like a read-only list of frames for existing consumers
+    (len(), indexing, iteration, slicing), while exposing the whole stack
+    via `.array` so feature extractors can vectorize over it.
+
+    - Integer indexing returns a view of one frame (no copy).
+    - Slicing returns a FrameStore view sharing the same memory and caches.
+    - gray() and thumbnails() are computed once, incrementally, and cached.
+    - Frames (and derived views) are kept in RAM up to `memory_budget` bytes;
+      only the frames beyond it are written to memory-mapped temp files.
+      `.array` is zero-copy while the requested frames lie in one segment
+      (always, unless spilled); prefer indexing or small slices otherwise.
+    """
+
+    def __init__(self, capacity: Optional[int] = None, memory_budget: Optional[int] = None,
+                 spill_dir: Optional[str] = None):
+        """
+        Args:
+            capacity (int): Expected number of frames (avoids regrowth). Optional.
+            memory_budget (int): Max resident bytes before spilling to disk (None = never spill).
+            spill_dir (str): Directory for spill files (default: system temp dir).
+        """
+        self.capacity_hint = capacity
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+
+        self._data = None            # _Segments of frames
+        self._n = 0
+        self._resident_bytes = 0
+        self._spill_files = []
+        self._gray = None            # [_Segments, n_computed]
+        self._thumbs = {}            # (w, h, gray) -> [_Segments, n_computed]
+        self._lock = threading.Lock()
+
+        # Set on views only
+        self._parent = None
+        self._index = None
+
+    @classmethod
+    def from_frames(cls, frames, memory_budget: Optional[int] = None) -> 'FrameStore':
+        """Build a store from an iterable of equally sized frames."""
+        frames = list(frames)
+        store = cls(capacity=len(frames), memory_budget=memory_budget)
+        for frame in frames:
+            store.append(frame)
+        return store
+
+    # ------------------------------------------------------------------
+    # Allocation
+    # ------------------------------------------------------------------
+    def _fitting_rows(self, row_bytes: int, reusable_bytes: int = 0) -> int:
+        """Rows of `row_bytes` that fit in RAM, counting `reusable_bytes` as freed."""
+        if self.memory_budget is None:
+            return 1 << 62
+        return max(0, self.memory_budget - self._resident_bytes + reusable_bytes) // row_bytes
+
+    def _spill(self, shape: Tuple[int, ...]) -> np.ndarray:
+        """Allocate a uint8 array in a new spill file."""
+        spill = tempfile.TemporaryFile(prefix='framestore_', dir=self.spill_dir)
+        self._spill_files.append(spill)
+        logger.info(f"FrameStore spilling {int(np.prod(shape)) / 1e6:.1f} MB to disk")
+        return np.memmap(spill, dtype=np.uint8, mode='w+', shape=shape)
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+    def append(self, frame: np.ndarray):
+        """
+        Copy one frame into the store.
+
+        Args:
+            frame (np.ndarray): HxWxC uint8 frame with the same shape as previous frames.
+        """
+        if self._parent is not None:
+            raise TypeError("Cannot append to a FrameStore view")
+
+        with self._lock:
+            if self._data is None:
+                self._data = _Segments(self, frame.shape)
+                self._data.reserve(1, preferred=max(1, self.capacity_hint or 64))
+            elif frame.shape != self._data.row_shape:
+                raise ValueError(f"Frame shape {frame.shape} != store shape {self._data.row_shape}")
+
+            self._data.reserve(self._n + 1)
+            self._data.row(self._n)[...] = frame
+            self._n += 1
+
+    # ------------------------------------------------------------------
+    # Read access
+    # ------------------------------------------------------------------
+    def _rows(self) -> range:
+        """Indices of the root store's frames covered by this store or view."""
+        root = self._parent if self._parent is not None else self
+        rows = range(root._n)
+        return rows[self._index] if self._parent is not None else rows
+
+    @property
+    def array(self) -> np.ndarray:
+        """(N, H, W, C) stack of the stored frames (a view unless it spans spilled segments)."""
+        root = self._parent if self._parent is not None else self
+        if root._data is None:
+            return np.empty((0, 0, 0, 3), dtype=np.uint8)
+        return root._data.take(self._rows())
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        root = self._parent if self._parent is not None else self
+        if root._data is None:
+            return (0, 0, 0, 3)
+        return (len(self),) + root._data.row_shape
+
+    @property
+    def is_spilled(self) -> bool:
+        """True if any frames or derived views live in a memory-mapped spill file."""
+        root = self._parent if self._parent is not None else self
+        return bool(root._spill_files)
+
+    @property
+    def nbytes(self) -> int:
+        return int(np.prod(self.shape))
+
+    def __len__(self) -> int:
+        if self._parent is not None:
+            return len(self._rows())
+        return self._n
+
+    def __iter__(self):
+        if self._parent is None and self._data is not None:
+            return self._data.iter_rows(self._n)
+        return (self[i] for i in range(len(self)))
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            view = FrameStore()
+            view._parent = self._parent if self._parent is not None else self
+            view._index = key if self._parent is None else _compose_slices(self._index, key, view._parent._n)
+            return view
+        root = self._parent if self._parent is not None else self
+        if root._data is None:
+            raise IndexError("FrameStore index out of range")
+        return root._data.row(self._rows()[key])
+
+    def __repr__(self) -> str:
+        return f"FrameStore(n={len(self)}, shape={self.shape[1:]}, spilled={self.is_spilled})"
+
+    # ------------------------------------------------------------------
+    # Cached derived views
+    # ------------------------------------------------------------------
+    def gray(self) -> np.ndarray:
+        """
+        Grayscale stack (N, H, W), converted once and cached.
+
+        Returns:
+            np.ndarray view; later appends extend the cache incrementally.
+        """
+        if self._parent is not None:
+            return self._parent.gray()[self._index]
+
+        with self._lock:
+            if self._gray is None:
+                self._gray = [_Segments(self, self._frame_hw()), 0]
+            return self._fill(self._gray, lambda f, dst: cv2.cvtColor(f, cv2.COLOR_BGR2GRAY, dst=dst))
+
+    def thumbnails(self, size: Tuple[int, int] = (64, 64), gray: bool = True) -> np.ndarray:
+        """
+        Small resized copies of every frame, computed once per size and cached.
+
+        Args:
+            size (tuple): (width, height) of each thumbnail.
+            gray (bool): Grayscale (N, h, w) if True, else BGR (N, h, w, 3).
+
+        Returns:
+            np.ndarray view of the thumbnail stack.
+        """
+        if self._parent is not None:
+            return self._parent.thumbnails(size, gray)[self._index]
+
+        w, h = size
+        key = (w, h, gray)
+        with self._lock:
+            if key not in self._thumbs:
+                self._thumbs[key] = [_Segments(self, (h, w) if gray else (h, w, 3)), 0]
+
+            def make_thumb(frame, dst):
+                small = cv2.resize(frame, (w, h), interpolation=cv2.INTER_AREA)
+                if gray and small.ndim == 3:
+                    cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=dst)
+                else:
+                    dst[...] = small
+
+            return self._fill(self._thumbs[key], make_thumb)
+
+    def _frame_hw(self) -> Tuple[int, int]:
+        return self._data.row_shape[:2] if self._data is not None else (0, 0)
+
+    def _fill(self, cache, fn) -> np.ndarray:
+        """Extend a derived cache to cover all stored frames. Caller holds the lock."""
+        segments, done = cache
+        # Sized like the frames, so one reservation usually covers the whole clip
+        segments.reserve(self._n, preferred=self._data.capacity if self._data is not None else None)
+        for i in range(done, self._n):
+            fn(self._data.row(i), segments.row(i))
+        cache[1] = self._n
+        return segments.take(range(self._n))
+
+    def close(self):
+        """Release backing arrays and any spill files."""
+        if self._parent is not None:
+            return
+        with self._lock:
+            self._data = None
+            self._gray = None
+            self._thumbs = {}
+            self._n = 0
+            self._resident_bytes = 0
+            for f in self._spill_files:
+                try:
+                    f.close()
+                except Exception:
+                    pass
+            self._spill_files = []
+
+
+def _compose_slices(outer: slice, inner: slice, length: int) -> slice:
+    """Single slice equivalent to parent[outer][inner], so nested views stay zero-copy."""
+    r = range(length)[outer][inner]
+    stop = r.stop if r.stop >= 0 else None
+    return slice(r.start, stop, r.step)
@@ -6,32 +6,95 @@ import cv2
 import numpy as np
 
 
-def extract_frames(video_path, every_n=1, resize=None, max_frames=None):
+def extract_frames(video_path, every_n=1, resize=None, max_frames=None, frame_skip=None,
+                   indices=None, timestamps=None, seek_gap=None, return_indices=False):
     """
     Extract frames from a video file.
+
+    Only the selected frames are converted to BGR: the rest are skipped with
+    cap.grab(), which demuxes and decodes without the retrieve/convert step.
+    When the next wanted frame is far ahead (more than `seek_gap` frames),
+    the capture seeks instead; the decoder then restarts from the nearest
+    preceding keyframe, so seeking only pays off for gaps of about a GOP or more.
+
     Args:
         video_path (str): Path to video file.
         every_n (int): Extract every n-th frame.
         resize (tuple): (width, height) to resize frames, or None.
         max_frames (int): Maximum number of frames to extract, or None.
+        frame_skip (int): Alias for every_n (takes precedence if given).
+        indices (list of int): Explicit frame indices to extract (overrides every_n).
+        timestamps (list of float): Explicit times in seconds to extract
+                                    (converted to indices using the video fps).
+        seek_gap (int): Seek rather than grab when the next wanted frame is more
+                        than this many frames ahead. Default: 2 seconds of video.
+        return_indices (bool): Also return the index of each extracted frame.
     Returns:
         frames (list of np.ndarray): List of frames (BGR)
+        indices (list of int): Only if return_indices is True.
     """
+    if frame_skip is not None:
+        every_n = frame_skip
+    every_n = max(1, int(every_n))
+
     cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+
+    if timestamps is not None:
+        if fps <= 0:
+            cap.release()
+            raise ValueError(f"Cannot map timestamps to frames: unknown fps for {video_path}")
+        indices = [int(round(t * fps)) for t in timestamps]
+
+    if indices is not None:
+        wanted = sorted(set(int(i) for i in indices if i >= 0))
+    else:
+        wanted = None
+
+    if seek_gap is None:
+        seek_gap = max(30, int(2 * fps))
+
     frames = []
-    count = 0
+    frame_ids = []
+    pos = 0  # index of the frame the next grab() will return
+    target_pos = 0
     while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
+        if max_frames is not None and len(frames) >= max_frames:
             break
-        if count % every_n == 0:
-            if resize is not None:
-                frame = cv2.resize(frame, resize)
-            frames.append(frame)
-            if max_frames is not None and len(frames) >= max_frames:
+
+        # Next frame index to materialize
+        if wanted is not None:
+            if target_pos >= len(wanted):
                 break
-        count += 1
+            target = wanted[target_pos]
+        else:
+            target = pos + (-pos % every_n)
+
+        if target - pos > seek_gap:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+            pos = target
+
+        # Skip intermediate frames without converting them
+        ok = True
+        while pos < target and ok:
+            ok = cap.grab()
+            pos += 1
+        if not ok or not cap.grab():
+            break
+        pos += 1
+
+        ret, frame = cap.retrieve()
+        if not ret:
+            break
+        if resize is not None:
+            frame = cv2.resize(frame, resize)
+        frames.append(frame)
+        frame_ids.append(target)
+        target_pos += 1
+
     cap.release()
+    if return_indices:
+        return frames, frame_ids
     return frames
 
 def align_face_crop(frame, box, output_size=(224, 224), landmarks=None):
@@ -53,3 +116,92 @@ def align_face_crop(frame, box, output_size=(224, 224), landmarks=None):
         pass
     crop = cv2.resize(face, output_size)
     return crop
+
+
+# Motion-adaptive selection defaults (thumbnail grey levels / dHash bits)
+MOTION_MAD_THRESHOLD = 3.0
+MOTION_DHASH_THRESHOLD = 4
+
+
+def dhash(thumb, hash_size=8):
+    """
+    Difference hash of an image: one bit per horizontally adjacent pixel pair.
+    Args:
+        thumb (np.ndarray): Grayscale or BGR image (any size).
+        hash_size (int): Bits per row/column (hash has hash_size**2 bits).
+    Returns:
+        bits (np.ndarray): Boolean array of hash_size**2 bits
+    """
+    if thumb.ndim == 3:
+        thumb = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(thumb, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    return (small[:, 1:] > small[:, :-1]).ravel()
+
+
+def select_changed_frames(thumbs, method='mad', threshold=None, size=(64, 64)):
+    """
+    Keep only frames that changed noticeably since the last kept frame.
+
+    Each frame is compared with the last *selected* frame (not its
+    predecessor), so slow drift is still picked up once it adds up.
+    The first frame is always kept.
+
+    Args:
+        thumbs (np.ndarray or list): Thumbnail stack (e.g. FrameStore.thumbnails())
+                                     or full frames (downsampled to `size` here).
+        method (str): 'mad' (mean absolute difference of grey levels) or
+                      'dhash' (Hamming distance of difference hashes).
+        threshold (float): Change needed to keep a frame. Default:
+                           MOTION_MAD_THRESHOLD or MOTION_DHASH_THRESHOLD.
+        size (tuple): (width, height) used when full frames are given.
+    Returns:
+        selected (list of int): Indices of the kept frames, ascending
+    """
+    if method not in ('mad', 'dhash'):
+        raise ValueError(f"Unknown frame change method '{method}'")
+    if threshold is None:
+        threshold = MOTION_MAD_THRESHOLD if method == 'mad' else MOTION_DHASH_THRESHOLD
+
+    def prepare(img):
+        if img.shape[1] != size[0] or img.shape[0] != size[1]:
+            img = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+        if img.ndim == 3:
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        return dhash(img) if method == 'dhash' else img.astype(np.int16)
+
+    selected = []
+    ref = None
+    for i in range(len(thumbs)):
+        cur = prepare(thumbs[i])
+        if ref is None:
+            change = np.inf
+        elif method == 'mad':
+            change = np.abs(cur - ref).mean()
+        else:
+            change = np.count_nonzero(cur != ref)
+        if change > threshold:
+            selected.append(i)
+            ref = cur
+    return selected
+
+
+def propagate_scores(selected, scores, n):
+    """
+    Give every frame the score of the nearest scored frame.
+    Args:
+        selected (list of int): Ascending indices of the scored frames.
+        scores (list of float): Score of each selected frame.
+        n (int): Total number of frames.
+    Returns:
+        all_scores (np.ndarray): Per-frame scores, length n (empty if nothing scored)
+    """
+    if not selected or n <= 0:
+        return np.zeros(0)
+    selected = np.asarray(selected)
+    scores = np.asarray(scores, dtype=float)
+    idx = np.arange(n)
+    # Nearest selected frame: compare the neighbours on either side
+    right = np.clip(np.searchsorted(selected, idx), 0, len(selected) - 1)
+    left = np.clip(right - 1, 0, len(selected) - 1)
+    use_left = np.abs(idx - selected[left]) <= np.abs(selected[right] - idx)
+    return scores[np.where(use_left, left, right)]
@@ -0,0 +1,175 @@
+"""
+stream_utils.py
+Purpose: Helpers for ingesting uploads from file-like streams without temp files.
+"""
+import os
+import errno
+import hashlib
+import shutil
+import struct
+import logging
+import tempfile
+from typing import BinaryIO, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bytes inspected at the start of a stream to decide how to decode it
+HEAD_BYTES = 64 * 1024
+
+
+def _default_spool_dir() -> Optional[str]:
+    """Memory-backed tmpfs if available, else the system temp dir (None)."""
+    shm = '/dev/shm'
+    if os.path.isdir(shm) and os.access(shm, os.W_OK):
+        return shm
+    return None
+
+
+# Spool directory for uploads that must be read from a path
+SPOOL_DIR = os.environ.get('INGEST_SPOOL_DIR') or _default_spool_dir()
+
+
+def needs_seeking(head: bytes) -> bool:
+    """
+    Whether a container cannot be decoded from a pipe.
+
+    ISO BMFF files (mp4/mov/3gp) are only pipe-decodable when the 'moov'
+    index precedes the media data ("faststart"). Other containers (webm,
+    mkv, avi, ...) can be demuxed sequentially.
+
+    Args:
+        head (bytes): The first bytes of the file (see HEAD_BYTES).
+
+    Returns:
+        bool: True if the decoder needs random access to the file.
+    """
+    if len(head) < 8 or head[4:8] != b'ftyp':
+        return False
+
+    offset = 0
+    while offset + 8 <= len(head):
+        size, box_type = struct.unpack_from('>I4s', head, offset)
+        if box_type == b'moov':
+            return False
+        if box_type == b'mdat':
+            return True
+        if size == 1:
+            if offset + 16 > len(head):
+                break
+            size = struct.unpack_from('>Q', head, offset + 8)[0]
+        if size < 8:
+            # size 0 means "to end of file": no moov before the data
+            return True
+        offset += size
+
+    # moov not found in the inspected head; be safe
+    return True
+
+
+def peek_head(stream: BinaryIO, n: int = HEAD_BYTES) -> bytes:
+    """Read the first n bytes of a seekable stream without consuming them."""
+    pos = stream.tell()
+    head = stream.read(n)
+    stream.seek(pos)
+    return head
+
+
+def is_seekable(stream) -> bool:
+    try:
+        return bool(stream.seekable())
+    except (AttributeError, ValueError):
+        return False
+
+
+def sha256_stream(stream: BinaryIO, chunk_size: int = 1024 * 1024) -> str:
+    """
+    SHA-256 of a stream, read in chunks (the stream is rewound afterwards if seekable).
+
+    Returns:
+        str: Hex digest.
+    """
+    start = stream.tell() if is_seekable(stream) else None
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(chunk_size), b''):
+        digest.update(chunk)
+    if start is not None:
+        stream.seek(start)
+    return digest.hexdigest()
+
+
+def sha256_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 (hex) of a file, read in chunks."""
+    with open(path, 'rb') as f:
+        return sha256_stream(f, chunk_size)
+
+
+def spool_stream(stream: BinaryIO, suffix: str = '', spool_dir: Optional[str] = SPOOL_DIR) -> str:
+    """
+    Copy a stream to a file, on tmpfs when available.
+
+    Args:
+        stream: Readable file-like object (read from its current position).
+        suffix (str): File suffix, e.g. '.mp4', to help decoders sniff the format.
+        spool_dir (str): Target directory (default: SPOOL_DIR). If it runs out of
+                         space, seekable streams are spooled to the system temp dir.
+
+    Returns:
+        str: Path of the spooled file. The caller is responsible for deleting it.
+    """
+    start = stream.tell() if is_seekable(stream) else None
+    fd, path = tempfile.mkstemp(prefix='ingest_', suffix=suffix, dir=spool_dir)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            shutil.copyfileobj(stream, f, 1024 * 1024)
+    except OSError as e:
+        os.remove(path)
+        # tmpfs is small (64 MB by default in containers); retry on disk
+        if e.errno != errno.ENOSPC or spool_dir is None or start is None:
+            raise
+        logger.warning(f"Spool dir {spool_dir} is full; spooling to disk instead")
+        stream.seek(start)
+        return spool_stream(stream, suffix=suffix, spool_dir=None)
+    return path
+
+
+class VideoSource:
+    """
+    A video upload ready for decoding, either from its stream or from a path.
+
+    The stream is decoded through a pipe when possible. It is spooled to
+    tmpfs only when the decoder needs random access: the container is not
+    pipe-decodable, ffmpeg is unavailable (OpenCV reads paths only), or
+    the stream itself cannot be rewound.
+    """
+
+    def __init__(self, stream: Optional[BinaryIO] = None, path: Optional[str] = None,
+                 spooled: bool = False):
+        self.stream = stream
+        self.path = path
+        self.spooled = spooled
+
+    @classmethod
+    def from_stream(cls, stream: BinaryIO, suffix: str = '.mp4', allow_pipe: bool = True) -> 'VideoSource':
+        """
+        Args:
+            stream: Upload stream (e.g. FileStorage.stream or io.BytesIO).
+            suffix (str): Suffix used if the stream has to be spooled.
+            allow_pipe (bool): Permit pipe decoding (requires ffmpeg).
+        """
+        if allow_pipe and is_seekable(stream) and not needs_seeking(peek_head(stream)):
+            return cls(stream=stream)
+
+        path = spool_stream(stream, suffix=suffix)
+        logger.debug(f"Spooled video upload to {path}")
+        return cls(path=path, spooled=True)
+
+    @property
+    def is_pipe(self) -> bool:
+        return self.stream is not None
+
+    def cleanup(self):
+        """Delete the spooled file, if any."""
+        if self.spooled and self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        self.spooled = False
+
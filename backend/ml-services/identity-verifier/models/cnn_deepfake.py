@@ -20,13 +20,25 @@ except ImportError:
     torch = None
 
 
-def get_detector(name: str = 'xception', checkpoint: Optional[str] = None):
+def get_detector(
+    name: str = 'xception',
+    checkpoint: Optional[str] = None,
+    device: str = 'cuda',
+    use_pool: bool = True
+):
     """
     Factory function to get deepfake detector wrapper.
     
+    Detectors are shared through the process-wide DetectorPool, so repeated
+    calls with the same (name, checkpoint, device) return the already loaded
+    model instead of rebuilding it.
+    
     Args:
         name: Model name ('xception' or 'efficientnet')
         checkpoint: Optional custom checkpoint path. If None, uses model registry default.
+        device: Target device ('cuda' or 'cpu'). Falls back to CPU if CUDA is unavailable.
+        use_pool: If False, build a private instance that is not shared
+                  (e.g. when the caller attaches hooks to the model).
         
     Returns:
         Detector wrapper with predict() method
@@ -44,6 +56,12 @@ def get_detector(name: str = 'xception', checkpoint: Optional[str] = None):
             "To use CNN models, activate the ML environment: conda activate idv-ml"
         )
     
+    if name not in ('xception', 'efficientnet'):
+        raise ValueError(
+            f"Unknown model name '{name}'. "
+            f"Supported: 'xception', 'efficientnet'"
+        )
+    
     from models.model_registry import get_model_path
     
     # Get default checkpoint from registry if not provided
@@ -59,29 +77,38 @@ def get_detector(name: str = 'xception', checkpoint: Optional[str] = None):
                     'exports',
                     'xception_ffpp.pth'
                 )
-            elif name == 'efficientnet':
+            else:
                 checkpoint = os.path.join(
                     os.path.dirname(__file__),
                     'exports',
                     'efficientnet_b0_df.pth'
                 )
-            else:
-                raise ValueError(f"Unknown model name: {name}")
     
-    # Instantiate wrapper
+    # Resolve the device up front so 'cuda' and its CPU fallback share a pool entry
+    if device == 'cuda' and not torch.cuda.is_available():
+        device = 'cpu'
+    
+    if not use_pool:
+        return _build_detector(name, checkpoint, device)
+    
+    from models.detector_pool import get_detector_pool
+    
+    key = (name, os.path.abspath(checkpoint), device)
+    return get_detector_pool().get(
+        key, lambda: _build_detector(name, checkpoint, device)
+    )
+
+
+def _build_detector(name: str, checkpoint: str, device: str):
+    """Instantiate a detector wrapper (uncached)."""
     if name == 'xception':
         from models.xception_wrapper import XceptionWrapper
-        detector = XceptionWrapper(checkpoint_path=checkpoint)
-    elif name == 'efficientnet':
-        from models.efficientnet_wrapper import EfficientNetWrapper
-        detector = EfficientNetWrapper(checkpoint_path=checkpoint)
+        detector = XceptionWrapper(checkpoint_path=checkpoint, device=device)
     else:
-        raise ValueError(
-            f"Unknown model name '{name}'. "
-            f"Supported: 'xception', 'efficientnet'"
-        )
+        from models.efficientnet_wrapper import EfficientNetWrapper
+        detector = EfficientNetWrapper(checkpoint_path=checkpoint, device=device)
     
-    logger.info(f"Loaded {name} detector from {checkpoint}")
+    logger.info(f"Loaded {name} detector from {checkpoint} on {device}")
     return detector
 
 
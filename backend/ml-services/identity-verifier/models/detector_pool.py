@@ -0,0 +1,185 @@
+"""
+Process-wide pool of loaded deepfake detectors.
+Keeps constructed CNN wrappers alive across requests so the model graph,
+checkpoint load and device transfer are paid once per (model, checkpoint, device).
+"""
+
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+# Default memory cap for all pooled detectors (parameters + buffers).
+# Xception is ~90 MB and EfficientNet-B0 ~20 MB in float32.
+DEFAULT_MAX_MEMORY_MB = 512
+
+
+def estimate_detector_bytes(detector: Any) -> int:
+    """
+    Estimate the resident size of a detector from its model tensors.
+
+    Args:
+        detector: Wrapper exposing a torch ``model`` attribute
+
+    Returns:
+        Size in bytes of all parameters and buffers (0 if unknown)
+    """
+    model = getattr(detector, 'model', None)
+    if model is None or not hasattr(model, 'parameters'):
+        return 0
+
+    total = 0
+    for tensor in list(model.parameters()) + list(model.buffers()):
+        total += tensor.numel() * tensor.element_size()
+    return total
+
+
+class DetectorPool:
+    """
+    Thread-safe LRU cache of detector wrappers bounded by a memory cap.
+
+    Loads are lazy and happen at most once per key even when several
+    request threads ask for the same model at the same time.
+    """
+
+    def __init__(self, max_memory_mb: float = DEFAULT_MAX_MEMORY_MB):
+        """
+        Initialize the pool.
+
+        Args:
+            max_memory_mb: Upper bound on the summed size of pooled detectors.
+                           The most recently used detector is always kept,
+                           even if it alone exceeds the cap.
+        """
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+
+        self._entries = OrderedDict()  # key -> (detector, nbytes)
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._load_locks: Dict[Hashable, threading.Lock] = {}
+
+        self.counters = {
+            'hits': 0,
+            'loads': 0,
+            'evictions': 0,
+            'load_errors': 0
+        }
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Return the pooled detector for ``key``, building it with ``loader`` on a miss.
+
+        Args:
+            key: Pool key, e.g. (model_name, checkpoint_path, device)
+            loader: Zero-argument callable that constructs the detector
+
+        Returns:
+            Detector instance shared by all callers using the same key
+        """
+        detector = self._lookup(key)
+        if detector is not None:
+            return detector
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Serialize loads per key only; other keys keep loading in parallel
+        with load_lock:
+            detector = self._lookup(key)
+            if detector is not None:
+                return detector
+
+            try:
+                detector = loader()
+            except Exception:
+                with self._lock:
+                    self.counters['load_errors'] += 1
+                raise
+
+            nbytes = estimate_detector_bytes(detector)
+
+            with self._lock:
+                self._entries[key] = (detector, nbytes)
+                self._memory_bytes += nbytes
+                self.counters['loads'] += 1
+                self._evict_locked()
+
+            logger.info(
+                f"DetectorPool loaded {key} ({nbytes / 1e6:.1f} MB, "
+                f"pool={self._memory_bytes / 1e6:.1f} MB)"
+            )
+            return detector
+
+    def _lookup(self, key: Hashable) -> Any:
+        """Return a cached detector and mark it most recently used."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.counters['hits'] += 1
+            return entry[0]
+
+    def _evict_locked(self):
+        """Drop least recently used entries until under the cap. Caller holds the lock."""
+        while self._memory_bytes > self.max_memory_bytes and len(self._entries) > 1:
+            key, (_, nbytes) = self._entries.popitem(last=False)
+            self._memory_bytes -= nbytes
+            self.counters['evictions'] += 1
+            logger.info(f"DetectorPool evicted {key} ({nbytes / 1e6:.1f} MB)")
+
+        if self._memory_bytes > self.max_memory_bytes:
+            logger.warning(
+                f"DetectorPool holds {self._memory_bytes / 1e6:.1f} MB, "
+                f"above cap of {self.max_memory_bytes / 1e6:.1f} MB"
+            )
+
+    def clear(self):
+        """Drop all pooled detectors (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._memory_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of pool state for monitoring.
+
+        Returns:
+            dict with hit/load/eviction counters, entry count and memory usage
+        """
+        with self._lock:
+            stats = dict(self.counters)
+            stats['entries'] = len(self._entries)
+            stats['memory_bytes'] = self._memory_bytes
+            stats['max_memory_bytes'] = self.max_memory_bytes
+            stats['keys'] = [list(k) if isinstance(k, tuple) else k for k in self._entries]
+        return stats
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+
+# Singleton instance
+_pool_instance = None
+_pool_lock = threading.Lock()
+
+
+def get_detector_pool() -> DetectorPool:
+    """
+    Returns the process-wide detector pool.
+
+    The memory cap can be set with the DETECTOR_POOL_MAX_MB environment variable.
+    """
+    global _pool_instance
+    if _pool_instance is None:
+        with _pool_lock:
+            if _pool_instance is None:
+                max_mb = float(os.environ.get('DETECTOR_POOL_MAX_MB', DEFAULT_MAX_MEMORY_MB))
+                _pool_instance = DetectorPool(max_memory_mb=max_mb)
+    return _pool_instance
@@ -4,6 +4,7 @@ Lighter-weight alternative for real-time inference with CPU fallback.
 """
 
 import logging
+import threading
 from typing import List
 import numpy as np
 
@@ -11,15 +12,13 @@ import numpy as np
 try:
     import torch
     import torch.nn as nn
-    from torchvision import transforms
     HAS_TORCH = True
 except ImportError:
     HAS_TORCH = False
     torch = None
     nn = None
-    transforms = None
 
-from PIL import Image
+from models.model_utils import resize_batch_into
 
 logger = logging.getLogger(__name__)
 
@@ -62,12 +61,13 @@ class EfficientNetWrapper:
         self.model.to(self.device)
         self.model.eval()
         
-        # Preprocessing transforms
-        self.transform = transforms.Compose([
-            transforms.Resize((self.INPUT_SIZE, self.INPUT_SIZE)),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=self.IMAGENET_MEAN, std=self.IMAGENET_STD)
-        ])
+        # Normalization constants in 0-255 scale, shaped for NCHW broadcasting
+        self._mean = torch.tensor(self.IMAGENET_MEAN, device=self.device).view(1, 3, 1, 1) * 255.0
+        self._std = torch.tensor(self.IMAGENET_STD, device=self.device).view(1, 3, 1, 1) * 255.0
+        
+        # Per-thread uint8 resize buffer, reused across predict() calls
+        # (the wrapper is shared through the detector pool)
+        self._buffers = threading.local()
         
         logger.info(f"EfficientNetWrapper initialized on {self.device}")
     
@@ -126,6 +126,28 @@ class EfficientNetWrapper:
             logger.error(f"Error loading checkpoint: {e}")
             raise
     
+    def _preprocess_batch(self, frames: List[np.ndarray]) -> torch.Tensor:
+        """
+        Preprocess a batch of frames for model input.
+        
+        Frames are resized into a reusable uint8 NHWC buffer, moved to the
+        device as uint8, then converted to normalized NCHW float in one op.
+        
+        Args:
+            frames: List of HxWx3 uint8 RGB numpy arrays
+            
+        Returns:
+            Preprocessed tensor (N, 3, 224, 224) on self.device
+        """
+        batch, self._buffers.array = resize_batch_into(
+            frames, self.INPUT_SIZE, getattr(self._buffers, 'array', None)
+        )
+        
+        batch = torch.from_numpy(batch).to(self.device)
+        batch = (batch.permute(0, 3, 1, 2).float() - self._mean) / self._std
+        
+        return batch.contiguous()
+    
     def _preprocess_frame(self, frame: np.ndarray) -> torch.Tensor:
         """
         Preprocess single frame for model input.
@@ -136,16 +158,7 @@ class EfficientNetWrapper:
         Returns:
             Preprocessed tensor (1, 3, 224, 224)
         """
-        # Convert numpy to PIL
-        if frame.dtype != np.uint8:
-            frame = (frame * 255).astype(np.uint8)
-        
-        pil_image = Image.fromarray(frame)
-        
-        # Apply transforms
-        tensor = self.transform(pil_image)
-        
-        return tensor.unsqueeze(0)  # Add batch dimension
+        return self._preprocess_batch([frame])
     
     def predict(self, frames: List[np.ndarray], batch_size: int = 32) -> List[float]:
         """
@@ -169,10 +182,7 @@ class EfficientNetWrapper:
                 batch_frames = frames[i:i + batch_size]
                 
                 # Preprocess batch
-                batch_tensors = [
-                    self._preprocess_frame(frame) for frame in batch_frames
-                ]
-                batch = torch.cat(batch_tensors, dim=0).to(self.device)
+                batch = self._preprocess_batch(batch_frames)
                 
                 # Forward pass
                 logits = self.model(batch)
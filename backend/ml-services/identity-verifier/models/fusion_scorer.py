@@ -204,6 +204,37 @@ class FusionScorer:
         
         return final_score, breakdown
 
+    # Safest and riskiest value of each score() input
+    INPUT_RANGE = {
+        'deepfake_prob': (0.0, 1.0),
+        'liveness_ok': (True, False),
+        'blur_score': (200.0, 0.0),
+        'rppg_ok': (True, False),
+        'opticalflow_ok': (True, False)
+    }
+
+    def score_bounds(self, signals: Dict, pending: List[str]) -> Tuple[float, float]:
+        """
+        Range of the final score while some inputs are still being computed.
+
+        The score is a weighted sum of per-input risks, so its extremes are
+        reached with every pending input at its safest or riskiest value.
+
+        Args:
+            signals (dict): score() inputs known so far.
+            pending (list): score() inputs not computed yet (keys of INPUT_RANGE).
+
+        Returns:
+            Tuple of (lowest, highest) final score reachable.
+        """
+        safest = dict(signals)
+        riskiest = dict(signals)
+        for name in pending:
+            safest[name], riskiest[name] = self.INPUT_RANGE[name]
+        low, _ = self.score(safest)
+        high, _ = self.score(riskiest)
+        return float(low), float(high)
+
     def calibrate(self, raw_score: float) -> float:
         """
         Optional: Fits the output distribution to a probability curve.
@@ -1,8 +1,9 @@
 import time
+import cv2
 import numpy as np
 import os
 import json
-from typing import Callable, Tuple, Any, List
+from typing import Callable, Tuple, Any, List, Optional
 
 def warmup_model(
     inference_func: Callable[[np.ndarray], Any], 
@@ -76,6 +77,41 @@ def softmax(x: np.ndarray) -> np.ndarray:
     e_x = np.exp(x - np.max(x))
     return e_x / e_x.sum(axis=0)
 
+def resize_batch_into(
+    frames: List[np.ndarray],
+    size: int,
+    buffer: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Resizes HxWx3 frames straight into a reusable (N, size, size, 3) uint8 buffer.
+
+    The buffer is only reallocated when it is too small for the batch, so
+    callers can keep it between calls and avoid per-frame allocations.
+
+    Args:
+        frames (list): HxWx3 images (uint8, or float in [0, 1]).
+        size (int): Output height and width.
+        buffer (np.ndarray): Optional buffer from a previous call.
+
+    Returns:
+        Tuple of:
+            - batch: (len(frames), size, size, 3) uint8 view into the buffer
+            - buffer: the (possibly reallocated) backing buffer
+    """
+    n = len(frames)
+    if buffer is None or buffer.shape[0] < n or buffer.shape[1:] != (size, size, 3):
+        buffer = np.empty((n, size, size, 3), dtype=np.uint8)
+
+    for i, frame in enumerate(frames):
+        if frame.dtype != np.uint8:
+            frame = (frame * 255).astype(np.uint8)
+        h, w = frame.shape[:2]
+        # INTER_AREA for downscaling avoids aliasing, similar to an antialiased resize
+        interp = cv2.INTER_AREA if (h > size or w > size) else cv2.INTER_LINEAR
+        cv2.resize(frame, (size, size), dst=buffer[i], interpolation=interp)
+
+    return buffer[:n], buffer
+
 def quantize_weights_mock(model_path: str, output_path: str):
     """
     Placeholder for model quantization (Float32 -> Int8).
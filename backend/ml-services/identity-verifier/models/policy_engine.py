@@ -1,4 +1,4 @@
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
@@ -35,6 +35,8 @@ class PolicyEngine:
             'rppg_confidence': 0.10,    # If pulse signal is non-existent (inverted check).
             'video_fake_prob': 0.85     # Phase 2: If deepfake prob very high, block
         }
+        # Raw signals read by the hard rules above
+        self.override_signals = ('video_fake_prob', 'audio_spoof_score', 'rppg_conf')
         
         # Mock Blocklist/Allowlist (In prod, connect to Redis/DB)
         self.user_blocklist = ["user_fraud_123", "banned_device_99"]
@@ -120,12 +122,52 @@ class PolicyEngine:
             decision = 'REVIEW'
             action_code = 1 # Suggest Step-Up Auth (OTP/Bio-Challenge)
             reasons.append(f"Score {fused_score:.2f} requires manual review or step-up")
+        elif raw_signals.get('missing_signals'):
+            # Never auto-trust on an incomplete picture (signals that timed out or failed)
+            decision = 'REVIEW'
+            action_code = 1
+            reasons.append(f"Signals unavailable: {', '.join(raw_signals['missing_signals'])}; step-up required")
         else:
             decision = 'TRUSTED'
             reasons.append("Score within safe limits")
 
         return self._build_response(decision, action_code, fused_score, reasons, risk_category)
 
+    def settled_decision(
+        self,
+        score_low: float,
+        score_high: float,
+        raw_signals: Dict[str, Any],
+        context: Dict[str, Any] = None,
+        pending_signals: List[str] = ()
+    ) -> Optional[str]:
+        """
+        Decision that holds whatever the signals still being computed return.
+
+        Args:
+            score_low (float): Lowest fused score the pending signals can produce.
+            score_high (float): Highest fused score the pending signals can produce.
+            raw_signals (dict): Raw signals known so far.
+            context (dict): As for apply_policy().
+            pending_signals (list): Raw signal names not computed yet.
+
+        Returns:
+            str: 'TRUSTED', 'REVIEW' or 'BLOCK' if already settled, else None.
+        """
+        low = self.apply_policy(score_low, raw_signals, context)['final_decision']
+        # More risk never lifts a block (blocklist, hard rule or score)
+        if low == 'BLOCK':
+            return low
+        high = self.apply_policy(score_high, raw_signals, context)['final_decision']
+        if low != high:
+            return None
+        # A pending signal could still trip a hard rule, unless the allowlist wins first
+        user_id = (context or {}).get('user_id', '')
+        if user_id not in self.user_allowlist and \
+                any(name in self.override_signals for name in pending_signals):
+            return None
+        return low
+
     def _build_response(
         self, 
         decision: str, 
@@ -0,0 +1,241 @@
+"""
+fingerprint_index.py
+Purpose: Persistent near-duplicate index of past video fingerprints (replay detection).
+
+Each submission's per-second pHashes (ingest.fingerprint) are stored in
+SQLite with multi-index hashing: every 64-bit hash is split into three
+21-22 bit chunks, each indexed separately. Two hashes within MATCH_RADIUS
+= 11 bits must agree to within three bits on at least one chunk
+(pigeonhole), so a lookup only probes the chunk values at distance <= 3
+(~1800 per chunk) and reads ~0.1% of the stored hashes instead of all.
+Candidates come from a few sampled seconds of the query and are then
+compared second by second with their full stored fingerprint.
+"""
+import os
+import time
+import sqlite3
+import logging
+import threading
+from itertools import combinations
+from collections import defaultdict
+from contextlib import closing
+from typing import Any, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = "temp_storage/fingerprints.sqlite3"
+DEFAULT_RETENTION_SEC = 30 * 24 * 3600
+
+CHUNK_BITS = (22, 21, 21)
+CHUNKS = len(CHUNK_BITS)
+# Largest Hamming distance for two frames to count as the same content
+# (re-encoding, rescaling: ~0 bits; a 5% crop: ~10; unrelated frames: 20+)
+MATCH_RADIUS = 11
+# Bits probed per chunk; CHUNKS * (PROBE_RADIUS + 1) > MATCH_RADIUS
+# guarantees that every hash within MATCH_RADIUS is found
+PROBE_RADIUS = MATCH_RADIUS // CHUNKS
+# A submission replays a past one when this share of its seconds match it
+MIN_SIMILARITY = 0.6
+# ... and at least this many seconds match
+MIN_MATCHED_SECONDS = 2
+# Query seconds used to find candidate submissions
+LOOKUP_SECONDS = 4
+# Candidates (most sampled seconds matched first) compared in full
+MAX_CANDIDATES = 20
+# Prune expired submissions after this many insertions (per process)
+PRUNE_EVERY = 1000
+
+
+def _chunks(h: int) -> List[int]:
+    chunks, shift = [], 0
+    for bits in CHUNK_BITS:
+        chunks.append((h >> shift) & ((1 << bits) - 1))
+        shift += bits
+    return chunks
+
+
+def _probes(chunk: int, chunk_bits: int) -> List[int]:
+    """The chunk value and every value within PROBE_RADIUS bits of it."""
+    probes = []
+    for r in range(PROBE_RADIUS + 1):
+        for bits in combinations(range(chunk_bits), r):
+            flip = 0
+            for b in bits:
+                flip |= 1 << b
+            probes.append(chunk ^ flip)
+    return probes
+
+
+def _to_signed(h: int) -> int:
+    # SQLite integers are signed 64-bit
+    return h - (1 << 64) if h >= (1 << 63) else h
+
+
+def _distance(stored: int, h: int) -> int:
+    """Hamming distance between a stored (signed) hash and an unsigned one."""
+    return bin((stored + (1 << 64) if stored < 0 else stored) ^ h).count('1')
+
+
+class FingerprintIndex:
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, retention_sec: float = DEFAULT_RETENTION_SEC):
+        """
+        SQLite-backed multi-index hash of past submissions.
+
+        Args:
+            db_path (str): Database file (created if missing).
+            retention_sec (float): Submissions older than this are pruned.
+        """
+        self.db_path = db_path
+        self.retention_sec = retention_sec
+        self._inserts = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS videos (
+                    video_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    audit_id TEXT,
+                    user_id TEXT,
+                    seconds INTEGER NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS hashes (
+                    video_id INTEGER NOT NULL,
+                    second INTEGER NOT NULL,
+                    hash INTEGER NOT NULL,
+                    c0 INTEGER NOT NULL, c1 INTEGER NOT NULL, c2 INTEGER NOT NULL
+                )
+            """)
+            for i in range(CHUNKS):
+                conn.execute(f"CREATE INDEX IF NOT EXISTS hashes_c{i} ON hashes (c{i})")
+            conn.execute("CREATE INDEX IF NOT EXISTS hashes_video ON hashes (video_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS videos_created ON videos (created_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def add(self, fingerprint: Sequence[int], audit_id: Optional[str] = None,
+            user_id: Optional[str] = None) -> Optional[int]:
+        """
+        Indexes a submission's fingerprint.
+
+        Returns:
+            int: The new video id, or None for an empty fingerprint.
+        """
+        if not fingerprint:
+            return None
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN")
+            cur = conn.execute(
+                "INSERT INTO videos (audit_id, user_id, seconds, created_at) VALUES (?, ?, ?, ?)",
+                (audit_id, user_id, len(fingerprint), now)
+            )
+            video_id = cur.lastrowid
+            conn.executemany(
+                "INSERT INTO hashes (video_id, second, hash, c0, c1, c2) VALUES (?, ?, ?, ?, ?, ?)",
+                [(video_id, second, _to_signed(h), *_chunks(h)) for second, h in enumerate(fingerprint)]
+            )
+            conn.execute("COMMIT")
+
+        with self._lock:
+            self._inserts += 1
+            prune = self._inserts % PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+        return video_id
+
+    def lookup(self, fingerprint: Sequence[int], max_age_sec: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Finds the past submission that `fingerprint` most likely replays.
+
+        Args:
+            fingerprint (sequence): Per-second hashes of the new submission.
+            max_age_sec (float): Only consider submissions this recent (default: retention).
+
+        Returns:
+            dict: {'audit_id', 'user_id', 'similarity' (share of seconds matched),
+                   'matched_seconds', 'created_at'} of the best match reaching
+                   MIN_SIMILARITY, or None.
+        """
+        if not fingerprint:
+            return None
+        since = time.time() - (max_age_sec or self.retention_sec)
+        n = len(fingerprint)
+        sampled = sorted({int(i * n / LOOKUP_SECONDS) for i in range(min(LOOKUP_SECONDS, n))})
+        hits = defaultdict(int)   # video_id -> sampled seconds with a near-identical stored frame
+
+        with closing(self._connect()) as conn:
+            for second in sampled:
+                h = fingerprint[second]
+                probes = [_probes(c, bits) for c, bits in zip(_chunks(h), CHUNK_BITS)]
+                where = " OR ".join(f"c{i} IN ({','.join('?' * len(p))})" for i, p in enumerate(probes))
+                rows = conn.execute(
+                    f"SELECT DISTINCT video_id, hash FROM hashes WHERE {where}",
+                    [v for p in probes for v in p]
+                ).fetchall()
+                near = {row['video_id'] for row in rows if _distance(row['hash'], h) <= MATCH_RADIUS}
+                for video_id in near:
+                    hits[video_id] += 1
+
+            best = None
+            for video_id in sorted(hits, key=hits.get, reverse=True)[:MAX_CANDIDATES]:
+                video = conn.execute(
+                    "SELECT audit_id, user_id, created_at FROM videos WHERE video_id = ? AND created_at > ?",
+                    (video_id, since)
+                ).fetchone()
+                if video is None:
+                    continue
+                stored = [row['hash'] for row in conn.execute("SELECT hash FROM hashes WHERE video_id = ?", (video_id,))]
+                matched = sum(1 for h in fingerprint if any(_distance(s, h) <= MATCH_RADIUS for s in stored))
+                similarity = matched / n
+                if similarity >= MIN_SIMILARITY and matched >= min(MIN_MATCHED_SECONDS, n) and \
+                        (best is None or similarity > best['similarity']):
+                    best = {'audit_id': video['audit_id'], 'user_id': video['user_id'],
+                            'similarity': similarity, 'matched_seconds': matched,
+                            'created_at': video['created_at']}
+        return best
+
+    def prune(self) -> int:
+        """Drops submissions older than the retention period. Returns how many."""
+        cutoff = time.time() - self.retention_sec
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN")
+            conn.execute(
+                "DELETE FROM hashes WHERE video_id IN (SELECT video_id FROM videos WHERE created_at <= ?)",
+                (cutoff,)
+            )
+            removed = conn.execute("DELETE FROM videos WHERE created_at <= ?", (cutoff,)).rowcount
+            conn.execute("COMMIT")
+        if removed:
+            logger.info(f"Pruned {removed} expired fingerprints")
+        return removed
+
+
+# Singleton instance
+_fingerprint_index = None
+_fingerprint_index_lock = threading.Lock()
+
+
+def get_fingerprint_index() -> Optional[FingerprintIndex]:
+    """
+    Get the process-wide FingerprintIndex, or None if FINGERPRINT_INDEX_ENABLED=0.
+
+    Configured by FINGERPRINT_DB_PATH and FINGERPRINT_RETENTION_SEC.
+    """
+    global _fingerprint_index
+    if os.environ.get('FINGERPRINT_INDEX_ENABLED', '1') == '0':
+        return None
+    if _fingerprint_index is None:
+        with _fingerprint_index_lock:
+            if _fingerprint_index is None:
+                _fingerprint_index = FingerprintIndex(
+                    db_path=os.environ.get('FINGERPRINT_DB_PATH', DEFAULT_DB_PATH),
+                    retention_sec=float(os.environ.get('FINGERPRINT_RETENTION_SEC', DEFAULT_RETENTION_SEC))
+                )
+    return _fingerprint_index
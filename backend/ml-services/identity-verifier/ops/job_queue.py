@@ -0,0 +1,306 @@
+"""
+job_queue.py
+Purpose: Persistent queue and bounded worker pool for asynchronous verification jobs.
+
+Jobs live in a local SQLite database, so they survive restarts and can be
+claimed safely by every serving process (e.g. preforked gunicorn workers).
+A claimed job is leased: its worker renews `heartbeat_at` while it runs,
+and a job whose lease lapsed (its process died) is queued again.
+"""
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+import urllib.request
+from contextlib import closing
+from urllib.parse import urlparse
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'QUEUED'
+RUNNING = 'RUNNING'
+DONE = 'DONE'
+FAILED = 'FAILED'
+
+DEFAULT_DB_PATH = "temp_storage/jobs.sqlite3"
+# A RUNNING job not heartbeated for this long is considered orphaned (JOB_LEASE_SEC)
+DEFAULT_LEASE_SEC = 60.0
+# Webhooks may only call these hosts (comma-separated; JOB_WEBHOOK_HOSTS)
+DEFAULT_WEBHOOK_HOSTS = "localhost,127.0.0.1"
+
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while max_pending jobs are already waiting."""
+    pass
+
+
+class JobQueue:
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, max_pending: int = 0,
+                 lease_sec: float = DEFAULT_LEASE_SEC):
+        """
+        SQLite-backed job queue.
+
+        Args:
+            db_path (str): Database file (created if missing).
+            max_pending (int): Reject submissions beyond this many queued jobs (0 = unbounded).
+            lease_sec (float): Seconds a RUNNING job stays claimed without a heartbeat.
+        """
+        self.db_path = db_path
+        self.max_pending = max_pending
+        self.lease_sec = lease_sec
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    audit_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    webhook_url TEXT,
+                    result TEXT,
+                    http_status INTEGER,
+                    error TEXT,
+                    worker_pid INTEGER,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    heartbeat_at REAL
+                )
+            """)
+            columns = [row['name'] for row in conn.execute("PRAGMA table_info(jobs)")]
+            if 'heartbeat_at' not in columns:
+                # Databases created before leases: legacy RUNNING jobs expire from started_at
+                conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # One short-lived connection per call: safe across threads and forked processes
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def submit(self, audit_id: str, payload: Dict[str, Any], webhook_url: Optional[str] = None):
+        """
+        Adds a job in QUEUED state.
+
+        Raises:
+            QueueFull: If max_pending jobs are already queued.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            if self.max_pending:
+                (pending,) = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()
+                if pending >= self.max_pending:
+                    conn.execute("ROLLBACK")
+                    raise QueueFull(f"{pending} jobs already queued")
+            conn.execute(
+                "INSERT INTO jobs (audit_id, status, payload, webhook_url, created_at) VALUES (?, ?, ?, ?, ?)",
+                (audit_id, QUEUED, json.dumps(payload), webhook_url, time.time())
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """
+        Atomically moves the oldest QUEUED job to RUNNING.
+
+        Returns:
+            dict: The claimed job, or None if the queue is empty.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker_pid = ?, started_at = ?, heartbeat_at = ? "
+                "WHERE audit_id = ?",
+                (RUNNING, os.getpid(), now, now, row['audit_id'])
+            )
+            conn.execute("COMMIT")
+            return self._to_dict(row, status=RUNNING)
+        finally:
+            conn.close()
+
+    def heartbeat(self, audit_ids):
+        """Renews the lease of RUNNING jobs held by this process."""
+        with closing(self._connect()) as conn:
+            conn.executemany(
+                "UPDATE jobs SET heartbeat_at = ? WHERE audit_id = ? AND status = ?",
+                [(time.time(), audit_id, RUNNING) for audit_id in audit_ids]
+            )
+
+    def complete(self, audit_id: str, result: Dict[str, Any], http_status: int = 200):
+        self._finish(audit_id, DONE, result=json.dumps(result), http_status=http_status)
+
+    def fail(self, audit_id: str, error: str):
+        self._finish(audit_id, FAILED, error=error, http_status=500)
+
+    def _finish(self, audit_id: str, status: str, result: str = None, error: str = None,
+                http_status: int = None):
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, http_status = ?, finished_at = ? "
+                "WHERE audit_id = ?",
+                (status, result, error, http_status, time.time(), audit_id)
+            )
+
+    def get(self, audit_id: str) -> Optional[Dict[str, Any]]:
+        """Returns the job (status, result, timings) or None if unknown."""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE audit_id = ?", (audit_id,)).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def requeue_orphans(self) -> int:
+        """
+        Puts RUNNING jobs whose lease lapsed (their worker died, e.g. a restart)
+        back in the queue.
+
+        Returns:
+            int: Number of jobs requeued.
+        """
+        with closing(self._connect()) as conn:
+            requeued = conn.execute(
+                "UPDATE jobs SET status = ?, worker_pid = NULL, heartbeat_at = NULL "
+                "WHERE status = ? AND COALESCE(heartbeat_at, started_at, 0) < ?",
+                (QUEUED, RUNNING, time.time() - self.lease_sec)
+            ).rowcount
+        if requeued:
+            logger.warning(f"Requeued {requeued} jobs orphaned by a dead worker")
+        return requeued
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row, status: str = None) -> Dict[str, Any]:
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        job['result'] = json.loads(job['result']) if job.get('result') else None
+        if status:
+            job['status'] = status
+        return job
+
+
+def webhook_allowed(url: str) -> bool:
+    """True if `url` is http(s) and its host is in JOB_WEBHOOK_HOSTS."""
+    parsed = urlparse(url or '')
+    hosts = os.environ.get('JOB_WEBHOOK_HOSTS', DEFAULT_WEBHOOK_HOSTS).split(',')
+    return parsed.scheme in ('http', 'https') and parsed.hostname in [h.strip() for h in hosts if h.strip()]
+
+
+class JobWorkerPool:
+    def __init__(self, queue: JobQueue, handler: Callable[[Dict[str, Any], str], Tuple[Dict[str, Any], int]],
+                 workers: int = 1, poll_interval: float = 1.0, webhook_timeout: float = 5.0):
+        """
+        Bounded pool of threads that run queued jobs.
+
+        A lease thread renews the heartbeat of the jobs running here every
+        third of the queue's lease and requeues jobs whose lease lapsed.
+
+        Args:
+            queue (JobQueue): Where jobs are claimed from.
+            handler (Callable): handler(payload, audit_id) -> (result dict, http status).
+            workers (int): Jobs run concurrently by this process.
+            poll_interval (float): Seconds between queue polls when idle (jobs
+                                   submitted by other processes are picked up this way).
+            webhook_timeout (float): Seconds allowed for each webhook callback.
+        """
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.webhook_timeout = webhook_timeout
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._running = set()
+        self._running_lock = threading.Lock()
+
+    def start(self):
+        """Starts the worker threads (once per process; call again after a fork)."""
+        with self._lock:
+            if any(t.is_alive() for t in self._threads):
+                return
+            self.queue.requeue_orphans()
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self._loop, name=f'verify-job-{i}', daemon=True)
+                for i in range(self.workers)
+            ]
+            self._threads.append(threading.Thread(target=self._keep_leases, name='verify-job-lease',
+                                                  daemon=True))
+            for t in self._threads:
+                t.start()
+
+    def notify(self):
+        """Wakes an idle worker (after a submission)."""
+        self._wake.set()
+
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            job = self.queue.claim()
+            if job is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            self._run(job)
+
+    def _keep_leases(self):
+        while not self._stop.wait(self.queue.lease_sec / 3.0):
+            with self._running_lock:
+                running = list(self._running)
+            try:
+                if running:
+                    self.queue.heartbeat(running)
+                if self.queue.requeue_orphans():
+                    self._wake.set()
+            except sqlite3.Error as e:
+                logger.warning(f"Job lease renewal failed: {e}")
+
+    def _run(self, job: Dict[str, Any]):
+        audit_id = job['audit_id']
+        logger.info(f"[{audit_id}] Job started (queued {time.time() - job['created_at']:.1f}s)")
+        with self._running_lock:
+            self._running.add(audit_id)
+        try:
+            result, http_status = self.handler(job['payload'], audit_id)
+            self.queue.complete(audit_id, result, http_status)
+        except Exception as e:
+            logger.error(f"[{audit_id}] Job failed: {e}", exc_info=True)
+            self.queue.fail(audit_id, str(e))
+        finally:
+            with self._running_lock:
+                self._running.discard(audit_id)
+        if job.get('webhook_url'):
+            self._callback(job['webhook_url'], self.queue.get(audit_id))
+
+    def _callback(self, url: str, job: Dict[str, Any]):
+        """POSTs the finished job as JSON. Failures are logged, not retried."""
+        body = json.dumps({
+            'audit_id': job['audit_id'],
+            'status': job['status'],
+            'http_status': job['http_status'],
+            'result': job['result'],
+            'error': job['error']
+        }).encode('utf-8')
+        req = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'}, method='POST')
+        try:
+            with urllib.request.urlopen(req, timeout=self.webhook_timeout) as resp:
+                logger.info(f"[{job['audit_id']}] Webhook {url} answered {resp.status}")
+        except Exception as e:
+            logger.warning(f"[{job['audit_id']}] Webhook {url} failed: {e}")
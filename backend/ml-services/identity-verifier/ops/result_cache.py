@@ -0,0 +1,166 @@
+"""
+result_cache.py
+Purpose: Cache of verification results keyed by the content hash of the submitted media.
+
+Retried uploads and replayed videos return the stored result instead of
+rerunning the pipeline. Entries live in a small in-process LRU and in a
+SQLite file shared by every serving process; both tiers expire after a TTL
+and are bounded in size.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import closing
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = "temp_storage/result_cache.sqlite3"
+DEFAULT_TTL_SEC = 3600.0
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_MEMORY_ENTRIES = 256
+
+# Request fields that change the outcome for the same media: allow/blocklists
+# (user_id, ip), action-specific thresholds and the deepfake model
+CONTEXT_KEYS = ('user_id', 'action', 'model_name', 'ip')
+
+
+def cache_key(media_sha256: str, context: Dict[str, Any]) -> str:
+    """Key for `media_sha256` submitted with `context` (only CONTEXT_KEYS matter)."""
+    fields = json.dumps([media_sha256] + [context.get(k) for k in CONTEXT_KEYS], default=str)
+    return hashlib.sha256(fields.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, ttl_sec: float = DEFAULT_TTL_SEC,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, memory_entries: int = DEFAULT_MEMORY_ENTRIES):
+        """
+        Two-tier (memory + SQLite) result cache.
+
+        Args:
+            db_path (str): SQLite file (created if missing); None keeps only the memory tier.
+            ttl_sec (float): Entry lifetime.
+            max_entries (int): Bound of the SQLite tier (oldest entries are evicted).
+            memory_entries (int): Bound of the in-process LRU tier.
+        """
+        self.db_path = db_path
+        self.ttl_sec = ttl_sec
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        if db_path:
+            os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+            with closing(self._connect()) as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS results (
+                        key TEXT PRIMARY KEY,
+                        audit_id TEXT,
+                        response TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        hits INTEGER NOT NULL DEFAULT 0
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS results_created ON results (created_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Looks up a live entry and counts the hit.
+
+        Returns:
+            dict: {'response', 'audit_id', 'created_at', 'hits'} (hits includes
+                  this one), or None on a miss.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry['created_at'] > self.ttl_sec:
+                del self._memory[key]
+                entry = None
+
+        if self.db_path:
+            with closing(self._connect()) as conn:
+                if entry is None:
+                    row = conn.execute(
+                        "SELECT audit_id, response, created_at, hits FROM results WHERE key = ? AND created_at > ?",
+                        (key, now - self.ttl_sec)
+                    ).fetchone()
+                    if row is None:
+                        return None
+                    entry = {'audit_id': row['audit_id'], 'response': json.loads(row['response']),
+                             'created_at': row['created_at'], 'hits': row['hits']}
+                # Hits are counted in SQLite so every process sees them
+                conn.execute("UPDATE results SET hits = hits + 1 WHERE key = ?", (key,))
+                row = conn.execute("SELECT hits FROM results WHERE key = ?", (key,)).fetchone()
+                hits = row['hits'] if row is not None else entry['hits'] + 1
+        elif entry is None:
+            return None
+        else:
+            hits = entry['hits'] + 1
+
+        entry = dict(entry, hits=hits)
+        self._remember(key, entry)
+        return {**entry, 'response': json.loads(json.dumps(entry['response']))}
+
+    def put(self, key: str, response: Dict[str, Any], audit_id: Optional[str] = None):
+        """Stores a response (replacing any previous one) and evicts expired/excess entries."""
+        now = time.time()
+        self._remember(key, {'audit_id': audit_id, 'response': response, 'created_at': now, 'hits': 0})
+        if not self.db_path:
+            return
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, audit_id, response, created_at, hits) VALUES (?, ?, ?, ?, 0)",
+                (key, audit_id, json.dumps(response), now)
+            )
+            conn.execute("DELETE FROM results WHERE created_at <= ?", (now - self.ttl_sec,))
+            conn.execute(
+                "DELETE FROM results WHERE key IN "
+                "(SELECT key FROM results ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def _remember(self, key: str, entry: Dict[str, Any]):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+
+# Singleton instance
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """
+    Get the process-wide ResultCache, or None if RESULT_CACHE_ENABLED=0.
+
+    Configured by RESULT_CACHE_DB_PATH, RESULT_CACHE_TTL_SEC,
+    RESULT_CACHE_MAX_ENTRIES and RESULT_CACHE_MEMORY_ENTRIES.
+    """
+    global _result_cache
+    if os.environ.get('RESULT_CACHE_ENABLED', '1') == '0':
+        return None
+    if _result_cache is None:
+        with _result_cache_lock:
+            if _result_cache is None:
+                _result_cache = ResultCache(
+                    db_path=os.environ.get('RESULT_CACHE_DB_PATH', DEFAULT_DB_PATH),
+                    ttl_sec=float(os.environ.get('RESULT_CACHE_TTL_SEC', DEFAULT_TTL_SEC)),
+                    max_entries=int(os.environ.get('RESULT_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)),
+                    memory_entries=int(os.environ.get('RESULT_CACHE_MEMORY_ENTRIES', DEFAULT_MEMORY_ENTRIES))
+                )
+    return _result_cache
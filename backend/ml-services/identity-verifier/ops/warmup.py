@@ -0,0 +1,107 @@
+"""
+warmup.py
+Purpose: Load models once in the serving master process, before workers are forked.
+
+Forked workers inherit the master's memory copy-on-write. Model weights are
+large buffers that are only ever read after loading, so their pages stay
+shared and N workers cost roughly one copy of the weights instead of N.
+"""
+import gc
+import os
+import logging
+from typing import Dict, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+def preload_models(detectors: Sequence[str] = ('xception',)) -> Dict[str, str]:
+    """
+    Load every model a request can touch into this process.
+
+    Only loads weights: no forward pass runs here, so the torch/OpenMP
+    thread pools are first started in the workers (they do not survive
+    fork). Nothing here may start threads either (e.g. the inference
+    batcher or signal executor), for the same reason.
+
+    Args:
+        detectors: Deepfake CNNs to load through get_detector().
+
+    Returns:
+        dict: component -> 'loaded' or the error message.
+    """
+    status = {}
+
+    def load(name, fn):
+        try:
+            fn()
+            status[name] = 'loaded'
+        except Exception as e:
+            logger.warning(f"Preload of {name} failed: {e}")
+            status[name] = str(e)
+
+    try:
+        import torch
+        # One intra-op thread while loading; workers pick their own count
+        torch.set_num_threads(1)
+    except ImportError:
+        torch = None
+
+    from models.cnn_deepfake import get_detector, get_deepfake_cnn
+    from models.fusion_scorer import get_fusion_scorer
+    from models.policy_engine import get_policy_engine
+    from models.face_embedder import get_face_embedder
+    from models.audio_spoof_detector import get_spoof_detector
+    from models.asv import get_asv_model
+    from ingest.face_localizer import _get_face_cascade
+
+    for name in detectors:
+        load(f'detector:{name}', lambda name=name: get_detector(name=name))
+    load('deepfake_cnn', get_deepfake_cnn)
+    load('fusion_scorer', get_fusion_scorer)
+    load('policy_engine', get_policy_engine)
+    load('face_embedder', get_face_embedder)        # dlib models
+    load('spoof_detector', get_spoof_detector)
+    load('asv', get_asv_model)
+    # Cascades are per thread; sync workers serve on the thread that forked them
+    load('face_cascade', _get_face_cascade)
+
+    logger.info(f"Preloaded models: {status}")
+    return status
+
+
+def freeze_heap():
+    """
+    Move every object allocated so far out of the garbage collector's view.
+
+    The cyclic GC writes to the headers of the objects it scans, which would
+    copy the preloaded pages into each worker; frozen objects are skipped.
+    """
+    gc.collect()
+    if hasattr(gc, 'freeze'):
+        gc.freeze()
+
+
+def configure_worker_threads(workers: int, cores: int = None) -> int:
+    """
+    Split the machine's cores between the forked workers.
+
+    Args:
+        workers: Number of worker processes.
+        cores: Cores available (default: os.cpu_count()).
+
+    Returns:
+        int: Intra-op threads set for this worker.
+    """
+    cores = cores or os.cpu_count() or 1
+    threads = max(1, cores // max(1, workers))
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    try:
+        import cv2
+        cv2.setNumThreads(threads)
+    except ImportError:
+        pass
+    return threads
@@ -21,6 +21,10 @@ from .orchestrator import VerificationOrchestrator
 # Expose exception handling for timeouts
 from .timeouts import VerificationTimeout, TimeoutConfig
 
+# Expose the concurrent Stage 2 signal executor
+from .signal_executor import SignalExecutor, SignalTask, get_signal_executor
+from .signal_graph import SignalGraph, ArtifactCache
+
 # Expose audit utilities
 from .audit_id import generate_audit_id
 
@@ -32,6 +36,11 @@ __all__ = [
     "VerificationOrchestrator",
     "VerificationTimeout",
     "TimeoutConfig",
+    "SignalExecutor",
+    "SignalTask",
+    "get_signal_executor",
+    "SignalGraph",
+    "ArtifactCache",
     "generate_audit_id",
     "run_stage1",
     "run_stage2"
@@ -18,13 +18,17 @@ except ImportError:
 from models.fusion_scorer import get_fusion_scorer
 from models.policy_engine import get_policy_engine
 
+from pipeline.signal_graph import ArtifactCache
+from pipeline.timeouts import RequestBudget, TimeoutConfig, VerificationTimeout
+
 class VerificationOrchestrator:
     def __init__(self, config: Dict[str, Any] = None):
         """
         The Master Controller for the identity verification workflow.
         
         Args:
-            config: Configuration dict (timeouts, feature flags).
+            config: Configuration dict (timeouts, feature flags). 'cascade': True
+                    runs Stage 2 as an early-exit cascade (see _run_cascade).
         """
         self.config = config or {}
         self.fusion_scorer = get_fusion_scorer()
@@ -87,7 +91,12 @@ class VerificationOrchestrator:
         """
         start_time = time.time()
         audit_id = generate_audit_id()
-        context = context or {}
+        context = dict(context or {})
+        # Every stage draws on one request-wide budget (see pipeline.timeouts)
+        budget = context.setdefault('budget', RequestBudget(
+            total_sec=self.config.get('total_timeout_sec', TimeoutConfig.TOTAL_REQUEST_LIMIT_SEC),
+            start_time=start_time
+        ))
         
         self.logger.info(f"[{audit_id}] Starting verification for User {context.get('user_id', 'Unknown')}")
 
@@ -121,24 +130,51 @@ class VerificationOrchestrator:
         # --- STEP 2: HEAVY CHECKS (Stage 2) ---
         # Checks: Deepfake CNN, RPPG Liveness, Voice Anti-Spoof
         stage2_signals = {}
+        missing = []
+        cascade = None
         
         # Only run Stage 2 if Stage 1 didn't flag "Fast Pass" (optional)
         # or if we need high assurance.
         if stage2:
             try:
                 # We pass stage1 results in case they help optimize stage 2
-                stage2_signals = stage2.run_stage2(processed_capture, stage1_result)
-                workflow_log.append("Stage 2 executed")
+                budget.check("Stage 2")
+                if self.config.get('cascade', False):
+                    cascade = self._run_cascade(processed_capture, stage1_result, context, audit_id)
+                    stage2_signals = cascade['signals']
+                    missing = cascade['missing']
+                    workflow_log.extend(cascade['log'])
+                else:
+                    stage2_result = stage2.run_stage2(processed_capture, stage1_result, context=context)
+                    stage2_signals = stage2_result.get('signals', {})
+                    missing = stage2_result.get('missing_signals', [])
+                    workflow_log.append("Stage 2 executed")
+            except VerificationTimeout as e:
+                self.logger.warning(f"[{audit_id}] Stage 2 skipped: {e}")
+                stage2_signals['error'] = str(e)
+                missing = list(stage2.DECISION_SIGNALS)
+                workflow_log.append("Stage 2 skipped (time budget exhausted)")
             except Exception as e:
                 self.logger.error(f"[{audit_id}] Stage 2 Error: {e}")
                 stage2_signals['error'] = str(e)
+                missing = list(stage2.DECISION_SIGNALS)
 
         # --- STEP 3: FUSION & SCORING ---
         # Combine fast signals (Stage 1) and heavy signals (Stage 2)
         all_features = {**stage1_result.get('signals', {}), **stage2_signals}
+        if missing:
+            all_features['missing_signals'] = missing
         
-        fusion_result = self.fusion_scorer.score(all_features)
-        raw_score = fusion_result['fused_score']
+        if cascade and cascade['decision']:
+            # Stopped early: report the bound on the side of the decision
+            # that the skipped signals could have pushed towards
+            fusion_result = {}
+            raw_score = cascade['score_low'] if cascade['decision'] == 'BLOCK' else cascade['score_high']
+        else:
+            fusion_inputs = stage2.build_fusion_inputs(all_features, stage1_result, missing) \
+                if stage2 else all_features
+            fusion_result = self.fusion_scorer.score_legacy(fusion_inputs)
+            raw_score = fusion_result['fused_score']
 
         # --- STEP 4: POLICY DECISION ---
         # Apply business rules (e.g., "Allow high score if low-value transaction")
@@ -171,9 +207,78 @@ class VerificationOrchestrator:
             'reasons': reasons,
             'signals_summary': all_features, # In prod, maybe sanitize this
             'latency_ms': round(latency * 1000, 2),
-            'workflow_log': workflow_log
+            'workflow_log': workflow_log,
+            'skipped_signals': cascade['skipped'] if cascade else []
         }
 
+    def _run_cascade(
+        self,
+        processed_capture: Dict[str, Any],
+        stage1_result: Dict[str, Any],
+        context: Dict[str, Any],
+        audit_id: str
+    ) -> Dict[str, Any]:
+        """
+        Runs the Stage 2 decision signals one at a time, cheapest first.
+
+        After each signal the fused score is re-bounded over every value the
+        remaining signals could return (FusionScorer.score_bounds); once the
+        PolicyEngine decision is the same across that range, the remaining
+        (more expensive) signals are skipped.
+
+        Returns:
+            dict: {
+                'signals': dict,      # Raw signals computed
+                'missing': list,      # Signals that failed or timed out
+                'skipped': list,      # Signals not run (decision already settled)
+                'decision': str,      # Settled decision, or None if all signals ran
+                'score_low': float,   # Fused score range at the point of exit
+                'score_high': float,
+                'log': list           # workflow_log entries
+            }
+        """
+        out = {'signals': {}, 'missing': [], 'skipped': [], 'decision': None,
+               'score_low': 0.0, 'score_high': 1.0, 'log': []}
+        # One artifact cache for all steps, so later signals reuse earlier artifacts
+        step_context = dict(context, artifacts=ArtifactCache(keep=True))
+        order = list(stage2.CASCADE_ORDER)
+
+        try:
+            for i, name in enumerate(order + [None]):
+                pending = order[i:]
+                features = {**stage1_result.get('signals', {}), **out['signals']}
+                fusion_inputs = stage2.build_fusion_inputs(features, stage1_result, out['missing'])
+                pending_inputs = [k for n in pending for k in stage2.FUSION_KEYS.get(n, ())]
+                for key in pending_inputs:
+                    fusion_inputs.pop(key, None)
+                low, high = self.fusion_scorer.score_bounds(fusion_inputs, pending_inputs)
+                out['score_low'], out['score_high'] = low, high
+
+                if not pending:
+                    break
+                decision = self.policy_engine.settled_decision(
+                    low, high, {**features, 'missing_signals': out['missing']}, context,
+                    pending_signals=[k for n in pending for k in stage2.SIGNAL_OUTPUTS[n]]
+                )
+                if decision:
+                    self.logger.info(f"[{audit_id}] Cascade settled on {decision} "
+                                     f"(score {low:.2f}-{high:.2f}); skipping {pending}")
+                    out['decision'] = decision
+                    out['skipped'] = pending
+                    out['log'].append(f"Stage 2 cascade stopped early ({decision}); skipped {', '.join(pending)}")
+                    break
+
+                step_context['signals'] = [name]
+                result = stage2.run_stage2(processed_capture, stage1_result, context=step_context)
+                out['signals'].update(result.get('signals', {}))
+                out['missing'].extend(result.get('missing_signals', []))
+                out['log'].append(f"Stage 2 cascade: {name} executed")
+        finally:
+            step_context['artifacts'].clear()
+
+        out['signals'].pop('missing_signals', None)
+        return out
+
     def _finalize_response(self, audit_id, decision, score, reasons, latency):
         """Helper to format early-exit responses."""
         return {
@@ -0,0 +1,212 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .timeouts import TimeoutConfig, CancellationToken
+
+logger = logging.getLogger(__name__)
+
+
+class SignalTask:
+    """
+    One independently computable Stage 2 signal.
+
+    Attributes:
+        name (str): Signal name (key in the executor results).
+        func (Callable): Called as func(**{dep: result_of_dep}) on a worker thread.
+        deps (Sequence[str]): Names of tasks whose results this task needs.
+        timeout_sec (float): Deadline relative to the start of the run
+                             (None = the run's overall deadline).
+        cancellable (bool): Pass the task's CancellationToken to func as `cancel_token`;
+                            it expires at the task deadline so the loop can stop early.
+    """
+
+    def __init__(self, name: str, func: Callable, deps: Sequence[str] = (),
+                 timeout_sec: Optional[float] = None, cancellable: bool = False):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.timeout_sec = timeout_sec
+        self.cancellable = cancellable
+
+
+class SignalRun:
+    """
+    Outcome of SignalExecutor.run().
+
+    Attributes:
+        results (dict): name -> return value, for tasks that finished in time.
+        missing (list): Tasks that did not finish before their deadline, or
+                        whose dependency was missing or failed.
+        errors (dict): name -> error message, for tasks that raised.
+        timings (dict): name -> seconds, for tasks that finished in time.
+    """
+
+    def __init__(self):
+        self.results: Dict[str, Any] = {}
+        self.missing: List[str] = []
+        self.errors: Dict[str, str] = {}
+        self.timings: Dict[str, float] = {}
+
+
+class SignalExecutor:
+    """
+    Runs independent signals concurrently on a persistent thread pool.
+
+    Tasks without dependencies are submitted at once; a dependent task is
+    submitted as soon as all of its dependencies have finished. OpenCV,
+    NumPy and torch release the GIL, so wall-clock time approaches that of
+    the slowest chain of signals rather than their sum.
+
+    A task that is still running at its deadline is recorded as missing
+    and its late result is discarded. Python threads cannot be killed;
+    cancellable tasks get a CancellationToken that is cancelled at that
+    point, so their loops stop instead of running on in the background.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        """
+        Args:
+            max_workers (int): Pool size (default: min(8, cpu_count + 2)).
+        """
+        if max_workers is None:
+            max_workers = min(8, (os.cpu_count() or 1) + 2)
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='stage2-signal')
+
+    def run(self, tasks: List[SignalTask], timeout_sec: float = TimeoutConfig.STAGE_2_LIMIT_SEC,
+            cancel_token: Optional[CancellationToken] = None) -> SignalRun:
+        """
+        Execute `tasks` and wait for them, up to `timeout_sec` in total.
+
+        Args:
+            tasks (list): SignalTasks with unique names.
+            timeout_sec (float): Overall deadline; per-task deadlines are capped by it.
+            cancel_token (CancellationToken): Caller's token (e.g. the stage budget);
+                                              cancelling it abandons all pending tasks.
+
+        Returns:
+            SignalRun with results, missing signals and errors.
+        """
+        start = time.time()
+        outcome = SignalRun()
+        by_name = {t.name: t for t in tasks}
+        if cancel_token is not None:
+            timeout_sec = min(timeout_sec, cancel_token.remaining())
+        run_token = cancel_token.child(timeout_sec, name="Stage 2") if cancel_token else \
+            CancellationToken(deadline=start + timeout_sec, name="Stage 2")
+        deadlines = {
+            t.name: start + min(timeout_sec, t.timeout_sec if t.timeout_sec is not None else timeout_sec)
+            for t in tasks
+        }
+        tokens = {
+            t.name: run_token.child(deadlines[t.name] - time.time(), name=f"Signal '{t.name}'")
+            for t in tasks
+        }
+
+        cond = threading.Condition()
+        pending = set(by_name)   # not yet finished (or given up on)
+        submitted = set()
+
+        def settle(name: str, ok: bool, value=None, error: Optional[str] = None, elapsed: float = 0.0):
+            """Record a task outcome and submit dependents that became ready. Holds cond."""
+            if name not in pending:
+                return  # late result of a task already given up on
+            pending.discard(name)
+            if ok:
+                outcome.results[name] = value
+                outcome.timings[name] = elapsed
+            else:
+                if error is not None:
+                    outcome.errors[name] = error
+                outcome.missing.append(name)
+            schedule()
+            cond.notify_all()
+
+        def schedule():
+            for task in tasks:
+                if task.name in submitted or task.name not in pending:
+                    continue
+                if any(dep in pending for dep in task.deps):
+                    continue
+                if all(dep in outcome.results for dep in task.deps):
+                    submit(task)
+                else:
+                    settle(task.name, False)
+
+        def submit(task: SignalTask):
+            submitted.add(task.name)
+            kwargs = {dep: outcome.results[dep] for dep in task.deps}
+            if task.cancellable:
+                kwargs['cancel_token'] = tokens[task.name]
+            future = self._pool.submit(self._call, task, kwargs)
+            future.add_done_callback(lambda f, name=task.name: done(name, f))
+
+        def done(name: str, future):
+            ok, value, error, elapsed = future.result()
+            if not ok:
+                logger.error(f"Stage 2 signal '{name}' failed: {error}")
+            with cond:
+                settle(name, ok, value, error, elapsed)
+
+        with cond:
+            for name in by_name:
+                unknown = [d for d in by_name[name].deps if d not in by_name]
+                if unknown:
+                    raise ValueError(f"Signal '{name}' depends on unknown signals {unknown}")
+            schedule()
+
+            while pending:
+                now = time.time()
+                if run_token.cancelled:
+                    expired = list(pending)
+                else:
+                    expired = [n for n in pending if deadlines[n] <= now]
+                for name in expired:
+                    if name not in pending:
+                        continue  # already settled as a dependent of another expired task
+                    logger.warning(f"Stage 2 signal '{name}' missed its deadline "
+                                   f"({deadlines[name] - start:.2f}s); recording it as missing")
+                    tokens[name].cancel("missed its deadline")
+                    settle(name, False)
+                if not pending:
+                    break
+                # Wake up periodically to notice a cancelled caller token
+                wait = min(deadlines[n] for n in pending) - time.time()
+                cond.wait(timeout=max(0.0, min(wait, 0.05)))
+
+        return outcome
+
+    @staticmethod
+    def _call(task: SignalTask, kwargs: dict):
+        t0 = time.time()
+        try:
+            return True, task.func(**kwargs), None, time.time() - t0
+        except Exception as e:
+            return False, None, str(e), time.time() - t0
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+
+
+# Singleton instance (one pool shared by all requests)
+_executor_instance = None
+_executor_lock = threading.Lock()
+
+
+def get_signal_executor() -> SignalExecutor:
+    """
+    Get singleton SignalExecutor instance.
+
+    Returns:
+        SignalExecutor instance
+    """
+    global _executor_instance
+    if _executor_instance is None:
+        with _executor_lock:
+            if _executor_instance is None:
+                _executor_instance = SignalExecutor()
+    return _executor_instance
@@ -0,0 +1,245 @@
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set
+
+from .signal_executor import SignalExecutor, SignalRun, SignalTask, get_signal_executor
+from .timeouts import TimeoutConfig, CancellationToken
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT = 'artifact'
+SIGNAL = 'signal'
+
+
+class Node:
+    """
+    A node of a SignalGraph.
+
+    Attributes:
+        name (str): Unique node name.
+        func (Callable): Called with one keyword argument per input.
+        inputs (Sequence[str]): Names of source values or other nodes.
+        kind (str): ARTIFACT (intermediate, cached and freed) or SIGNAL (result).
+        enabled (Callable): Optional predicate on the sources; disabled nodes
+                            (and everything that depends on them) are skipped.
+        cancellable (bool): Also pass the node's CancellationToken as `cancel_token`.
+        timeout_sec (float): The node's own deadline, relative to the start of the
+                             run (None = the run's deadline); capped by the run's.
+    """
+
+    def __init__(self, name: str, func: Callable, inputs: Sequence[str] = (), kind: str = SIGNAL,
+                 enabled: Optional[Callable[[Dict[str, Any]], bool]] = None, cancellable: bool = False,
+                 timeout_sec: Optional[float] = None):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.kind = kind
+        self.enabled = enabled
+        self.cancellable = cancellable
+        self.timeout_sec = timeout_sec
+
+
+class ArtifactCache:
+    """
+    Per-request store of intermediate artifacts (gray stack, face crops, ...).
+
+    Each artifact is computed once and kept while any scheduled consumer
+    still needs it; it is dropped as soon as its last consumer finishes.
+    Consumers that never finish (missed deadline) keep their inputs alive
+    until clear() at the end of the request.
+    """
+
+    def __init__(self, keep: bool = False):
+        """
+        Args:
+            keep (bool): Keep artifacts until clear() instead of dropping them after
+                         their last consumer, so later runs on the same capture
+                         (e.g. cascade steps) reuse them.
+        """
+        self.keep = keep
+        self._values: Dict[str, Any] = {}
+        self._refs: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.computed: List[str] = []   # artifacts computed, in order (for debugging)
+
+    def __contains__(self, name: str) -> bool:
+        with self._lock:
+            return name in self._values
+
+    def get(self, name: str) -> Any:
+        with self._lock:
+            return self._values[name]
+
+    def put(self, name: str, value: Any):
+        with self._lock:
+            self._values[name] = value
+            self.computed.append(name)
+            if self._refs.get(name, 0) <= 0 and not self.keep:
+                # Nobody is waiting for it
+                del self._values[name]
+
+    def retain(self, name: str):
+        with self._lock:
+            self._refs[name] = self._refs.get(name, 0) + 1
+
+    def release(self, name: str):
+        with self._lock:
+            self._refs[name] = self._refs.get(name, 0) - 1
+            if self._refs[name] <= 0 and name in self._values and not self.keep:
+                logger.debug(f"Artifact '{name}' freed (last consumer finished)")
+                del self._values[name]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self._refs.clear()
+
+
+class SignalGraph:
+    """
+    Declarative DAG of intermediate artifacts and signals.
+
+    Every node declares its inputs by name: source values supplied per
+    request (frames, face boxes, PCM, ...) or other nodes. run() executes
+    only the nodes needed for the requested signals, concurrently on the
+    SignalExecutor, and computes each artifact once per request.
+
+    Usage:
+        graph = SignalGraph()
+        graph.artifact('gray', to_gray, inputs=['frames'])
+        graph.signal('flow', flow_signal, inputs=['frames', 'face_boxes', 'gray'])
+        run = graph.run({'frames': frames, 'face_boxes': boxes}, wanted=['flow'])
+        run.results['flow']
+    """
+
+    def __init__(self):
+        self.nodes: Dict[str, Node] = {}
+
+    def add(self, node: Node) -> Node:
+        if node.name in self.nodes:
+            raise ValueError(f"Duplicate node '{node.name}'")
+        self.nodes[node.name] = node
+        return node
+
+    def artifact(self, name: str, func: Callable, inputs: Sequence[str] = (), **kwargs) -> Node:
+        return self.add(Node(name, func, inputs, kind=ARTIFACT, **kwargs))
+
+    def signal(self, name: str, func: Callable, inputs: Sequence[str] = (), **kwargs) -> Node:
+        return self.add(Node(name, func, inputs, kind=SIGNAL, **kwargs))
+
+    @property
+    def signals(self) -> List[str]:
+        return [n.name for n in self.nodes.values() if n.kind == SIGNAL]
+
+    def plan(self, sources: Dict[str, Any], wanted: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Nodes to run for `wanted` signals (default: all), in dependency order.
+
+        Branches that no wanted signal depends on are skipped, as are
+        disabled nodes and anything depending on them.
+
+        Raises:
+            ValueError: For unknown node or input names, or a cycle.
+        """
+        wanted = self.signals if wanted is None else list(wanted)
+        order: List[str] = []
+        skipped: Set[str] = set()
+        visiting: Set[str] = set()
+
+        def visit(name: str) -> bool:
+            """Adds `name` and its inputs to the plan. Returns False if it cannot run."""
+            if name in order:
+                return True
+            if name in skipped:
+                return False
+            if name in visiting:
+                raise ValueError(f"Cycle in signal graph at '{name}'")
+            node = self.nodes.get(name)
+            if node is None:
+                raise ValueError(f"Unknown signal graph node '{name}'")
+            if node.enabled is not None and not node.enabled(sources):
+                skipped.add(name)
+                return False
+
+            visiting.add(name)
+            ok = True
+            for inp in node.inputs:
+                if inp in self.nodes:
+                    ok = visit(inp) and ok
+                elif inp not in sources:
+                    raise ValueError(f"Node '{name}' needs unknown input '{inp}'")
+            visiting.discard(name)
+
+            if ok:
+                order.append(name)
+            else:
+                skipped.add(name)
+            return ok
+
+        for name in wanted:
+            visit(name)
+        return order
+
+    def run(self, sources: Dict[str, Any], wanted: Optional[Iterable[str]] = None,
+            cache: Optional[ArtifactCache] = None, executor: Optional[SignalExecutor] = None,
+            timeout_sec: float = TimeoutConfig.STAGE_2_LIMIT_SEC,
+            cancel_token: Optional[CancellationToken] = None) -> SignalRun:
+        """
+        Execute the nodes needed for `wanted` signals.
+
+        Args:
+            sources (dict): Per-request input values, by name.
+            wanted (iterable): Signals to produce (default: all).
+            cache (ArtifactCache): Per-request artifact cache; artifacts already in
+                                   it are not recomputed (default: a fresh cache).
+            executor (SignalExecutor): Default: the shared executor.
+            timeout_sec (float): Deadline for the whole run.
+            cancel_token (CancellationToken): Caller's token (e.g. the stage budget).
+
+        Returns:
+            SignalRun whose results hold the SIGNAL nodes' return values;
+            `missing` lists nodes that failed, were late or lost an input.
+        """
+        cache = cache if cache is not None else ArtifactCache()
+        executor = executor or get_signal_executor()
+
+        tasks = []
+        for name in self.plan(sources, wanted):
+            node = self.nodes[name]
+            if node.kind == ARTIFACT and name in cache:
+                continue
+            for inp in node.inputs:
+                if inp in self.nodes:
+                    cache.retain(inp)
+            deps = [i for i in node.inputs if i in self.nodes and i not in cache]
+            tasks.append(SignalTask(name, self._bind(node, sources, cache), deps=deps,
+                                    timeout_sec=node.timeout_sec, cancellable=True))
+
+        run = executor.run(tasks, timeout_sec=timeout_sec, cancel_token=cancel_token)
+
+        # Artifacts live in the cache; the executor only saw a completion marker
+        for name in list(run.results):
+            if self.nodes[name].kind == ARTIFACT:
+                del run.results[name]
+        return run
+
+    def _bind(self, node: Node, sources: Dict[str, Any], cache: ArtifactCache) -> Callable:
+        """Task function reading node inputs from the sources and the cache."""
+        def call(cancel_token=None, **_deps):
+            try:
+                kwargs = {
+                    inp: cache.get(inp) if inp in self.nodes else sources[inp]
+                    for inp in node.inputs
+                }
+                if node.cancellable:
+                    kwargs['cancel_token'] = cancel_token
+                value = node.func(**kwargs)
+                if node.kind == ARTIFACT:
+                    cache.put(node.name, value)
+                    return True
+                return value
+            finally:
+                for inp in node.inputs:
+                    if inp in self.nodes:
+                        cache.release(inp)
+        return call
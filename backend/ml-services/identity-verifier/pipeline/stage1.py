@@ -1,7 +1,10 @@
 import numpy as np
 import time
+import logging
 from typing import Dict, Any, List
 
+from pipeline.timeouts import TimeoutConfig, get_request_budget
+
 # Import lightweight feature extractors
 try:
     from features.sharpness import laplacian_variance
@@ -12,6 +15,70 @@ except ImportError:
     def laplacian_variance(img): return {'value': 1000.0, 'confidence': 1.0}
     def ocr_and_format_checks(img): return {'format_ok': True}
 
+try:
+    from ops.fingerprint_index import get_fingerprint_index
+except ImportError:
+    def get_fingerprint_index(): return None
+
+logger = logging.getLogger(__name__)
+
+def _context_checks(results: Dict[str, Any], context: Dict[str, Any], metadata: Dict[str, Any]) -> bool:
+    """Stage 1 checks that need no media. Fills `results`; returns False on a fast fail."""
+    # --- CHECK 2: Blocklists (Metadata Filter) ---
+    # In a real app, this queries Redis/DB. Here we use a mock set.
+    # We check User ID, IP, and Device ID.
+    blocked_ips = ["192.168.1.666", "10.0.0.99"]
+    if context.get('ip') in blocked_ips:
+        results['fast_fail'] = True
+        results['passed'] = False
+        results['reasons'].append(f"Source IP {context.get('ip')} is blocklisted")
+        return False
+
+    # --- CHECK 3: App Integrity (App Authenticator) ---
+    # The proposal mentions detecting "Fake Finance Apps" via package name/signature.
+    # This is a metadata check.
+    app_package = metadata.get('package_name', '')
+    expected_package = "com.trustguard.bank"
+    
+    if app_package and app_package != expected_package:
+        # If it claims to be our app but has wrong package name -> Fake App
+        results['fast_fail'] = True
+        results['passed'] = False
+        results['signals']['app_integrity'] = 0.0
+        results['reasons'].append(f"Invalid Package Name: {app_package} (Possible Fake App)")
+        return False
+    else:
+        results['signals']['app_integrity'] = 1.0
+
+    return True
+
+
+def run_context_checks(context: Dict[str, Any] = None, metadata: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    The stage 1 checks that need no media (blocklists, app integrity).
+
+    Run before decoding an input that cannot be probed cheaply (a piped
+    upload), so blocked requests never pay for the decode; run_stage1
+    repeats them on the full capture.
+
+    Args:
+        context (dict): User context {'user_id': str, 'ip': str}.
+        metadata (dict): Request metadata (package_name, ...).
+
+    Returns:
+        dict: Same shape as run_stage1's result.
+    """
+    results = {
+        'passed': True,
+        'fast_fail': False,
+        'signals': {},
+        'reasons': []
+    }
+    _context_checks(results, context or {}, metadata or {})
+    results['passed'] = not results['fast_fail']
+    return results
+
+
 def run_stage1(
     capture: Dict[str, Any], 
     context: Dict[str, Any] = None
@@ -24,10 +91,13 @@ def run_stage1(
     2. Blocklist/Allowlist (User ID, Device ID, IP)
     3. Image Quality (Is the face too blurry for AI?)
     4. App Integrity (Is the request coming from a trusted APK?)
+    5. Replay (Was a near-duplicate of this video already submitted?)
 
     Args:
-        capture (dict): Input data {'frames': [np.array], 'audio': np.array, 'metadata': dict}
-        context (dict): User context {'user_id': str, 'ip': str}
+        capture (dict): Input data {'frames': [np.array], 'audio': np.array, 'metadata': dict,
+                        optionally 'fingerprint': per-second hashes from ingest.fingerprint}
+        context (dict): User context {'user_id': str, 'ip': str}. A RequestBudget in
+                        context['budget'] bounds the stage to STAGE_1_LIMIT_SEC.
 
     Returns:
         dict: {
@@ -48,36 +118,19 @@ def run_stage1(
     frames = capture.get('frames', [])
     metadata = capture.get('metadata', {})
     context = context or {}
+    budget = get_request_budget(context)
+    stage_token = budget.stage("Stage 1", TimeoutConfig.STAGE_1_LIMIT_SEC) if budget else None
 
     # --- CHECK 1: Input Integrity ---
     if not frames or len(frames) == 0:
         results['fast_fail'] = True
+        results['passed'] = False
         results['reasons'].append("No video frames provided")
         return results
 
-    # --- CHECK 2: Blocklists (Metadata Filter) ---
-    # In a real app, this queries Redis/DB. Here we use a mock set.
-    # We check User ID, IP, and Device ID.
-    blocked_ips = ["192.168.1.666", "10.0.0.99"]
-    if context.get('ip') in blocked_ips:
-        results['fast_fail'] = True
-        results['reasons'].append(f"Source IP {context.get('ip')} is blocklisted")
-        return results
-
-    # --- CHECK 3: App Integrity (App Authenticator) ---
-    # The proposal mentions detecting "Fake Finance Apps" via package name/signature.
-    # This is a metadata check.
-    app_package = metadata.get('package_name', '')
-    expected_package = "com.trustguard.bank"
-    
-    if app_package and app_package != expected_package:
-        # If it claims to be our app but has wrong package name -> Fake App
-        results['fast_fail'] = True
-        results['signals']['app_integrity'] = 0.0
-        results['reasons'].append(f"Invalid Package Name: {app_package} (Possible Fake App)")
+    # --- CHECKS 2-3: Blocklists and App Integrity (context only) ---
+    if not _context_checks(results, context, metadata):
         return results
-    else:
-        results['signals']['app_integrity'] = 1.0
 
     # --- CHECK 4: Image Quality (Blur Detection) ---
     # We pick the middle frame to check if the camera is focused.
@@ -94,16 +147,45 @@ def run_stage1(
     # Threshold: Variance < 100 usually means very blurry
     if blur_score < 50.0:
         results['fast_fail'] = True
+        results['passed'] = False
         results['reasons'].append("Image too blurry for verification. Please retake.")
         return results
     elif blur_score < 100.0:
         # Warning but not strict fail
         results['reasons'].append("Image quality is low (blur detected)")
 
-    # --- CHECK 5: Document Pre-Check (If applicable) ---
+    # --- CHECK 5: Replay (Near-Duplicate Video) ---
+    # A re-encoded or cropped copy of an earlier submission. Under another user
+    # it is rejected here, before any stage 2 compute; the same user
+    # resubmitting only gets flagged.
+    fingerprint = capture.get('fingerprint')
+    index = get_fingerprint_index() if fingerprint else None
+    if index is not None and not (stage_token is not None and stage_token.cancelled):
+        try:
+            match = index.lookup(fingerprint)
+            results['signals']['replay_similarity'] = match['similarity'] if match else 0.0
+            if match is None:
+                index.add(fingerprint, audit_id=context.get('audit_id'), user_id=context.get('user_id'))
+            elif match['user_id'] != context.get('user_id'):
+                results['signals']['replay_of'] = match['audit_id']
+                results['fast_fail'] = True
+                results['passed'] = False
+                results['reasons'].append("Video matches an earlier submission by another user (replay)")
+                return results
+            else:
+                results['signals']['replay_of'] = match['audit_id']
+                results['reasons'].append("Video closely matches an earlier submission")
+        except Exception as e:
+            logger.warning(f"Replay check skipped: {e}")
+
+    # --- CHECK 6: Document Pre-Check (If applicable) ---
     # If the flow includes ID card upload, check if it looks valid before running deep matching.
     doc_image = capture.get('doc_image')
-    if doc_image is not None:
+    if doc_image is not None and stage_token is not None and stage_token.cancelled:
+        # OCR is the slowest check here; skip it rather than overrun the stage budget
+        results['signals']['doc_format_valid'] = 0.0
+        results['reasons'].append("Document pre-check skipped (stage time budget exhausted)")
+    elif doc_image is not None:
         doc_res = ocr_and_format_checks(doc_image)
         if not doc_res.get('format_ok', False):
             # We don't fast_fail here usually, but we flag it
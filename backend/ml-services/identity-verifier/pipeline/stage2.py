@@ -1,3 +1,5 @@
+import os
+import cv2
 import numpy as np
 import time
 import logging
@@ -22,15 +24,14 @@ except ImportError:
 
 # --- Import New Deepfake Inference Module ---
 try:
-    from inference.deepfake_inference import run_deepfake_model, aggregate_scores
+    from inference.deepfake_inference import ADAPTIVE_MIN_FRAMES, adaptive_deepfake_inference
     DEEPFAKE_AVAILABLE = True
 except ImportError:
     logger.warning("Stage2 Warning: Deepfake inference module not available.")
     DEEPFAKE_AVAILABLE = False
-    def run_deepfake_model(*args, **kwargs):
-        return []
-    def aggregate_scores(*args, **kwargs):
-        return 0.0
+    ADAPTIVE_MIN_FRAMES = 8
+    def adaptive_deepfake_inference(*args, **kwargs):
+        return {'video_fake_prob': 0.0, 'frame_scores': [], 'frames_processed': 0}
 
 # --- Import Feature Extractors (Advanced Liveness) ---
 try:
@@ -40,11 +41,16 @@ try:
     from features.lip_sync import lip_sync_score
 except ImportError:
     logger.warning("Stage2 Warning: Feature modules not found. Using mocks.")
-    def extract_rppg(*args): return {'confidence': 0.0, 'bpm': 0}
-    def flow_consistency(*args): return {'value': 0.0}
-    def detect_landmarks(*args): return np.zeros((68, 2))
-    def landmark_jitter(*args): return {'value': 0.0}
-    def lip_sync_score(*args): return {'value': 0.0}
+    def extract_rppg(*args, **kwargs): return {'confidence': 0.0, 'bpm': 0}
+    def flow_consistency(*args, **kwargs): return {'value': 0.0}
+    def detect_landmarks(*args, **kwargs): return np.zeros((68, 2))
+    def landmark_jitter(*args, **kwargs): return {'value': 0.0}
+    def lip_sync_score(*args, **kwargs): return {'value': 0.0}
+
+from ingest.capture import IngestCapture
+from ingest.frame_utils import select_changed_frames, propagate_scores
+from pipeline.signal_graph import SignalGraph, ArtifactCache
+from pipeline.timeouts import TimeoutConfig, get_request_budget
 
 # --- Import Face Processor Helpers ---
 try:
@@ -55,102 +61,119 @@ except ImportError:
         # Return empty list if helper not available
         return []
 
-def run_stage2(
-    capture: Dict[str, Any], 
-    stage1_result: Dict[str, Any] = None,
-    video_path: str = None,
-    context: dict = None
-) -> Dict[str, Any]:
-    """
-    Executes 'Heavy Checks' using Deep Learning and Signal Processing.
+# --- Stage 2 Signal Graph ---
+# Every check declares its inputs: per-request sources (frames, face_boxes,
+# rppg_trace, pcm, sr, user_id) or shared intermediate artifacts (gray,
+# face_crops, landmarks). Artifacts are computed once per request, shared
+# by all their consumers and freed after the last one finishes.
 
-    Checks performed:
-    1. Visual Deepfake Detection (CNN) - NEW INTEGRATION
-    2. Physiological Liveness (rPPG/Pulse)
-    3. Geometric Consistency (Landmark Jitter & Optical Flow)
-    4. Audio Security (Anti-Spoofing & Speaker Verification)
-    5. Audio-Visual Synchronization (Lip Sync)
+FRAME_SKIP = 5  # Deepfake CNN: process every 5th frame
 
-    Args:
-        capture (dict): Input data {'frames': [], 'audio': [], 'metadata': {}, 'face_boxes': []}
-        stage1_result (dict): Output from Stage 1 (for context).
-        video_path (str): Optional path to video file for alternative processing
-        context (dict): Additional context (user_id, audit_id, etc.)
+# Optical flow engine: 'dense' (Farneback) or 'sparse' (Lucas-Kanade on face
+# corners, ~5x cheaper); every FLOW_STRIDE-th frame pair, on FLOW_WORKERS threads
+FLOW_METHOD = os.environ.get('FLOW_METHOD', 'dense')
+FLOW_STRIDE = int(os.environ.get('FLOW_STRIDE', 1))
+FLOW_WORKERS = int(os.environ.get('FLOW_WORKERS', 1))
 
-    Returns:
-        dict: Structured result with:
-            - video_fake_prob: float - Aggregated deepfake probability
-            - deepfake_pass: bool - Whether deepfake check passed
-            - final_score: float - Fused risk score
-            - overall_pass: bool - Final decision
-            - audit_id: str - Tracking ID
-            - timestamp: str - ISO8601 timestamp
-            - signals: dict - All individual signal values
-            - debug: dict - Debug information
+
+def _gray_stack(frames):
+    """Grayscale frames (the FrameStore cache, filled while decoding, if available)."""
+    if hasattr(frames, 'gray'):
+        return frames.gray()
+    return [cv2.cvtColor(f, cv2.COLOR_BGR2GRAY) for f in frames]
+
+
+def _face_crops(frames, face_boxes):
+    """BGR face crops of the frames sampled by the CNN and of the middle frame, by index."""
+    wanted = set(range(0, len(frames), FRAME_SKIP))
+    wanted.add(len(frames) // 2)
+    crops = {}
+    for idx in sorted(wanted):
+        if idx < len(face_boxes) and len(face_boxes[idx]) == 4:
+            x, y, w, h = face_boxes[idx]
+            if w > 0 and h > 0:
+                crops[idx] = frames[idx][y:y+h, x:x+w]
+    return crops
+
+
+def _distinct_frames(face_crops):
     """
-    start_time = time.time()
-    context = context or {}
-    signals = {}
-    
-    # Generate audit ID
-    from pipeline.audit_id import generate_audit_id
-    audit_id = context.get('audit_id', generate_audit_id())
-    
-    # Unpack Data
-    frames = capture.get('frames', [])
-    audio = capture.get('audio', np.array([]))
-    sr = capture.get('sample_rate', 16000)
-    user_id = context.get('user_id', capture.get('metadata', {}).get('user_id'))
-    
-    # Pre-calculated face boxes if available (to save time), else we'd detect them here
-    # Assuming 'face_boxes' matches 'frames' length
-    face_boxes = capture.get('face_boxes', []) 
+    Indices of the CNN's candidate frames whose face changed since the last kept one.
+
+    Change is measured on the face crops, not whole frames: a talking head
+    barely moves the full-frame thumbnail. At least ADAPTIVE_MIN_FRAMES
+    candidates are kept (evenly spaced) so the sampler always has its
+    first batch.
+    """
+    pool = [idx for idx in sorted(face_crops) if idx % FRAME_SKIP == 0]
+    kept = set(select_changed_frames([face_crops[idx] for idx in pool],
+                                     size=IngestCapture.THUMBNAIL_SIZE))
+    need = min(ADAPTIVE_MIN_FRAMES, len(pool)) - len(kept)
+    if need > 0:
+        rest = [i for i in range(len(pool)) if i not in kept]
+        kept.update(rest[int(j)] for j in np.linspace(0, len(rest) - 1, need).round())
+    return {pool[i] for i in kept}
 
-    # --- 1. VISUAL DEEPFAKE DETECTION (CNN) - NEW PHASE 2 INTEGRATION ---
-    video_fake_prob = 0.0
-    deepfake_pass = True
+
+def _landmarks(frames, face_boxes, cancel_token):
+    """Landmarks for the sequence (shared by jitter and lip sync)."""
+    landmarks_seq = []
+    for i, frame in enumerate(frames):
+        cancel_token.raise_if_cancelled()
+        if i < len(face_boxes):
+            lms = detect_landmarks(frame, face_boxes[i])
+            landmarks_seq.append(lms)
+        else:
+            landmarks_seq.append(None)
+    return landmarks_seq
+
+
+def _to_rgb(crop):
+    return cv2.cvtColor(crop, cv2.COLOR_BGR2RGB) if crop.ndim == 3 and crop.shape[2] == 3 else crop
+
+
+# --- 1. VISUAL DEEPFAKE DETECTION (CNN) - NEW PHASE 2 INTEGRATION ---
+def _deepfake_signal(frames, face_boxes, face_crops, distinct_frames, cancel_token):
+    out = {}
     frame_scores = []
-    
     if DEEPFAKE_AVAILABLE and frames:
         try:
             logger.info(f"Running CNN deepfake detection on {len(frames)} frames...")
             
-            # Extract face crops from frames
-            face_crops = []
-            FRAME_SKIP = 5  # Process every 5th frame
-            
-            for idx in range(0, len(frames), FRAME_SKIP):
-                frame = frames[idx]
-                
-                # Get face crop
-                if idx < len(face_boxes) and len(face_boxes[idx]) == 4:
-                    x, y, w, h = face_boxes[idx]
-                    if w > 0 and h > 0:
-                        face_crop = frame[y:y+h, x:x+w]
-                        # Convert BGR to RGB if needed
-                        if len(face_crop.shape) == 3 and face_crop.shape[2] == 3:
-                            import cv2
-                            face_crop = cv2.cvtColor(face_crop, cv2.COLOR_BGR2RGB)
-                        face_crops.append(face_crop)
+            # Face crops of every FRAME_SKIP-th frame; only those that changed
+            # since the last kept one go to the CNN
+            pool = [idx for idx in sorted(face_crops) if idx % FRAME_SKIP == 0]
+            keep = [idx for idx in pool if idx in distinct_frames]
+            face_crops = [face_crops[idx] for idx in keep]
             
             # Run deepfake model if we have face crops
+            cancel_token.raise_if_cancelled()
             if face_crops:
-                frame_scores = run_deepfake_model(
-                    face_crops, 
-                    model_name='xception', 
-                    batch_size=16
+                # Stratified mini-batches until the verdict is settled, so the
+                # CNN cost no longer grows with video length
+                sampled = adaptive_deepfake_inference(
+                    face_crops,
+                    model_name='xception',
+                    preprocess=_to_rgb,
+                    cancel_token=cancel_token
                 )
-                
-                # Aggregate to video-level score
-                video_fake_prob = aggregate_scores(frame_scores, method='mean')
+                # Skipped frames inherit the score of the nearest inferred frame
+                inferred = sorted(zip((pool.index(keep[i]) for i in sampled['frame_indices']),
+                                      sampled['frame_scores']))
+                frame_scores = list(propagate_scores([p for p, _ in inferred],
+                                                     [sc for _, sc in inferred], len(pool)))
+                # The sampler's verdict: it stopped once this estimate settled
+                video_fake_prob = sampled['video_fake_prob']
                 
                 # Apply threshold
                 DEEPFAKE_PROB_THRESHOLD = 0.5
                 deepfake_pass = (video_fake_prob < DEEPFAKE_PROB_THRESHOLD)
                 
-                signals['video_fake_prob'] = video_fake_prob
-                signals['deepfake_pass'] = deepfake_pass
-                signals['deepfake_frames_processed'] = len(face_crops)
+                out['video_fake_prob'] = video_fake_prob
+                out['deepfake_pass'] = deepfake_pass
+                out['deepfake_frames_processed'] = sampled['frames_processed']
+                out['deepfake_frames_distinct'] = len(keep)
+                out['deepfake_frames_available'] = len(pool)
                 
                 logger.info(
                     f"Deepfake detection complete: video_fake_prob={video_fake_prob:.3f}, "
@@ -158,14 +181,14 @@ def run_stage2(
                 )
             else:
                 logger.warning("No face crops extracted for deepfake detection")
-                signals['video_fake_prob'] = 0.0
-                signals['deepfake_pass'] = False
-                signals['deepfake_error'] = 'No faces detected'
+                out['video_fake_prob'] = 0.0
+                out['deepfake_pass'] = False
+                out['deepfake_error'] = 'No faces detected'
         except Exception as e:
             logger.error(f"Deepfake detection error: {e}", exc_info=True)
-            signals['video_fake_prob'] = 0.0
-            signals['deepfake_pass'] = False
-            signals['deepfake_error'] = str(e)
+            out['video_fake_prob'] = 0.0
+            out['deepfake_pass'] = False
+            out['deepfake_error'] = str(e)
     else:
         # Fallback to legacy CNN if new inference not available
         cnn_model = get_deepfake_cnn()
@@ -175,6 +198,7 @@ def run_stage2(
             indices = np.linspace(0, len(frames)-1, 5, dtype=int)
             
             for idx in indices:
+                cancel_token.raise_if_cancelled()
                 frame = frames[idx]
                 # Crop face using box (simple logic)
                 if idx < len(face_boxes):
@@ -185,91 +209,276 @@ def run_stage2(
                         scores.append(res.get('score', 0.0))
             
             # Max pooling strategy: If any frame is definitely fake, flag it.
-            signals['cnn_score'] = float(np.max(scores)) if scores else 0.0
-            signals['video_fake_prob'] = signals['cnn_score']
-            signals['deepfake_pass'] = signals['cnn_score'] < 0.5
+            out['cnn_score'] = float(np.max(scores)) if scores else 0.0
+            out['video_fake_prob'] = out['cnn_score']
+            out['deepfake_pass'] = out['cnn_score'] < 0.5
         else:
-            signals['cnn_score'] = 0.0
-            signals['video_fake_prob'] = 0.0
-            signals['deepfake_pass'] = True  # Default safe if no model
-
-    # --- 2. PHYSIOLOGICAL LIVENESS (rPPG) ---
-    # Requires continuous frames.
-    if frames and len(frames) > 30:
-        rppg_res = extract_rppg(frames, face_boxes, fps=30.0)
-        signals['rppg_conf'] = rppg_res.get('confidence', 0.0) # Higher confidence = Real Human
-        signals['rppg_bpm'] = rppg_res.get('bpm', 0.0)
-    else:
-        signals['rppg_conf'] = 0.0
+            out['cnn_score'] = 0.0
+            out['video_fake_prob'] = 0.0
+            out['deepfake_pass'] = True  # Default safe if no model
+    return out, frame_scores
 
-    # --- 3. GEOMETRIC CONSISTENCY ---
-    if frames:
-        # A. Optical Flow (Motion Consistency)
-        flow_res = flow_consistency(frames, face_boxes)
-        signals['flow_variance'] = flow_res.get('value', 0.0) # High variance = Warping/Fake
-
-        # B. Landmark Jitter
-        # Extract landmarks for the sequence
-        landmarks_seq = []
-        for i, frame in enumerate(frames):
-            if i < len(face_boxes):
-                lms = detect_landmarks(frame, face_boxes[i])
-                landmarks_seq.append(lms)
-            else:
-                landmarks_seq.append(None)
-        
-        jitter_res = landmark_jitter(landmarks_seq)
-        signals['jitter_score'] = jitter_res.get('value', 0.0) # High jitter = Fake
-
-    # --- 4. AUDIO SECURITY ---
-    if audio is not None and len(audio) > 0:
-        # A. Anti-Spoofing (TTS/VC Detection)
-        spoof_det = get_spoof_detector()
-        if spoof_det:
-            spoof_res = spoof_det.infer(audio, sr=sr)
-            signals['audio_spoof_score'] = spoof_res.get('spoof_score', 0.0)
-
-        # B. Speaker Verification (ASV) - "Is this the enrolled user?"
-        asv_model = get_asv_model()
-        if asv_model and user_id:
-            # Check against enrolled profile
-            asv_res = asv_model.asv_score(user_id, audio, sr=sr)
-            # We convert similarity (1.0=Same) to Risk (1.0=Different)
-            # Risk = 1.0 - Similarity
-            sim = asv_res.get('score', 0.0)
-            signals['voice_mismatch_score'] = 1.0 - sim
+
+# --- 2. PHYSIOLOGICAL LIVENESS (rPPG) ---
+def _rppg_signal(frames, face_boxes, rppg_trace, cancel_token):
+    rppg_res = extract_rppg(frames, face_boxes, fps=30.0, roi_signal=rppg_trace,
+                            cancel_token=cancel_token)
+    return {
+        'rppg_conf': rppg_res.get('confidence', 0.0), # Higher confidence = Real Human
+        'rppg_bpm': rppg_res.get('bpm', 0.0)
+    }
+
+
+# --- 3. GEOMETRIC CONSISTENCY ---
+def _flow_signal(frames, face_boxes, gray, cancel_token):
+    # A. Optical Flow (Motion Consistency)
+    flow_res = flow_consistency(frames, face_boxes, cancel_token=cancel_token, gray_frames=gray,
+                                method=FLOW_METHOD, stride=FLOW_STRIDE, workers=FLOW_WORKERS)
+    return {'flow_variance': flow_res.get('value', 0.0)} # High variance = Warping/Fake
+
+
+def _jitter_signal(landmarks):
+    # B. Landmark Jitter
+    jitter_res = landmark_jitter(landmarks)
+    return {'jitter_score': jitter_res.get('value', 0.0)} # High jitter = Fake
+
+
+# --- 4. AUDIO SECURITY ---
+def _spoof_signal(pcm, sr):
+    # A. Anti-Spoofing (TTS/VC Detection)
+    spoof_res = get_spoof_detector().infer(pcm, sr=sr)
+    return {'audio_spoof_score': spoof_res.get('spoof_score', 0.0)}
+
+
+def _asv_signal(pcm, sr, user_id):
+    # B. Speaker Verification (ASV) - "Is this the enrolled user?"
+    # Check against enrolled profile
+    asv_res = get_asv_model().asv_score(user_id, pcm, sr=sr)
+    # We convert similarity (1.0=Same) to Risk (1.0=Different)
+    # Risk = 1.0 - Similarity
+    sim = asv_res.get('score', 0.0)
+    return {'voice_mismatch_score': 1.0 - sim}
+
+
+# --- 5. AUDIO-VISUAL SYNC (Lip Sync) ---
+def _lip_sync_signal(pcm, sr, frames, landmarks):
+    # Re-uses the landmarks artifact shared with the jitter check
+    sync_res = lip_sync_score(pcm, sr, frames, landmarks)
+    return {'lip_sync_score': sync_res.get('value', 0.0)} # High correlation = Real
+
+
+# --- 6. IDENTITY MATCHING (Visual) ---
+def _face_match_signal(frames, face_crops):
+    # Does the face match the ID card or enrolled photo?
+    out = {}
+    # Take the best looking frame (e.g., middle)
+    face_crop = face_crops.get(len(frames) // 2)
+    
+    # Infer embedding
+    emb_res = get_face_embedder().infer(face_crop) if face_crop is not None else {'success': False}
+    if emb_res['success']:
+        # In a real app, fetch 'enrolled_embedding' from DB
+        # Here we mock a distance check
+        # signals['face_mismatch_score'] = cosine_dist(emb_res['embedding'], enrolled)
+        out['face_match_checked'] = 1.0
     else:
+        out['face_match_failed'] = 1.0
+    return out
+
+
+def _has_frames(src):
+    return len(src['frames']) > 0
+
+
+def _has_audio(src):
+    return src['pcm'] is not None and len(src['pcm']) > 0
+
+
+STAGE2_GRAPH = SignalGraph()
+STAGE2_GRAPH.artifact('gray', _gray_stack, inputs=['frames'], enabled=_has_frames)
+STAGE2_GRAPH.artifact('face_crops', _face_crops, inputs=['frames', 'face_boxes'], enabled=_has_frames)
+STAGE2_GRAPH.artifact('landmarks', _landmarks, inputs=['frames', 'face_boxes'],
+                      enabled=_has_frames, cancellable=True)
+STAGE2_GRAPH.artifact('distinct_frames', _distinct_frames, inputs=['face_crops'])
+STAGE2_GRAPH.signal('deepfake', _deepfake_signal,
+                    inputs=['frames', 'face_boxes', 'face_crops', 'distinct_frames'], cancellable=True)
+# rPPG requires continuous frames
+STAGE2_GRAPH.signal('rppg', _rppg_signal, inputs=['frames', 'face_boxes', 'rppg_trace'],
+                    enabled=lambda src: len(src['frames']) > 30, cancellable=True,
+                    timeout_sec=TimeoutConfig.RPPG_LIMIT_SEC)
+STAGE2_GRAPH.signal('flow', _flow_signal, inputs=['frames', 'face_boxes', 'gray'], cancellable=True,
+                    timeout_sec=TimeoutConfig.FLOW_LIMIT_SEC)
+STAGE2_GRAPH.signal('jitter', _jitter_signal, inputs=['landmarks'])
+STAGE2_GRAPH.signal('audio_spoof', _spoof_signal, inputs=['pcm', 'sr'],
+                    enabled=lambda src: _has_audio(src) and bool(get_spoof_detector()),
+                    timeout_sec=TimeoutConfig.AUDIO_SPOOF_LIMIT_SEC)
+STAGE2_GRAPH.signal('asv', _asv_signal, inputs=['pcm', 'sr', 'user_id'],
+                    enabled=lambda src: _has_audio(src) and bool(src['user_id']) and bool(get_asv_model()))
+STAGE2_GRAPH.signal('lip_sync', _lip_sync_signal, inputs=['pcm', 'sr', 'frames', 'landmarks'],
+                    enabled=_has_audio)
+STAGE2_GRAPH.signal('face_match', _face_match_signal, inputs=['frames', 'face_crops'],
+                    enabled=lambda src: bool(src['user_id']) and bool(get_face_embedder()))
+
+# Signals read by fusion and the policy engine; pass as context['signals'] to
+# skip the purely diagnostic branches (landmarks, lip sync, ASV, face match)
+DECISION_SIGNALS = ('deepfake', 'rppg', 'flow', 'audio_spoof')
+
+# Decision signals ordered by cost, cheapest first (used by the orchestrator's
+# early-exit cascade): rPPG reads the trace built while decoding, flow runs
+# Farneback on small crops, the spoof model scores one clip, the CNN every
+# FRAME_SKIP-th face
+CASCADE_ORDER = ('rppg', 'flow', 'audio_spoof', 'deepfake')
+
+# Raw signals each decision signal produces, and the FusionScorer inputs derived from them
+SIGNAL_OUTPUTS = {
+    'rppg': ('rppg_conf', 'rppg_bpm'),
+    'flow': ('flow_variance',),
+    'audio_spoof': ('audio_spoof_score',),
+    'deepfake': ('video_fake_prob', 'deepfake_pass'),
+}
+FUSION_KEYS = {
+    'rppg': ('liveness_ok', 'rppg_ok'),
+    'flow': ('opticalflow_ok',),
+    'deepfake': ('deepfake_prob',),
+}
+
+
+def build_fusion_inputs(signals: Dict[str, Any], stage1_result: Dict[str, Any] = None,
+                        missing: List[str] = ()) -> Dict[str, Any]:
+    """
+    Map Stage 2 signals to FusionScorer.score() inputs.
+
+    Args:
+        signals (dict): Raw Stage 2 signals (video_fake_prob, rppg_conf, flow_variance, ...).
+        stage1_result (dict): Stage 1 output (blur score).
+        missing (list): Signals that failed or missed their deadline; they
+                        count as unknown, not as passed.
+
+    Returns:
+        dict: Fusion inputs (deepfake_prob, liveness_ok, blur_score, rppg_ok, opticalflow_ok).
+    """
+    fusion_inputs = {
+        'deepfake_prob': signals.get('video_fake_prob', 0.0),
+        'liveness_ok': signals.get('rppg_conf', 0.0) > 0.5,
+        'blur_score': stage1_result.get('blur_score', 100.0) if stage1_result else 100.0,
+        'rppg_ok': signals.get('rppg_conf', 0.0) > 0.5,
+        'opticalflow_ok': signals.get('flow_variance', 0.0) < 0.4
+    }
+    # Signals that missed the deadline count as unknown, not as passed
+    for name in missing:
+        for key in FUSION_KEYS.get(name, ()):
+            del fusion_inputs[key]
+    if 'deepfake' in missing:
+        fusion_inputs['deepfake_prob'] = 0.5
+    return fusion_inputs
+
+def run_stage2(
+    capture: Dict[str, Any], 
+    stage1_result: Dict[str, Any] = None,
+    video_path: str = None,
+    context: dict = None
+) -> Dict[str, Any]:
+    """
+    Executes 'Heavy Checks' using Deep Learning and Signal Processing.
+
+    Checks performed (concurrently, as nodes of STAGE2_GRAPH):
+    1. Visual Deepfake Detection (CNN) - NEW INTEGRATION
+    2. Physiological Liveness (rPPG/Pulse)
+    3. Geometric Consistency (Landmark Jitter & Optical Flow)
+    4. Audio Security (Anti-Spoofing & Speaker Verification)
+    5. Audio-Visual Synchronization (Lip Sync)
+
+    Args:
+        capture (dict): Input data {'frames': [], 'audio': [], 'metadata': {}, 'face_boxes': []}
+        stage1_result (dict): Output from Stage 1 (for context).
+        video_path (str): Optional path to video file for alternative processing
+        context (dict): Additional context (user_id, audit_id, etc.). A RequestBudget
+                        in context['budget'] bounds the stage and cancels late signals;
+                        context['signals'] limits the checks run (e.g. DECISION_SIGNALS).
+
+    Returns:
+        dict: Structured result with:
+            - video_fake_prob: float - Aggregated deepfake probability
+            - deepfake_pass: bool - Whether deepfake check passed
+            - final_score: float - Fused risk score
+            - overall_pass: bool - Final decision
+            - audit_id: str - Tracking ID
+            - timestamp: str - ISO8601 timestamp
+            - signals: dict - All individual signal values
+            - missing_signals: list - Signals that failed or missed the stage deadline
+            - debug: dict - Debug information
+    """
+    start_time = time.time()
+    context = context or {}
+    signals = {}
+    
+    # Stage 2 gets STAGE_2_LIMIT_SEC, capped by what is left of the request budget
+    budget = get_request_budget(context)
+    stage_token = budget.stage("Stage 2", TimeoutConfig.STAGE_2_LIMIT_SEC) if budget else None
+    
+    # Generate audit ID
+    from pipeline.audit_id import generate_audit_id
+    audit_id = context.get('audit_id', generate_audit_id())
+    
+    # Unpack Data
+    frames = capture.get('frames', [])
+    audio = capture.get('audio', np.array([]))
+    sr = capture.get('sample_rate', 16000)
+    user_id = context.get('user_id', capture.get('metadata', {}).get('user_id'))
+    
+    # Pre-calculated face boxes if available (to save time), else we'd detect them here
+    # Assuming 'face_boxes' matches 'frames' length
+    face_boxes = capture.get('face_boxes', []) 
+
+    # Run the signal graph concurrently within the remaining stage budget;
+    # fusion below then works with whatever arrived in time
+    sources = {
+        'frames': frames,
+        'face_boxes': face_boxes,
+        'rppg_trace': capture.get('rppg_trace'),
+        'pcm': audio,
+        'sr': sr,
+        'user_id': user_id
+    }
+    wanted = context.get('signals')
+    remaining = TimeoutConfig.STAGE_2_LIMIT_SEC - (time.time() - start_time)
+    # A caller-supplied cache (context['artifacts'], e.g. ArtifactCache(keep=True))
+    # outlives the stage, so more signals can run later on the same capture
+    # without recomputing artifacts
+    artifacts = context.get('artifacts')
+    owns_artifacts = artifacts is None
+    if owns_artifacts:
+        artifacts = ArtifactCache()
+    try:
+        run = STAGE2_GRAPH.run(sources, wanted=wanted, cache=artifacts,
+                               timeout_sec=max(0.0, remaining), cancel_token=stage_token)
+    finally:
+        if owns_artifacts:
+            artifacts.clear()
+
+    # Defaults for checks that did not apply to this capture
+    planned = STAGE2_GRAPH.plan(sources, wanted)
+    if 'rppg' not in planned and (wanted is None or 'rppg' in wanted):
+        signals['rppg_conf'] = 0.0
+    if audio is None or len(audio) == 0:
         # No audio provided - High risk if audio was expected
         signals['audio_missing'] = 1.0
+    signals['lip_sync_score'] = 0.0
 
-    # --- 5. AUDIO-VISUAL SYNC (Lip Sync) ---
-    if frames and audio is not None and len(audio) > 0 and 'landmarks_seq' in locals():
-        # Re-use landmarks from step 3B
-        sync_res = lip_sync_score(audio, sr, frames, landmarks_seq)
-        signals['lip_sync_score'] = sync_res.get('value', 0.0) # High correlation = Real
-    else:
-        signals['lip_sync_score'] = 0.0
+    frame_scores = []
+    for name, value in run.results.items():
+        if name == 'deepfake':
+            value, frame_scores = value
+        signals.update(value)
 
-    # --- 6. IDENTITY MATCHING (Visual) ---
-    # Does the face match the ID card or enrolled photo?
-    embedder = get_face_embedder()
-    if embedder and frames and user_id:
-        # Take the best looking frame (e.g., middle)
-        mid_idx = len(frames) // 2
-        if mid_idx < len(face_boxes):
-            box = face_boxes[mid_idx]
-            x, y, w, h = box
-            face_crop = frames[mid_idx][y:y+h, x:x+w]
-            
-            # Infer embedding
-            emb_res = embedder.infer(face_crop)
-            if emb_res['success']:
-                # In a real app, fetch 'enrolled_embedding' from DB
-                # Here we mock a distance check
-                # signals['face_mismatch_score'] = cosine_dist(emb_res['embedding'], enrolled)
-                signals['face_match_checked'] = 1.0
-            else:
-                signals['face_match_failed'] = 1.0
+    if 'deepfake' in run.missing:
+        # Never pass the deepfake check by default when the model did not answer
+        signals['video_fake_prob'] = 0.0
+        signals['deepfake_pass'] = False
+        signals['deepfake_error'] = run.errors.get('deepfake', 'timeout')
+    if run.missing:
+        signals['missing_signals'] = sorted(run.missing)
+        logger.warning(f"Stage2 missing signals: {signals['missing_signals']}")
 
     # Debug: Execution time
     processing_ms = (time.time() - start_time) * 1000
@@ -280,13 +489,8 @@ def run_stage2(
         from models.fusion_scorer import get_fusion_scorer
         
         fusion_scorer = get_fusion_scorer()
-        final_score, breakdown = fusion_scorer.score({
-            'deepfake_prob': signals.get('video_fake_prob', 0.0),
-            'liveness_ok': signals.get('rppg_conf', 0.0) > 0.5,
-            'blur_score': stage1_result.get('blur_score', 100.0) if stage1_result else 100.0,
-            'rppg_ok': signals.get('rppg_conf', 0.0) > 0.5,
-            'opticalflow_ok': signals.get('flow_variance', 0.0) < 0.4
-        })
+        fusion_inputs = build_fusion_inputs(signals, stage1_result, missing=run.missing)
+        final_score, breakdown = fusion_scorer.score(fusion_inputs)
         
         overall_pass = breakdown.get('pass', True)
         
@@ -310,6 +514,7 @@ def run_stage2(
         'processing_ms': processing_ms,
         'frames_processed': len(frames),
         'deepfake_frames_analyzed': signals.get('deepfake_frames_processed', 0),
+        'missing_signals': signals.get('missing_signals', []),
         
         # All signals for debugging/monitoring
         'signals': signals,
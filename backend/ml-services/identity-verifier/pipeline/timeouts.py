@@ -1,7 +1,8 @@
 import time
 import logging
+import threading
 from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
-from typing import Callable, Any, Dict
+from typing import Callable, Any, Dict, Optional
 
 # Configure Logger
 logger = logging.getLogger("TrustGuardTimeouts")
@@ -25,19 +26,187 @@ class TimeoutConfig:
     # Total end-to-end budget before the UI should show "Try Again"
     TOTAL_REQUEST_LIMIT_SEC = 5.0
 
+    # Own deadlines of the cheap Stage 2 decision signals (from the start of
+    # the stage), so they settle early and do not wait out the CNN's budget
+    RPPG_LIMIT_SEC = 1.0          # FFT of the trace built while decoding
+    FLOW_LIMIT_SEC = 3.0          # Farneback on 128x128 face crops, ~2 s for 450 frames on one core
+    AUDIO_SPOOF_LIMIT_SEC = 2.0   # One spoof model pass over the clip
+
+    # Worker threads shared by all run_with_timeout() calls
+    EXECUTOR_WORKERS = 8
+
+
+class CancellationToken:
+    """
+    Cooperative cancellation flag, optionally tied to a deadline.
+
+    Long-running loops call raise_if_cancelled() (or check `cancelled`)
+    between iterations so that work abandoned by a timeout actually stops
+    instead of burning CPU in the background. A child token is cancelled
+    whenever its parent is, and may carry an earlier deadline.
+    """
+
+    def __init__(self, deadline: Optional[float] = None, parent: 'CancellationToken' = None,
+                 name: str = "request"):
+        """
+        Args:
+            deadline (float): Absolute time.time() after which the token counts as cancelled.
+            parent (CancellationToken): Token whose cancellation also cancels this one.
+            name (str): Label used in the VerificationTimeout message.
+        """
+        self.deadline = deadline
+        self.parent = parent
+        self.name = name
+        self._event = threading.Event()
+        self._reason = None
+
+    def cancel(self, reason: str = "cancelled"):
+        """Cancel this token (and every child derived from it)."""
+        if not self._event.is_set():
+            self._reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        if self.deadline is not None and time.time() >= self.deadline:
+            return True
+        return self.parent is not None and self.parent.cancelled
+
+    def remaining(self) -> float:
+        """Seconds until the nearest deadline in the chain (inf if none, 0 if cancelled)."""
+        if self._event.is_set():
+            return 0.0
+        remaining = float('inf') if self.deadline is None else self.deadline - time.time()
+        if self.parent is not None:
+            remaining = min(remaining, self.parent.remaining())
+        return max(0.0, remaining)
+
+    def raise_if_cancelled(self):
+        """
+        Raises:
+            VerificationTimeout: If the token (or a parent) is cancelled or past its deadline.
+        """
+        if self.cancelled:
+            reason = self._reason or "time budget exhausted"
+            raise VerificationTimeout(f"{self.name} stopped: {reason}")
+
+    def child(self, timeout_sec: Optional[float] = None, name: Optional[str] = None) -> 'CancellationToken':
+        """Token cancelled with this one, with an optional (earlier) deadline."""
+        deadline = None if timeout_sec is None else time.time() + timeout_sec
+        return CancellationToken(deadline=deadline, parent=self, name=name or self.name)
+
+
+class RequestBudget:
+    """
+    Request-wide time budget (TimeoutConfig.TOTAL_REQUEST_LIMIT_SEC).
+
+    Owned by the request context (context['budget']); each stage takes a
+    slice with stage(), whose token expires at the stage limit or at the
+    end of the request budget, whichever comes first.
+
+    Usage:
+        budget = RequestBudget()
+        context = {'user_id': ..., 'budget': budget}
+        token = budget.stage("Stage 2", TimeoutConfig.STAGE_2_LIMIT_SEC)
+        for frame in frames:
+            token.raise_if_cancelled()
+            ...
+    """
+
+    def __init__(self, total_sec: float = TimeoutConfig.TOTAL_REQUEST_LIMIT_SEC,
+                 start_time: Optional[float] = None):
+        """
+        Args:
+            total_sec (float): End-to-end budget in seconds.
+            start_time (float): When the request started (default: now).
+        """
+        self.start_time = start_time if start_time is not None else time.time()
+        self.total_sec = total_sec
+        self.token = CancellationToken(deadline=self.start_time + total_sec, name="Request")
+
+    def remaining(self) -> float:
+        return self.token.remaining()
+
+    def elapsed(self) -> float:
+        return time.time() - self.start_time
+
+    def stage(self, stage_name: str, limit_sec: float) -> CancellationToken:
+        """Token for one stage: expires after limit_sec or with the request budget."""
+        return self.token.child(limit_sec, name=stage_name)
+
+    def check(self, stage_name: str = "Request") -> float:
+        """
+        Returns:
+            float: Remaining seconds.
+
+        Raises:
+            VerificationTimeout: If the budget is exhausted or the request was cancelled.
+        """
+        if self.token.cancelled:
+            raise VerificationTimeout(f"{stage_name}: request time budget exhausted "
+                                      f"(Elapsed: {self.elapsed():.2f}s)")
+        return self.remaining()
+
+    def run(self, func: Callable, args: tuple = (), kwargs: dict = None,
+            limit_sec: Optional[float] = None, stage_name: str = "Unknown Stage") -> Any:
+        """
+        run_with_timeout() within this budget. The stage token is passed to
+        `func` as kwargs['cancel_token'] and cancelled if the stage times out.
+        """
+        self.check(stage_name)
+        timeout = self.remaining() if limit_sec is None else min(limit_sec, self.remaining())
+        token = self.token.child(timeout, name=stage_name)
+        kwargs = dict(kwargs or {}, cancel_token=token)
+        return run_with_timeout(func, args, kwargs, timeout_sec=timeout,
+                                stage_name=stage_name, cancel_token=token)
+
+    def cancel(self, reason: str = "cancelled"):
+        self.token.cancel(reason)
+
+
+def get_request_budget(context: Optional[Dict[str, Any]]) -> Optional[RequestBudget]:
+    """The RequestBudget carried by a request context, if any."""
+    return (context or {}).get('budget')
+
+
+# Long-lived executor shared by run_with_timeout() calls
+_executor_instance = None
+_executor_lock = threading.Lock()
+
+
+def get_timeout_executor() -> ThreadPoolExecutor:
+    """
+    Get singleton executor used to enforce stage timeouts.
+
+    Returns:
+        ThreadPoolExecutor instance
+    """
+    global _executor_instance
+    if _executor_instance is None:
+        with _executor_lock:
+            if _executor_instance is None:
+                _executor_instance = ThreadPoolExecutor(
+                    max_workers=TimeoutConfig.EXECUTOR_WORKERS, thread_name_prefix='stage-timeout'
+                )
+    return _executor_instance
+
 def run_with_timeout(
     func: Callable, 
     args: tuple = (), 
     kwargs: dict = None, 
     timeout_sec: float = 1.0,
-    stage_name: str = "Unknown Stage"
+    stage_name: str = "Unknown Stage",
+    cancel_token: Optional[CancellationToken] = None
 ) -> Any:
     """
-    Executes a function in a separate thread and enforces a strict timeout.
+    Executes a function on the shared executor and enforces a strict timeout.
     
     If the function takes longer than `timeout_sec`, it raises VerificationTimeout
-    and returns control to the main orchestrator (though the thread may continue 
-    in the background until finished).
+    and returns control to the main orchestrator. The function keeps running
+    in the background unless it checks `cancel_token`, which is cancelled
+    on timeout.
 
     Args:
         func (Callable): The function to run (e.g., stage2.run_stage2).
@@ -45,6 +214,7 @@ def run_with_timeout(
         kwargs (dict): Keyword arguments.
         timeout_sec (float): Max allowed time in seconds.
         stage_name (str): Label for logging.
+        cancel_token (CancellationToken): Token the function polls; cancelled on timeout.
 
     Returns:
         The result of func(*args, **kwargs).
@@ -58,32 +228,36 @@ def run_with_timeout(
 
     start_t = time.time()
     
-    # We use a ThreadPoolExecutor to run the task asynchronously
-    with ThreadPoolExecutor(max_workers=1) as executor:
-        future = executor.submit(func, *args, **kwargs)
+    # Run on the long-lived executor; a per-call executor would also block
+    # on exit until the timed-out function finished
+    future = get_timeout_executor().submit(func, *args, **kwargs)
+    
+    try:
+        # wait for result with a timeout
+        result = future.result(timeout=timeout_sec)
+        elapsed = time.time() - start_t
         
-        try:
-            # wait for result with a timeout
-            result = future.result(timeout=timeout_sec)
-            elapsed = time.time() - start_t
-            
-            # Warn if we are getting close to the limit (within 80%)
-            if elapsed > (timeout_sec * 0.8):
-                logger.warning(f"Performance Warning: {stage_name} took {elapsed:.2f}s (Limit: {timeout_sec}s)")
-            
-            return result
-
-        except FutureTimeoutError:
-            elapsed = time.time() - start_t
-            msg = f"{stage_name} timed out after {elapsed:.2f}s (Limit: {timeout_sec}s)"
-            logger.error(msg)
-            # We raise our custom exception to be caught by the Orchestrator
-            raise VerificationTimeout(msg)
+        # Warn if we are getting close to the limit (within 80%)
+        if elapsed > (timeout_sec * 0.8):
+            logger.warning(f"Performance Warning: {stage_name} took {elapsed:.2f}s (Limit: {timeout_sec}s)")
         
-        except Exception as e:
-            # Re-raise any other exception that happened inside the stage
-            logger.error(f"{stage_name} crashed: {e}")
-            raise e
+        return result
+
+    except FutureTimeoutError:
+        elapsed = time.time() - start_t
+        msg = f"{stage_name} timed out after {elapsed:.2f}s (Limit: {timeout_sec}s)"
+        logger.error(msg)
+        # Stop the abandoned work: cancel it if not started, else signal the token
+        future.cancel()
+        if cancel_token is not None:
+            cancel_token.cancel(msg)
+        # We raise our custom exception to be caught by the Orchestrator
+        raise VerificationTimeout(msg)
+    
+    except Exception as e:
+        # Re-raise any other exception that happened inside the stage
+        logger.error(f"{stage_name} crashed: {e}")
+        raise e
 
 def check_time_budget(start_time: float, max_duration: float) -> float:
     """
@@ -1,8 +1,25 @@
 """
 Unit tests for ingest/capture.py: frame/audio extraction and normalization.
 """
+import io
+import os
+import struct
+import shutil
+import tempfile
+import subprocess
 import unittest
+from unittest import mock
+import cv2
+import numpy as np
 from ingest import capture
+from ingest.face_localizer import FaceLocalizer
+from ingest.frame_store import FrameStore
+from ingest.frame_pipeline import FramePipeline, FaceBoxConsumer, RoiMeanConsumer, CacheConsumer
+from features.rppg import skin_roi_mean
+from ingest import demux
+from ingest.frame_utils import extract_frames, select_changed_frames, propagate_scores
+from ingest import stream_utils
+from ingest import fingerprint
 
 class TestCapture(unittest.TestCase):
     def test_capture_from_file_stub(self):
@@ -11,9 +28,442 @@ class TestCapture(unittest.TestCase):
         self.assertIsNotNone(result)
         self.assertEqual(len(result.frames), 0)
 
-    @unittest.skip("Stream ingestion not implemented yet.")
     def test_capture_from_stream_stub(self):
-        pass
+        tmp = tempfile.mkdtemp()
+        try:
+            with open(_write_video(os.path.join(tmp, 'clip.avi'), n_frames=12), 'rb') as f:
+                stream = io.BytesIO(f.read())
+            result = capture.capture_from_stream(stream, suffix='.avi')
+            self.assertEqual(len(result.frames), 12)
+            self.assertEqual(len(result.face_boxes), 12)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _write_video(path, n_frames=20, size=(640, 360), fps=30.0):
+    """Write a small synthetic MJPG video and return its path."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, size)
+    for i in range(n_frames):
+        frame = np.full((size[1], size[0], 3), (i * 10) % 255, dtype=np.uint8)
+        cv2.putText(frame, str(i), (20, 60), cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 3)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+class TestIngestCaptureLimits(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.video = _write_video(os.path.join(self.tmp, 'clip.avi'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_downscales_while_decoding(self):
+        cap = capture.IngestCapture(video_path=self.video, detect_faces=False, max_side=320)
+        self.assertEqual(len(cap.frames), 20)
+        self.assertEqual(cap.frames[0].shape, (180, 320, 3))
+        self.assertEqual(cap.source_size, (640, 360))
+        self.assertAlmostEqual(cap.scale_factor, 0.5)
+        self.assertEqual(cap.face_boxes[0], (0, 0, 320, 180))
+        self.assertEqual(cap.scale_box_to_source(cap.face_boxes[0]), (0, 0, 640, 360))
+        self.assertFalse(cap.truncated)
+
+    def test_frame_cap(self):
+        cap = capture.IngestCapture(video_path=self.video, detect_faces=False, max_frames=5)
+        self.assertEqual(len(cap.frames), 5)
+        self.assertTrue(cap.truncated)
+
+    def test_byte_budget(self):
+        frame_bytes = 320 * 180 * 3
+        cap = capture.IngestCapture(video_path=self.video, detect_faces=False,
+                                    max_side=320, max_frames=None, max_bytes=frame_bytes * 7)
+        self.assertEqual(len(cap.frames), 7)
+        self.assertTrue(cap.truncated)
+
+    def test_spills_over_memory_budget(self):
+        cap = capture.IngestCapture(video_path=self.video, detect_faces=False,
+                                    max_side=320, memory_budget=320 * 180 * 3 * 4)
+        self.assertEqual(len(cap.frames), 20)
+        self.assertTrue(cap.frames.is_spilled)
+        self.assertEqual(cap.frames.array.shape, (20, 180, 320, 3))
+        cap.close()
+
+
+class _ScriptedLocalizer(FaceLocalizer):
+    """FaceLocalizer with a fake detector returning boxes from a dict."""
+    def __init__(self, script, **kwargs):
+        super().__init__(**kwargs)
+        self.script = script
+        self.detected_on = []
+
+    def detect(self, frame):
+        idx = len(self.detected_on) * self.detect_every
+        self.detected_on.append(idx)
+        return self.script.get(idx)
+
+
+class TestFaceLocalizer(unittest.TestCase):
+    def setUp(self):
+        self.frames = [np.zeros((120, 160, 3), dtype=np.uint8) for _ in range(11)]
+
+    def test_detects_every_k_and_interpolates(self):
+        loc = _ScriptedLocalizer({0: (10, 10, 40, 40), 5: (20, 10, 40, 40), 10: (30, 20, 40, 40)},
+                                 detect_every=5)
+        boxes = loc.localize(self.frames)
+        self.assertEqual(loc.detected_on, [0, 5, 10])
+        self.assertEqual(len(boxes), len(self.frames))
+        self.assertEqual(boxes[0], (10, 10, 40, 40))
+        self.assertEqual(boxes[2], (14, 10, 40, 40))
+        self.assertEqual(boxes[10], (30, 20, 40, 40))
+
+    def test_missed_keyframe_is_bridged(self):
+        loc = _ScriptedLocalizer({0: (10, 10, 40, 40), 10: (30, 10, 40, 40)}, detect_every=5)
+        boxes = loc.localize(self.frames)
+        self.assertEqual(boxes[5], (20, 10, 40, 40))
+
+    def test_no_detection_falls_back_to_full_frame(self):
+        loc = _ScriptedLocalizer({}, detect_every=5)
+        boxes = loc.localize(self.frames)
+        self.assertEqual(boxes, [(0, 0, 160, 120)] * len(self.frames))
+
+
+class TestFramePipeline(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.frames = [rng.randint(0, 255, (120, 160, 3), dtype=np.uint8) for _ in range(18)]
+        # Keyframe 5 is missed, nothing is found after 10
+        self.script = {0: (10, 10, 40, 40), 10: (30, 20, 60, 40)}
+
+    def test_matches_sequential_localization(self):
+        store = FrameStore()
+        def decode():
+            for i, f in enumerate(self.frames):
+                store.append(f)
+                yield store[i]
+
+        pipeline = FramePipeline(queue_size=2)
+        faces = pipeline.add(FaceBoxConsumer(_ScriptedLocalizer(self.script, detect_every=5)))
+        roi = pipeline.add(RoiMeanConsumer(), source=faces)
+        pipeline.add(CacheConsumer(store.gray))
+        self.assertEqual(pipeline.run(decode()), len(self.frames))
+
+        expected = _ScriptedLocalizer(self.script, detect_every=5).localize(self.frames)
+        self.assertEqual(faces.boxes, expected)
+        self.assertEqual(roi.trace, [skin_roi_mean(f, b) for f, b in zip(self.frames, expected)])
+        self.assertEqual(store._gray[1], len(self.frames))  # cache filled while decoding
+
+    def test_decoder_error_is_raised(self):
+        def decode():
+            yield from self.frames[:3]
+            raise RuntimeError("corrupt stream")
+
+        pipeline = FramePipeline(queue_size=1)
+        pipeline.add(FaceBoxConsumer(_ScriptedLocalizer(self.script)))
+        pipeline.add(CacheConsumer(lambda: None))
+        with self.assertRaises(RuntimeError):
+            pipeline.run(decode())
+
+    def test_ingest_capture_pipelined_matches_sequential(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            video = _write_video(os.path.join(tmp, 'clip.avi'), n_frames=12)
+            piped = capture.IngestCapture(video_path=video, max_side=320)
+            serial = capture.IngestCapture(video_path=video, max_side=320, pipelined=False)
+            self.assertTrue(np.array_equal(piped.frames.array, serial.frames.array))
+            self.assertEqual(piped.face_boxes, serial.face_boxes)
+            self.assertEqual(len(piped.rppg_trace), 12)
+            self.assertIsNone(serial.rppg_trace)
+            self.assertEqual(piped.frames._gray[1], 12)
+            piped.close()
+            serial.close()
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+class TestExtractFrames(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.video = _write_video(os.path.join(cls.tmp, 'clip.avi'), n_frames=40, size=(160, 120))
+        cls.full = extract_frames(cls.video)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def assertSameFrames(self, frames, ids):
+        self.assertEqual(len(frames), len(ids))
+        for frame, i in zip(frames, ids):
+            np.testing.assert_array_equal(frame, self.full[i])
+
+    def test_frame_skip(self):
+        self.assertEqual(len(self.full), 40)
+        frames = extract_frames(self.video, frame_skip=5, max_frames=3)
+        self.assertSameFrames(frames, [0, 5, 10])
+
+    def test_explicit_indices_with_seeking(self):
+        frames, ids = extract_frames(self.video, indices=[33, 2, 2, 20, 99], seek_gap=4,
+                                     return_indices=True)
+        self.assertEqual(ids, [2, 20, 33])
+        self.assertSameFrames(frames, ids)
+
+    def test_timestamps(self):
+        frames, ids = extract_frames(self.video, timestamps=[0.0, 0.5, 1.0], return_indices=True)
+        self.assertEqual(ids, [0, 15, 30])
+        self.assertSameFrames(frames, ids)
+
+
+class TestProbeVideo(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.video = _write_video(os.path.join(self.tmp, 'clip.avi'), n_frames=40)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_probe_decodes_middle_frame_only(self):
+        probe = capture.probe_video(self.video, max_side=320)
+        self.assertEqual(probe['frame_indices'], [20])
+        self.assertEqual(probe['container']['total_frames'], 40)
+        self.assertEqual((probe['container']['width'], probe['container']['height']), (640, 360))
+
+        full = capture.IngestCapture(video_path=self.video, detect_faces=False, max_side=320)
+        np.testing.assert_array_equal(probe['frames'][0], full.frames[len(full.frames) // 2])
+
+    def test_probe_respects_byte_budget(self):
+        # Budget for 24 frames at 320x180: the byte cap binds, not max_frames
+        budget = 320 * 180 * 3 * 24
+        probe = capture.probe_video(self.video, max_side=320, max_bytes=budget)
+        full = capture.IngestCapture(video_path=self.video, detect_faces=False,
+                                     max_side=320, max_bytes=budget)
+        self.assertEqual(len(full.frames), 24)
+        self.assertEqual(probe['frame_indices'], [12])
+        np.testing.assert_array_equal(probe['frames'][0], full.frames[len(full.frames) // 2])
+
+    def test_probe_several_frames(self):
+        probe = capture.probe_video(self.video, n_frames=3)
+        self.assertIn(20, probe['frame_indices'])
+        self.assertEqual(len(probe['frames']), len(probe['frame_indices']))
+
+    def test_probe_fingerprint_matches_capture(self):
+        probe = capture.probe_video(self.video, fingerprint=True)
+        self.assertEqual(probe['frame_indices'], [20])
+        full = capture.IngestCapture(video_path=self.video, detect_faces=False)
+        self.assertEqual(len(probe['fingerprint']), 1)
+        self.assertEqual(probe['fingerprint'], full.get('fingerprint'))
+
+    def test_probe_missing_file(self):
+        probe = capture.probe_video(os.path.join(self.tmp, 'missing.mp4'))
+        self.assertEqual(probe['frames'], [])
+
+
+def _box(box_type, payload=b''):
+    return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+
+class TestStreamIngest(unittest.TestCase):
+    def test_needs_seeking(self):
+        ftyp = _box(b'ftyp', b'isom\x00\x00\x02\x00')
+        self.assertFalse(stream_utils.needs_seeking(ftyp + _box(b'moov', b'x' * 16) + _box(b'mdat')))
+        self.assertTrue(stream_utils.needs_seeking(ftyp + _box(b'free') + _box(b'mdat', b'x' * 16)))
+        self.assertTrue(stream_utils.needs_seeking(ftyp))
+        self.assertFalse(stream_utils.needs_seeking(b'\x1aE\xdf\xa3' + b'\x00' * 60))  # matroska/webm
+
+    def test_video_source_spools_when_seeking_needed(self):
+        data = _box(b'ftyp', b'isom\x00\x00\x02\x00') + _box(b'mdat', b'x' * 32)
+        source = stream_utils.VideoSource.from_stream(io.BytesIO(data), suffix='.mp4')
+        self.assertFalse(source.is_pipe)
+        with open(source.path, 'rb') as f:
+            self.assertEqual(f.read(), data)
+        source.cleanup()
+        self.assertFalse(os.path.exists(source.path))
+
+    def test_video_source_pipes_streamable_container(self):
+        stream = io.BytesIO(b'RIFF' + b'\x00' * 60)
+        source = stream_utils.VideoSource.from_stream(stream)
+        self.assertTrue(source.is_pipe)
+        self.assertEqual(stream.tell(), 0)
+
+    def test_piped_capture_stays_resident(self):
+        if not demux.ffmpeg_available():
+            self.skipTest("ffmpeg not available")
+        tmp = tempfile.mkdtemp()
+        try:
+            with open(_write_video(os.path.join(tmp, 'clip.avi'), n_frames=12), 'rb') as f:
+                stream = io.BytesIO(f.read())
+            # Room for 40 frames: more than the clip, far less than max_frames
+            cap = capture.IngestCapture(video_stream=stream, detect_faces=False, max_side=320,
+                                        memory_budget=320 * 180 * 3 * 40)
+            self.assertEqual(len(cap.frames), 12)
+            self.assertFalse(cap.frames.is_spilled)
+            cap.close()
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+class TestAudioDecoding(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.video = _write_video(os.path.join(self.tmp, 'clip.avi'), n_frames=10)
+        self.load_audio = mock.patch.object(
+            capture, 'load_audio', return_value=(np.zeros(16000, dtype=np.float32), 16000)
+        ).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_audio_decoded_lazily_once(self):
+        cap = capture.IngestCapture(video_path=self.video, detect_faces=False)
+        self.load_audio.assert_not_called()
+        self.assertEqual(len(cap.audio), 16000)
+        self.assertEqual(cap.get('sample_rate'), 16000)
+        self.assertEqual(self.load_audio.call_count, 1)
+        self.assertEqual(self.load_audio.call_args[0][0], self.video)
+
+    def test_audio_path_skips_video_track(self):
+        audio_path = os.path.join(self.tmp, 'voice.wav')
+        open(audio_path, 'wb').close()
+        capture.IngestCapture(video_path=self.video, audio_path=audio_path,
+                              detect_faces=False, decode_audio=True)
+        self.assertEqual(self.load_audio.call_count, 1)
+        self.assertEqual(self.load_audio.call_args[0][0], audio_path)
+
+    def test_single_pass_demux(self):
+        if not demux.ffmpeg_available():
+            self.skipTest("ffmpeg not available")
+        path = os.path.join(self.tmp, 'av.mp4')
+        subprocess.run([demux.FFMPEG_BIN, '-v', 'error', '-y',
+                        '-f', 'lavfi', '-i', 'testsrc=size=320x240:rate=30',
+                        '-f', 'lavfi', '-i', 'sine=frequency=440:sample_rate=44100',
+                        '-t', '1', '-c:v', 'mpeg4', '-c:a', 'aac', path], check=True)
+        cap = capture.IngestCapture(video_path=path, detect_faces=False, decode_audio=True)
+        self.load_audio.assert_not_called()
+        self.assertEqual(len(cap.frames), 30)
+        self.assertAlmostEqual(len(cap.audio) / 16000.0, 1.0, delta=0.1)
+
+
+class TestFrameStore(unittest.TestCase):
+    def setUp(self):
+        self.frames = [np.full((24, 32, 3), i, dtype=np.uint8) for i in range(10)]
+
+    def test_list_compatible_and_contiguous(self):
+        store = FrameStore(capacity=4)  # forces regrowth
+        for f in self.frames:
+            store.append(f)
+        self.assertEqual(len(store), 10)
+        self.assertTrue(store.array.flags['C_CONTIGUOUS'])
+        self.assertEqual(store[3][0, 0, 0], 3)
+        self.assertEqual([int(f[0, 0, 0]) for f in store], list(range(10)))
+        self.assertFalse(FrameStore())
+
+    def test_slices_are_zero_copy_views(self):
+        store = FrameStore.from_frames(self.frames)
+        view = store[2:8][::2]
+        self.assertIsInstance(view, FrameStore)
+        self.assertEqual([int(f[0, 0, 0]) for f in view], [2, 4, 6])
+        self.assertTrue(np.shares_memory(view.array, store.array))
+        with self.assertRaises(TypeError):
+            view.append(self.frames[0])
+
+    def test_cached_gray_and_thumbnails(self):
+        store = FrameStore.from_frames(self.frames[:5])
+        gray = store.gray()
+        self.assertEqual(gray.shape, (5, 24, 32))
+        self.assertTrue(np.shares_memory(store.gray(), gray))
+        store.append(self.frames[5])
+        self.assertEqual(store.gray().shape[0], 6)
+        self.assertEqual(store.thumbnails((8, 6)).shape, (6, 6, 8))
+        self.assertEqual(store[1:3].thumbnails((8, 6), gray=False).shape, (2, 6, 8, 3))
+
+    def test_spill_to_memmap(self):
+        store = FrameStore(memory_budget=24 * 32 * 3 * 2)
+        for f in self.frames:
+            store.append(f)
+        self.assertTrue(store.is_spilled)
+        self.assertEqual(int(store[9][0, 0, 0]), 9)
+        store.close()
+        self.assertEqual(len(store), 0)
+
+    def test_spills_only_frames_beyond_budget(self):
+        frame_bytes = 24 * 32 * 3
+        store = FrameStore(capacity=1, memory_budget=frame_bytes * 4)
+        for f in self.frames[:4]:
+            store.append(f)
+        self.assertFalse(store.is_spilled)
+
+        for f in self.frames[4:]:
+            store.append(f)
+        head = store._data.parts[0]
+        self.assertNotIsInstance(head, np.memmap)
+        self.assertEqual(head.shape[0], 4)
+        self.assertEqual(store._resident_bytes, frame_bytes * 4)
+        # Tail segments are appended, never reallocated: one live file per segment
+        self.assertEqual(len(store._spill_files), len(store._data.parts) - 1)
+
+        self.assertEqual([int(f[0, 0, 0]) for f in store], list(range(10)))
+        self.assertEqual(store.array[:, 0, 0, 0].tolist(), list(range(10)))
+        self.assertEqual([int(f[0, 0, 0]) for f in store[2:9:3]], [2, 5, 8])
+        self.assertEqual(store.gray()[:, 0, 0].tolist(), list(range(10)))
+
+
+class TestFrameSelection(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        base = rng.randint(0, 255, (64, 64), dtype=np.uint8)
+        # 10 near-identical frames (sensor noise), then a cut to new content for 5
+        noise = lambda img: np.clip(img.astype(int) + rng.randint(-1, 2, img.shape), 0, 255).astype(np.uint8)
+        other = rng.randint(0, 255, (64, 64), dtype=np.uint8)
+        self.thumbs = np.stack([noise(base) for _ in range(10)] + [noise(other) for _ in range(5)])
+
+    def test_static_frames_are_skipped(self):
+        for method in ('mad', 'dhash'):
+            self.assertEqual(select_changed_frames(self.thumbs, method=method), [0, 10])
+
+    def test_full_frames_are_downsampled(self):
+        frames = [cv2.resize(t, (320, 240)) for t in self.thumbs]
+        self.assertEqual(select_changed_frames(frames), [0, 10])
+
+    def test_slow_drift_is_kept(self):
+        # 1 grey level per frame: below the threshold frame to frame, not in total
+        drift = np.stack([np.full((64, 64), 100 + i, np.uint8) for i in range(10)])
+        self.assertEqual(select_changed_frames(drift), [0, 4, 8])
+
+    def test_scores_propagate_to_nearest_frame(self):
+        scores = propagate_scores([0, 10], [0.2, 0.8], 15)
+        np.testing.assert_allclose(scores, [0.2] * 6 + [0.8] * 9)
+
+
+class TestFingerprint(unittest.TestCase):
+    @staticmethod
+    def _scene(seed):
+        rng = np.random.default_rng(seed)
+        img = cv2.GaussianBlur(rng.random((240, 320, 3)).astype(np.float32), (0, 0), 12)
+        img = ((img - img.min()) / (img.max() - img.min()) * 255).astype(np.uint8)
+        cv2.circle(img, (int(rng.integers(100, 220)), 120), 60, (200, 180, 160), -1)
+        return img
+
+    def test_phash_survives_reencoding(self):
+        img = self._scene(1)
+        h = fingerprint.phash(img)
+        jpeg = cv2.imdecode(cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, 30])[1], cv2.IMREAD_COLOR)
+        self.assertLessEqual(fingerprint.hamming(h, fingerprint.phash(jpeg)), 2)
+        self.assertLessEqual(fingerprint.hamming(h, fingerprint.phash(cv2.resize(img, (160, 120)))), 2)
+        self.assertLessEqual(fingerprint.hamming(h, fingerprint.phash(img[12:228, 16:304])), 11)
+        for seed in range(2, 10):
+            self.assertGreater(fingerprint.hamming(h, fingerprint.phash(self._scene(seed))), 11)
+
+    def test_flat_frames_skipped(self):
+        self.assertIsNone(fingerprint.phash(np.zeros((48, 64), dtype=np.uint8)))
+
+    def test_one_hash_per_second(self):
+        self.assertEqual(fingerprint.second_indices(30.0, 100), [15, 45, 75])
+        self.assertEqual(fingerprint.second_indices(30.0, 10), [5])
+        self.assertEqual(fingerprint.second_indices(0.0, 10), [])
+        frames = [self._scene(i // 30) for i in range(90)]
+        self.assertEqual(len(fingerprint.video_fingerprint(frames, 30.0)), 3)
+
 
 if __name__ == '__main__':
     unittest.main()
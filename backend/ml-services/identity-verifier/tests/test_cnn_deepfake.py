@@ -6,6 +6,7 @@ Tests model wrappers, inference pipeline, and integration hooks.
 import unittest
 import numpy as np
 import tempfile
+import time
 import os
 from pathlib import Path
 
@@ -102,6 +103,119 @@ class TestDeepfakeInference(unittest.TestCase):
         self.assertAlmostEqual(result, expected, places=5)
 
 
+class TestAdaptiveSampling(unittest.TestCase):
+    """Test sequential-test frame sampling."""
+
+    def _run(self, probs, **kwargs):
+        from unittest import mock
+        from inference import deepfake_inference
+        # Each "crop" is its own fake probability
+        crops = [np.full((4, 4, 3), p) for p in probs]
+        predict = lambda frames, **kw: [float(f[0, 0, 0]) for f in frames]
+        with mock.patch.object(deepfake_inference, 'run_deepfake_model', side_effect=predict) as model:
+            result = deepfake_inference.adaptive_deepfake_inference(crops, **kwargs)
+        return result, model.call_count
+
+    def test_stratified_order_is_a_permutation(self):
+        from inference.deepfake_inference import stratified_order
+        self.assertEqual(stratified_order(8), [0, 4, 2, 6, 1, 5, 3, 7])
+        order = stratified_order(37)
+        self.assertEqual(sorted(order), list(range(37)))
+        # The first 4 samples are spread evenly over the video
+        self.assertGreaterEqual(np.diff(sorted(order[:4])).min(), 37 // 4)
+
+    def test_clear_video_stops_early(self):
+        rng = np.random.RandomState(0)
+        result, calls = self._run(list(rng.uniform(0.02, 0.12, 400)), min_frames=8, batch_size=8)
+        self.assertTrue(result['stopped_early'])
+        self.assertEqual(result['frames_processed'], 8)
+        self.assertEqual(calls, 1)
+        self.assertLess(result['ci'][1], 0.5)
+
+    def test_ambiguous_video_is_capped(self):
+        rng = np.random.RandomState(0)
+        probs = list(rng.choice([0.1, 0.9], 400))
+        result, _ = self._run(probs, min_frames=8, max_frames=32, batch_size=8)
+        self.assertFalse(result['stopped_early'])
+        self.assertEqual(result['frames_processed'], 32)
+        self.assertEqual(len(set(result['frame_indices'])), 32)
+
+    def test_short_video_uses_every_frame(self):
+        result, _ = self._run([0.45, 0.55, 0.5], min_frames=8)
+        self.assertEqual(result['frames_processed'], 3)
+        self.assertAlmostEqual(result['video_fake_prob'], 0.5)
+
+
+class TestInferenceBatcher(unittest.TestCase):
+    """Test cross-request micro-batching."""
+
+    def setUp(self):
+        import threading
+        self.calls = []
+        self.gate = threading.Event()
+
+        def predict(frames, batch_size):
+            self.gate.wait(5)
+            self.calls.append(len(frames))
+            return [float(f) for f in frames]
+        self.predict = predict
+
+    def test_concurrent_requests_share_a_batch(self):
+        from inference.batcher import InferenceBatcher
+        batcher = InferenceBatcher(self.predict, max_batch_size=32, max_wait_ms=50)
+        try:
+            futures = [batcher.submit([i, i + 0.5]) for i in range(4)]
+            self.gate.set()
+            results = [f.result(timeout=5) for f in futures]
+        finally:
+            batcher.close()
+        self.assertEqual(results, [[i, i + 0.5] for i in range(4)])
+        self.assertEqual(self.calls, [8])
+
+    def test_batches_respect_max_size(self):
+        from inference.batcher import InferenceBatcher
+        batcher = InferenceBatcher(self.predict, max_batch_size=4, max_wait_ms=50)
+        try:
+            futures = [batcher.submit([i, i]) for i in range(5)]
+            self.gate.set()
+            for f in futures:
+                f.result(timeout=5)
+        finally:
+            batcher.close()
+        self.assertTrue(all(n <= 4 for n in self.calls))
+        self.assertEqual(sum(self.calls), 10)
+
+    def test_errors_reach_every_request_in_the_batch(self):
+        from inference.batcher import InferenceBatcher
+
+        def broken(frames, batch_size):
+            raise RuntimeError("model failed")
+        batcher = InferenceBatcher(broken, max_wait_ms=20)
+        try:
+            futures = [batcher.submit([1]), batcher.submit([2])]
+            for f in futures:
+                with self.assertRaises(RuntimeError):
+                    f.result(timeout=5)
+            self.assertEqual(batcher.predict([]), [])
+        finally:
+            batcher.close()
+
+    def test_predict_gives_up_at_timeout(self):
+        from concurrent.futures import TimeoutError as FutureTimeoutError
+        from inference.batcher import InferenceBatcher
+        batcher = InferenceBatcher(self.predict, max_wait_ms=1)
+        try:
+            blocker = batcher.submit([1])       # holds the worker until the gate opens
+            time.sleep(0.05)                    # let it start alone
+            with self.assertRaises(FutureTimeoutError):
+                batcher.predict([2], timeout=0.05)
+            self.gate.set()
+            self.assertEqual(blocker.result(timeout=5), [1.0])
+        finally:
+            batcher.close()
+        self.assertEqual(self.calls, [1])       # the abandoned request never ran
+
+
 class TestModelWrappers(unittest.TestCase):
     """Test model wrapper classes."""
     
@@ -152,6 +266,35 @@ class TestModelWrappers(unittest.TestCase):
         except Exception as e:
             self.skipTest(f"EfficientNetWrapper init failed: {e}")
     
+    def test_batch_preprocessing_reuses_buffer(self):
+        """Test vectorized preprocessing shape, dtype and buffer reuse."""
+        try:
+            from models.efficientnet_wrapper import EfficientNetWrapper
+            
+            wrapper = EfficientNetWrapper(
+                checkpoint_path=self.checkpoint_path,
+                device='cpu'
+            )
+        except Exception as e:
+            self.skipTest(f"EfficientNetWrapper init failed: {e}")
+        
+        # Mixed crop sizes, as produced by a face detector
+        frames = [
+            np.random.randint(0, 255, (120 + 20 * i, 100 + 10 * i, 3), dtype=np.uint8)
+            for i in range(4)
+        ]
+        batch = wrapper._preprocess_batch(frames)
+        buffer = wrapper._buffers.array
+        
+        self.assertEqual(tuple(batch.shape), (4, 3, 224, 224))
+        self.assertEqual(str(batch.dtype), 'torch.float32')
+        
+        # A smaller batch reuses the same backing buffer
+        single = wrapper._preprocess_frame(frames[0])
+        self.assertEqual(tuple(single.shape), (1, 3, 224, 224))
+        self.assertIs(wrapper._buffers.array, buffer)
+        self.assertTrue(np.allclose(single.numpy(), batch[:1].numpy()))
+    
     def test_get_detector_factory(self):
         """Test get_detector factory function."""
         try:
@@ -160,6 +303,10 @@ class TestModelWrappers(unittest.TestCase):
             detector = get_detector(name='xception', checkpoint=self.checkpoint_path)
             self.assertIsNotNone(detector)
             
+            # Second call is served from the detector pool
+            again = get_detector(name='xception', checkpoint=self.checkpoint_path)
+            self.assertIs(detector, again)
+            
             # Test unknown model name
             with self.assertRaises(ValueError):
                 get_detector(name='unknown_model')
@@ -167,6 +314,111 @@ class TestModelWrappers(unittest.TestCase):
             self.skipTest(f"get_detector failed: {e}")
 
 
+class TestDetectorPool(unittest.TestCase):
+    """Test process-wide detector pool."""
+    
+    def _make_loader(self, calls, n_features=256):
+        """Loader building a tiny torch model (~n_features^2 * 4 bytes)."""
+        import torch
+        
+        class _Detector:
+            def __init__(self):
+                self.model = torch.nn.Linear(n_features, n_features)
+        
+        def loader():
+            calls.append(1)
+            return _Detector()
+        return loader
+    
+    def test_pool_reuses_loaded_detector(self):
+        """Test that a second get() for the same key is a hit, not a load."""
+        try:
+            from models.detector_pool import DetectorPool
+            
+            pool = DetectorPool(max_memory_mb=16)
+            calls = []
+            loader = self._make_loader(calls)
+            
+            first = pool.get(('xception', '/tmp/a.pth', 'cpu'), loader)
+            second = pool.get(('xception', '/tmp/a.pth', 'cpu'), loader)
+            
+            self.assertIs(first, second)
+            self.assertEqual(len(calls), 1)
+            stats = pool.stats()
+            self.assertEqual(stats['loads'], 1)
+            self.assertEqual(stats['hits'], 1)
+            self.assertGreater(stats['memory_bytes'], 0)
+        except ImportError as e:
+            self.skipTest(f"PyTorch not available: {e}")
+    
+    def test_pool_evicts_least_recently_used(self):
+        """Test LRU eviction once the memory cap is exceeded."""
+        try:
+            from models.detector_pool import DetectorPool
+            
+            # Each detector is ~0.26 MB, so only two fit
+            pool = DetectorPool(max_memory_mb=0.6)
+            calls = []
+            loader = self._make_loader(calls)
+            
+            pool.get('a', loader)
+            pool.get('b', loader)
+            pool.get('a', loader)  # 'b' is now least recently used
+            pool.get('c', loader)
+            
+            self.assertIn('a', pool)
+            self.assertIn('c', pool)
+            self.assertNotIn('b', pool)
+            self.assertEqual(pool.stats()['evictions'], 1)
+        except ImportError as e:
+            self.skipTest(f"PyTorch not available: {e}")
+    
+    def test_pool_loads_once_under_concurrency(self):
+        """Test that concurrent misses on one key trigger a single load."""
+        try:
+            import threading
+            import time
+            from models.detector_pool import DetectorPool
+            
+            pool = DetectorPool(max_memory_mb=16)
+            calls = []
+            inner = self._make_loader(calls)
+            
+            def slow_loader():
+                time.sleep(0.05)
+                return inner()
+            
+            results = []
+            threads = [
+                threading.Thread(target=lambda: results.append(pool.get('k', slow_loader)))
+                for _ in range(8)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            
+            self.assertEqual(len(calls), 1)
+            self.assertTrue(all(r is results[0] for r in results))
+        except ImportError as e:
+            self.skipTest(f"PyTorch not available: {e}")
+    
+    def test_load_error_is_counted_and_not_cached(self):
+        """Test that a failing loader propagates and leaves no entry behind."""
+        from models.detector_pool import DetectorPool
+        
+        pool = DetectorPool()
+        
+        def bad_loader():
+            raise RuntimeError("boom")
+        
+        with self.assertRaises(RuntimeError):
+            pool.get('bad', bad_loader)
+        
+        self.assertNotIn('bad', pool)
+        self.assertEqual(pool.stats()['load_errors'], 1)
+
+
 class TestIntegrationHook(unittest.TestCase):
     """Test integration with face processor."""
     
@@ -331,6 +583,7 @@ def run_tests():
     # Add test classes
     suite.addTests(loader.loadTestsFromTestCase(TestDeepfakeInference))
     suite.addTests(loader.loadTestsFromTestCase(TestModelWrappers))
+    suite.addTests(loader.loadTestsFromTestCase(TestDetectorPool))
     suite.addTests(loader.loadTestsFromTestCase(TestIntegrationHook))
     suite.addTests(loader.loadTestsFromTestCase(TestGradCAM))
     suite.addTests(loader.loadTestsFromTestCase(TestCNNDeepfakeLegacy))
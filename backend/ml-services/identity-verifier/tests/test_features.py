@@ -0,0 +1,156 @@
+"""
+Unit tests for features/: liveness signal extractors.
+"""
+import unittest
+import cv2
+import numpy as np
+from features.duplication import frame_duplication_ratio, thumbnail_stack
+from features.optical_flow import flow_consistency
+from features.rppg import RPPGTracker, extract_rppg, roi_means, skin_roi_mean
+from ingest.frame_store import FrameStore
+
+
+def _moving_frames(n, size=(160, 120), seed=0):
+    """Frames of a random texture scrolling one step per frame."""
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 255, (size[1], size[0] * 4, 3), dtype=np.uint8)
+    return [np.ascontiguousarray(base[:, i * 4:i * 4 + size[0]]) for i in range(n)]
+
+
+class TestFrameDuplication(unittest.TestCase):
+    def test_counts_frozen_frames(self):
+        frames = _moving_frames(31)
+        frames[10] = frames[9].copy()
+        frames[20] = frames[19].copy()
+        result = frame_duplication_ratio(frames)
+        self.assertEqual(result['debug']['duplicates_found'], 2)
+        self.assertAlmostEqual(result['value'], 2 / 30.0)
+        self.assertEqual(result['confidence'], 1.0)
+        self.assertNotIn('loop_ratio', result)
+
+    def test_thumbnail_inputs_agree(self):
+        frames = _moving_frames(12)
+        frames[5] = frames[4].copy()
+        store = FrameStore()
+        for f in frames:
+            store.append(f)
+        thumbs = store.thumbnails((64, 64))
+
+        self.assertIs(thumbnail_stack(thumbs), thumbs)
+        for source in (store, thumbs):
+            result = frame_duplication_ratio(source)
+            self.assertEqual(result['debug']['duplicates_found'], 1)
+
+    def test_loops_found(self):
+        frames = _moving_frames(40)
+        frames[30:36] = [f.copy() for f in frames[5:11]]   # replayed segment
+        frames[15] = frames[14].copy()                      # a freeze is not a loop
+        result = frame_duplication_ratio(frames, detect_loops=True)
+        self.assertEqual(result['debug']['loops_found'], 6)
+        self.assertEqual(result['debug']['first_loop'], [5, 30])
+        self.assertAlmostEqual(result['loop_ratio'], 6 / 40.0)
+
+    def test_insufficient_frames(self):
+        result = frame_duplication_ratio([np.zeros((8, 8), dtype=np.uint8)])
+        self.assertEqual(result['value'], 0.0)
+        self.assertIn('error', result['debug'])
+
+
+def _pulsing_frames(n, bpm=72.0, fps=30.0, size=(160, 120), seed=0):
+    """Noisy frames whose green channel pulses at `bpm`."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n) / fps
+    stack = rng.integers(95, 105, (n, size[1], size[0], 3)).astype(np.int16)
+    stack[..., 1] += np.round(3 * np.sin(2 * np.pi * bpm / 60.0 * t)).astype(np.int16)[:, None, None]
+    return np.clip(stack, 0, 255).astype(np.uint8)
+
+
+class TestRPPG(unittest.TestCase):
+    def setUp(self):
+        self.frames = _pulsing_frames(150)
+        self.boxes = [(40 + i % 4, 20 + i % 3, 60, 70) for i in range(150)]
+
+    def test_roi_means_match_per_frame(self):
+        boxes = list(self.boxes)
+        boxes[3] = (0, 0, 0, 0)          # no face
+        boxes[4] = (500, 500, 40, 40)    # outside the frame
+        expected = []
+        for frame, box in zip(self.frames, boxes):
+            val = skin_roi_mean(frame, box)
+            expected.append(expected[-1] if val is None else val)
+        np.testing.assert_allclose(roi_means(self.frames, boxes, chunk_size=16), expected, atol=1e-4)
+        np.testing.assert_allclose(roi_means(list(self.frames), boxes), expected, atol=1e-4)
+
+    def test_batch_and_incremental_agree(self):
+        batch = extract_rppg(self.frames, self.boxes, fps=30.0)
+        self.assertAlmostEqual(batch['bpm'], 72.0, delta=3.0)
+
+        tracker = RPPGTracker(fps=30.0)
+        for frame, box in zip(self.frames, self.boxes):
+            tracker.update(frame, box)
+        streamed = tracker.estimate()
+        self.assertEqual(len(tracker), 150)
+        self.assertAlmostEqual(streamed['bpm'], batch['bpm'])
+        self.assertAlmostEqual(streamed['confidence'], batch['confidence'], places=5)
+
+    def test_too_few_frames(self):
+        self.assertIn('error', RPPGTracker().estimate()['debug'])
+        self.assertIn('error', extract_rppg(self.frames[:10], self.boxes[:10])['debug'])
+
+
+def _panning_frames(n, dx=2, dy=1, size=(320, 240), seed=0):
+    """A smooth random texture translated rigidly by (dx, dy) per frame."""
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 255, (size[1] + n * dy, size[0] + n * dx, 3), dtype=np.uint8)
+    base = cv2.GaussianBlur(base, (5, 5), 0)
+    return [np.ascontiguousarray(base[i * dy:i * dy + size[1], i * dx:i * dx + size[0]]) for i in range(n)]
+
+
+class TestOpticalFlow(unittest.TestCase):
+    def setUp(self):
+        self.frames = _panning_frames(20)
+        self.boxes = [(100, 60, 120, 120)] * 20
+
+    def test_methods_agree_on_rigid_motion(self):
+        dense = flow_consistency(self.frames, self.boxes)
+        sparse = flow_consistency(self.frames, self.boxes, method='sparse')
+        for res in (dense, sparse):
+            self.assertEqual(res['debug']['frames_analyzed'], 19)
+            self.assertLess(res['value'], 0.1)      # rigid motion: no warping
+        self.assertEqual(sparse['debug']['method'], 'sparse')
+        self.assertAlmostEqual(sparse['debug']['avg_motion_magnitude'],
+                               dense['debug']['avg_motion_magnitude'], delta=0.3)
+
+    def test_stride_and_workers(self):
+        serial = flow_consistency(self.frames, self.boxes, stride=3)
+        threaded = flow_consistency(self.frames, self.boxes, stride=3, workers=3)
+        self.assertEqual(serial['debug']['pairs_sampled'], 7)
+        self.assertEqual(threaded, serial)
+
+    def test_threaded_calls_share_one_pool(self):
+        from concurrent.futures import ThreadPoolExecutor
+        from unittest import mock
+        from features import optical_flow
+        with mock.patch.object(optical_flow, '_flow_executor', None), \
+                mock.patch.dict('os.environ', {'FLOW_WORKERS': '2'}), \
+                mock.patch.object(optical_flow, 'ThreadPoolExecutor', wraps=ThreadPoolExecutor) as created:
+            for _ in range(2):
+                res = flow_consistency(self.frames, self.boxes, workers=3)
+                self.assertEqual(res['debug']['pairs_sampled'], 19)
+            optical_flow.get_flow_executor().shutdown()
+        self.assertEqual(created.call_count, 1)
+
+    def test_cancellation_is_not_a_flow_result(self):
+        from pipeline.timeouts import CancellationToken, VerificationTimeout
+        token = CancellationToken()
+        token.cancel("deadline")
+        for workers in (1, 3):
+            with self.assertRaises(VerificationTimeout):
+                flow_consistency(self.frames, self.boxes, cancel_token=token, workers=workers)
+
+    def test_unknown_method(self):
+        self.assertIn('error', flow_consistency(self.frames, self.boxes, method='fancy')['debug'])
+
+
+if __name__ == '__main__':
+    unittest.main()
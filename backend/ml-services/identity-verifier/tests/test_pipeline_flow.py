@@ -1,8 +1,22 @@
 """
 Test the end-to-end pipeline flow.
 """
+import os
+import time
+import tempfile
+import threading
 import unittest
+import unittest.mock
+import numpy as np
+from ops import job_queue
+from ops.result_cache import ResultCache, cache_key
+from ops import fingerprint_index
+from pipeline import stage1
 from pipeline import orchestrator
+from pipeline.signal_executor import SignalExecutor, SignalTask
+from pipeline.signal_graph import ArtifactCache, SignalGraph
+from pipeline.timeouts import (CancellationToken, RequestBudget, VerificationTimeout,
+                               run_with_timeout)
 
 class TestPipelineFlow(unittest.TestCase):
     def test_assess_verification(self):
@@ -13,5 +27,455 @@ class TestPipelineFlow(unittest.TestCase):
         # TODO: Add real assertions
         self.assertIsNone(result)
 
+
+class TestSignalExecutor(unittest.TestCase):
+    def setUp(self):
+        self.executor = SignalExecutor(max_workers=4)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_signals_run_concurrently(self):
+        tasks = [SignalTask(n, lambda n=n: time.sleep(0.2) or n) for n in ('a', 'b', 'c')]
+        start = time.time()
+        run = self.executor.run(tasks, timeout_sec=2.0)
+        self.assertLess(time.time() - start, 0.5)
+        self.assertEqual(run.results, {'a': 'a', 'b': 'b', 'c': 'c'})
+        self.assertEqual(run.missing, [])
+
+    def test_late_signal_is_missing(self):
+        tasks = [
+            SignalTask('fast', lambda: 1),
+            SignalTask('slow', lambda: time.sleep(1.0)),
+            SignalTask('capped', lambda: time.sleep(0.3), timeout_sec=0.1)
+        ]
+        start = time.time()
+        run = self.executor.run(tasks, timeout_sec=0.5)
+        self.assertLess(time.time() - start, 0.8)
+        self.assertEqual(run.results, {'fast': 1})
+        self.assertEqual(sorted(run.missing), ['capped', 'slow'])
+
+    def test_dependencies_and_errors(self):
+        def broken():
+            raise RuntimeError("model not loaded")
+
+        tasks = [
+            SignalTask('landmarks', lambda: [1, 2, 3]),
+            SignalTask('jitter', lambda landmarks: len(landmarks), deps=['landmarks']),
+            SignalTask('broken', broken),
+            SignalTask('needs_broken', lambda broken: broken, deps=['broken'])
+        ]
+        run = self.executor.run(tasks, timeout_sec=1.0)
+        self.assertEqual(run.results['jitter'], 3)
+        self.assertIn('model not loaded', run.errors['broken'])
+        self.assertEqual(sorted(run.missing), ['broken', 'needs_broken'])
+
+    def test_late_cancellable_signal_stops(self):
+        stopped = threading.Event()
+
+        def busy(cancel_token):
+            while not cancel_token.cancelled:
+                time.sleep(0.01)
+            stopped.set()
+
+        run = self.executor.run([SignalTask('busy', busy, cancellable=True)], timeout_sec=0.1)
+        self.assertEqual(run.missing, ['busy'])
+        self.assertTrue(stopped.wait(1.0))
+
+
+class TestRequestBudget(unittest.TestCase):
+    def test_stage_tokens_follow_request_budget(self):
+        budget = RequestBudget(total_sec=10.0)
+        stage = budget.stage("Stage 1", 0.05)
+        self.assertFalse(stage.cancelled)
+        self.assertLessEqual(stage.remaining(), 0.05)
+        time.sleep(0.06)
+        self.assertTrue(stage.cancelled)
+        self.assertFalse(budget.token.cancelled)
+
+        other = budget.stage("Stage 2", 5.0)
+        budget.cancel("client disconnected")
+        self.assertTrue(other.cancelled)
+        with self.assertRaises(VerificationTimeout):
+            other.raise_if_cancelled()
+        with self.assertRaises(VerificationTimeout):
+            budget.check()
+
+    def test_run_with_timeout_cancels_abandoned_work(self):
+        stopped = threading.Event()
+
+        def stage(cancel_token):
+            while not cancel_token.cancelled:
+                time.sleep(0.01)
+            stopped.set()
+
+        start = time.time()
+        with self.assertRaises(VerificationTimeout):
+            RequestBudget(total_sec=5.0).run(stage, limit_sec=0.1, stage_name="Stage 2")
+        self.assertLess(time.time() - start, 0.5)
+        self.assertTrue(stopped.wait(1.0))
+
+    def test_run_with_timeout_returns_result(self):
+        token = CancellationToken()
+        self.assertEqual(run_with_timeout(lambda x: x * 2, args=(21,), timeout_sec=1.0,
+                                          cancel_token=token), 42)
+        self.assertFalse(token.cancelled)
+
+
+class TestSignalGraph(unittest.TestCase):
+    def setUp(self):
+        self.executor = SignalExecutor(max_workers=4)
+        self.calls = []
+        self.graph = SignalGraph()
+        self.graph.artifact('double', self._record('double', lambda x: x * 2), inputs=['x'])
+        self.graph.signal('plus', self._record('plus', lambda double: double + 1), inputs=['double'])
+        self.graph.signal('times', self._record('times', lambda double: double * 3), inputs=['double'])
+        self.graph.signal('audio', self._record('audio', lambda pcm: len(pcm)), inputs=['pcm'],
+                          enabled=lambda src: len(src['pcm']) > 0)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def _record(self, name, func):
+        def call(**kwargs):
+            self.calls.append(name)
+            return func(**kwargs)
+        return call
+
+    def test_artifact_computed_once_and_freed(self):
+        cache = ArtifactCache()
+        run = self.graph.run({'x': 5, 'pcm': []}, cache=cache, executor=self.executor)
+        self.assertEqual(run.results, {'plus': 11, 'times': 30})
+        self.assertEqual(self.calls.count('double'), 1)
+        self.assertEqual(cache.computed, ['double'])
+        self.assertNotIn('double', cache)  # dropped after its last consumer
+
+    def test_unwanted_and_disabled_branches_are_skipped(self):
+        run = self.graph.run({'x': 5, 'pcm': []}, wanted=['plus', 'audio'], executor=self.executor)
+        self.assertEqual(run.results, {'plus': 11})
+        self.assertNotIn('times', self.calls)
+        self.assertNotIn('audio', self.calls)
+        self.assertEqual(run.missing, [])
+
+    def test_failed_artifact_makes_consumers_missing(self):
+        self.graph.artifact('broken', lambda x: 1 / 0, inputs=['x'])
+        self.graph.signal('uses_broken', lambda broken: broken, inputs=['broken'])
+        run = self.graph.run({'x': 5, 'pcm': []}, wanted=['uses_broken', 'plus'],
+                             executor=self.executor)
+        self.assertEqual(run.results, {'plus': 11})
+        self.assertEqual(sorted(run.missing), ['broken', 'uses_broken'])
+
+    def test_node_deadline_is_its_own(self):
+        self.graph.signal('slow', lambda x: time.sleep(0.5), inputs=['x'], timeout_sec=0.05)
+        start = time.time()
+        run = self.graph.run({'x': 5, 'pcm': []}, wanted=['slow', 'plus'],
+                             executor=self.executor, timeout_sec=2.0)
+        self.assertLess(time.time() - start, 0.4)
+        self.assertEqual(run.results, {'plus': 11})
+        self.assertEqual(run.missing, ['slow'])
+
+
+class TestMissingSignalsPolicy(unittest.TestCase):
+    def test_missing_signals_are_not_trusted(self):
+        from models.policy_engine import PolicyEngine
+        engine = PolicyEngine()
+        self.assertEqual(engine.apply_policy(0.1, {})['final_decision'], 'TRUSTED')
+        result = engine.apply_policy(0.1, {'missing_signals': ['deepfake']})
+        self.assertEqual(result['final_decision'], 'REVIEW')
+
+
+class TestCascade(unittest.TestCase):
+    def setUp(self):
+        import numpy as np
+        frames = [np.random.randint(0, 255, (120, 160, 3), np.uint8) for _ in range(40)]
+        self.capture = {'frames': frames, 'face_boxes': [(40, 30, 60, 60)] * 40,
+                        'audio': np.zeros(16000, np.float32), 'sample_rate': 16000, 'metadata': {}}
+
+    def test_score_bounds_cover_pending_inputs(self):
+        from models.fusion_scorer import FusionScorer
+        scorer = FusionScorer()
+        known = {'liveness_ok': True, 'rppg_ok': True, 'blur_score': 200.0}
+        low, high = scorer.score_bounds(known, ['deepfake_prob', 'opticalflow_ok'])
+        for df, flow in ((0.0, True), (1.0, False), (0.3, True)):
+            score, _ = scorer.score({**known, 'deepfake_prob': df, 'opticalflow_ok': flow})
+            self.assertTrue(low - 1e-9 <= score <= high + 1e-9)
+        self.assertAlmostEqual(low, 0.0)
+        self.assertAlmostEqual(high, 0.6)
+
+    def test_settled_decision(self):
+        from models.policy_engine import PolicyEngine
+        engine = PolicyEngine()
+        # A hard rule already fired: nothing pending can lift the block
+        self.assertEqual(engine.settled_decision(0.1, 0.9, {'rppg_conf': 0.0},
+                                                 pending_signals=['video_fake_prob']), 'BLOCK')
+        # Score range straddles the review threshold
+        self.assertIsNone(engine.settled_decision(0.1, 0.5, {}))
+        # Within one band, but a pending signal could still trip a hard rule
+        self.assertIsNone(engine.settled_decision(0.1, 0.3, {}, pending_signals=['video_fake_prob']))
+        self.assertEqual(engine.settled_decision(0.1, 0.3, {}, pending_signals=['flow_variance']),
+                         'TRUSTED')
+
+    def test_cascade_stops_once_decision_is_settled(self):
+        result = orchestrator.VerificationOrchestrator({'cascade': True}).assess_verification(
+            self.capture, {'user_id': 'u1'})
+        # No pulse in noise: the rPPG hard rule blocks before flow and the CNN run
+        self.assertEqual(result['decision'], 'BLOCK')
+        self.assertEqual(result['skipped_signals'], ['flow', 'audio_spoof', 'deepfake'])
+
+    def test_blocklisted_user_skips_stage2(self):
+        result = orchestrator.VerificationOrchestrator({'cascade': True}).assess_verification(
+            self.capture, {'user_id': 'user_fraud_123'})
+        self.assertEqual(result['decision'], 'BLOCK')
+        self.assertEqual(result['skipped_signals'], ['rppg', 'flow', 'audio_spoof', 'deepfake'])
+
+    def test_context_checks_need_no_media(self):
+        from pipeline.stage1 import run_context_checks
+        self.assertFalse(run_context_checks({'ip': '10.0.0.99'})['passed'])
+        self.assertFalse(run_context_checks({}, {'package_name': 'com.fake.bank'})['passed'])
+        self.assertTrue(run_context_checks({'ip': '127.0.0.1'})['passed'])
+
+
+class TestDeepfakeFrameSelection(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.face = rng.integers(90, 110, (100, 100, 3), dtype=np.uint8)
+
+    def _crops(self, n, talking):
+        crops = {}
+        for i in range(n):
+            crop = self.face.copy()
+            if talking and (i // 5) % 2:
+                crop[65:85, 30:70] = 20   # open mouth
+            crops[i] = crop
+        return crops
+
+    def test_mouth_motion_is_kept(self):
+        from pipeline.stage2 import _distinct_frames
+        kept = _distinct_frames(self._crops(200, talking=True))
+        self.assertEqual(len(kept), 40)   # every candidate differs from the last kept one
+
+    def test_static_face_keeps_sampler_minimum(self):
+        from pipeline.stage2 import _distinct_frames, ADAPTIVE_MIN_FRAMES
+        kept = _distinct_frames(self._crops(200, talking=False))
+        self.assertEqual(len(kept), ADAPTIVE_MIN_FRAMES)
+        self.assertIn(0, kept)
+        self.assertEqual(len(_distinct_frames(self._crops(15, talking=False))), 3)
+
+    def test_verdict_is_the_samplers(self):
+        from pipeline import stage2
+        crops = self._crops(20, talking=True)
+        sampled = {'video_fake_prob': 0.45, 'frame_scores': [0.2, 0.9],
+                   'frame_indices': [0, 1], 'frames_processed': 2}
+        with unittest.mock.patch.object(stage2, 'adaptive_deepfake_inference', return_value=sampled):
+            out, frame_scores = stage2._deepfake_signal(list(crops.values()), [], crops,
+                                                        set(crops), CancellationToken())
+        self.assertEqual(out['video_fake_prob'], 0.45)   # not the propagated mean (0.725)
+        self.assertEqual(len(frame_scores), 4)
+        self.assertTrue(out['deepfake_pass'])
+
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.queue = job_queue.JobQueue(os.path.join(self.tmp.name, 'jobs.sqlite3'), max_pending=2)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_claim_complete_roundtrip(self):
+        self.queue.submit('REQ-1', {'video_path': 'a.mp4'})
+        job = self.queue.claim()
+        self.assertEqual(job['audit_id'], 'REQ-1')
+        self.assertEqual(job['payload'], {'video_path': 'a.mp4'})
+        self.assertEqual(self.queue.get('REQ-1')['status'], job_queue.RUNNING)
+        self.assertIsNone(self.queue.claim())
+
+        self.queue.complete('REQ-1', {'overall_pass': True}, 200)
+        done = self.queue.get('REQ-1')
+        self.assertEqual(done['status'], job_queue.DONE)
+        self.assertEqual(done['result'], {'overall_pass': True})
+        self.assertIsNone(self.queue.get('REQ-unknown'))
+
+    def test_max_pending(self):
+        self.queue.submit('REQ-1', {})
+        self.queue.submit('REQ-2', {})
+        with self.assertRaises(job_queue.QueueFull):
+            self.queue.submit('REQ-3', {})
+        self.queue.claim()
+        self.queue.submit('REQ-3', {})  # running jobs do not count
+
+    def test_orphans_requeued(self):
+        self.queue.submit('REQ-1', {})
+        self.queue.claim()
+        self.assertEqual(self.queue.requeue_orphans(), 0)  # lease still fresh
+
+        with job_queue.closing(self.queue._connect()) as conn:
+            conn.execute("UPDATE jobs SET heartbeat_at = ?", (time.time() - self.queue.lease_sec - 1,))
+        self.assertEqual(self.queue.requeue_orphans(), 1)
+        self.assertEqual(self.queue.claim()['audit_id'], 'REQ-1')
+
+    def test_heartbeat_keeps_running_job_leased(self):
+        queue = job_queue.JobQueue(self.queue.db_path, lease_sec=0.3)
+        pool = job_queue.JobWorkerPool(queue, lambda payload, audit_id: (time.sleep(1.0), 200),
+                                       poll_interval=0.05)
+        queue.submit('REQ-1', {})
+        pool.start()
+        try:
+            time.sleep(0.7)     # well past one lease
+            self.assertEqual(queue.requeue_orphans(), 0)
+            self.assertEqual(queue.get('REQ-1')['status'], job_queue.RUNNING)
+        finally:
+            pool.stop()
+        self.assertEqual(queue.get('REQ-1')['status'], job_queue.DONE)
+
+    def test_legacy_database_gains_lease_column(self):
+        path = os.path.join(self.tmp.name, 'legacy.sqlite3')
+        with job_queue.closing(job_queue.sqlite3.connect(path, isolation_level=None)) as conn:
+            conn.execute("CREATE TABLE jobs (audit_id TEXT PRIMARY KEY, status TEXT NOT NULL, "
+                         "payload TEXT NOT NULL, webhook_url TEXT, result TEXT, http_status INTEGER, "
+                         "error TEXT, worker_pid INTEGER, created_at REAL NOT NULL, "
+                         "started_at REAL, finished_at REAL)")
+            conn.execute("INSERT INTO jobs (audit_id, status, payload, worker_pid, created_at, started_at) "
+                         "VALUES ('REQ-1', 'RUNNING', '{}', 1, 0, ?)", (time.time() - 120,))
+        queue = job_queue.JobQueue(path)
+        self.assertEqual(queue.requeue_orphans(), 1)   # expired from started_at
+        self.assertIsNone(queue.get('REQ-1')['heartbeat_at'])
+
+    def test_pool_runs_jobs(self):
+        def handler(payload, audit_id):
+            if payload.get('boom'):
+                raise RuntimeError('boom')
+            return {'audit_id': audit_id}, 200
+
+        pool = job_queue.JobWorkerPool(self.queue, handler, workers=2, poll_interval=0.05)
+        self.queue.submit('REQ-1', {})
+        self.queue.submit('REQ-2', {'boom': True})
+        pool.start()
+        pool.notify()
+        deadline = time.time() + 5
+        while time.time() < deadline and any(
+                self.queue.get(a)['status'] in (job_queue.QUEUED, job_queue.RUNNING) for a in ('REQ-1', 'REQ-2')):
+            time.sleep(0.02)
+        pool.stop(timeout=1)
+
+        self.assertEqual(self.queue.get('REQ-1')['status'], job_queue.DONE)
+        self.assertEqual(self.queue.get('REQ-1')['result'], {'audit_id': 'REQ-1'})
+        failed = self.queue.get('REQ-2')
+        self.assertEqual(failed['status'], job_queue.FAILED)
+        self.assertEqual(failed['error'], 'boom')
+
+    def test_webhook_allowed(self):
+        self.assertTrue(job_queue.webhook_allowed('http://localhost:8080/hook'))
+        self.assertFalse(job_queue.webhook_allowed('http://example.com/hook'))
+        self.assertFalse(job_queue.webhook_allowed('file:///etc/passwd'))
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, 'cache.sqlite3')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_hit_counts_and_shared_disk_tier(self):
+        cache = ResultCache(self.db)
+        key = cache_key('abc', {'user_id': 'u1', 'action': 'login'})
+        self.assertIsNone(cache.get(key))
+        cache.put(key, {'final_score': 0.3}, audit_id='REQ-1')
+
+        hit = cache.get(key)
+        self.assertEqual(hit['response'], {'final_score': 0.3})
+        self.assertEqual(hit['audit_id'], 'REQ-1')
+        self.assertEqual(hit['hits'], 1)
+        hit['response']['final_score'] = 1.0  # callers get a copy
+
+        # Another process only sees the SQLite tier
+        other = ResultCache(self.db)
+        hit = other.get(key)
+        self.assertEqual(hit['response'], {'final_score': 0.3})
+        self.assertEqual(hit['hits'], 2)
+
+    def test_context_changes_key(self):
+        base = {'user_id': 'u1', 'action': 'login', 'model_name': 'xception', 'ip': '1.2.3.4'}
+        self.assertEqual(cache_key('abc', base), cache_key('abc', dict(base, budget=object())))
+        self.assertNotEqual(cache_key('abc', base), cache_key('abc', dict(base, action='payment')))
+        self.assertNotEqual(cache_key('abc', base), cache_key('abd', base))
+
+    def test_ttl_and_size_bound(self):
+        cache = ResultCache(self.db, ttl_sec=0.05, max_entries=2, memory_entries=1)
+        cache.put('a', {'n': 1})
+        time.sleep(0.1)
+        self.assertIsNone(cache.get('a'))
+
+        cache.ttl_sec = 60
+        for k in ('a', 'b', 'c'):
+            cache.put(k, {'n': k})
+        self.assertIsNone(ResultCache(self.db, ttl_sec=60).get('a'))
+        self.assertIsNotNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+
+
+class TestFingerprintIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.index = fingerprint_index.FingerprintIndex(os.path.join(self.tmp.name, 'fp.sqlite3'))
+        self.rng = np.random.default_rng(0)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _random(self, n):
+        return [int(v) for v in self.rng.integers(0, 2 ** 63, size=n)]
+
+    def _perturb(self, h, bits):
+        for b in self.rng.choice(64, size=bits, replace=False):
+            h ^= 1 << int(b)
+        return h
+
+    def test_near_duplicate_found(self):
+        original = self._random(10)
+        for _ in range(50):
+            self.index.add(self._random(10), audit_id='REQ-other', user_id='bob')
+        self.index.add(original, audit_id='REQ-1', user_id='alice')
+
+        # Every second within MATCH_RADIUS bits (e.g. re-encoded and cropped)
+        replay = [self._perturb(h, fingerprint_index.MATCH_RADIUS) for h in original]
+        match = self.index.lookup(replay)
+        self.assertEqual(match['audit_id'], 'REQ-1')
+        self.assertEqual(match['user_id'], 'alice')
+        self.assertEqual(match['similarity'], 1.0)
+
+        # A trimmed copy still matches
+        self.assertEqual(self.index.lookup(replay[2:8])['audit_id'], 'REQ-1')
+        self.assertIsNone(self.index.lookup(self._random(10)))
+        self.assertIsNone(self.index.lookup([]))
+
+    def test_expired_submissions_pruned(self):
+        fp = self._random(5)
+        self.index.add(fp, audit_id='REQ-1')
+        self.index.retention_sec = 0
+        self.assertIsNone(self.index.lookup(fp))
+        self.assertEqual(self.index.prune(), 1)
+
+    def test_stage1_rejects_replay_by_other_user(self):
+        fp = self._random(5)
+        frame = np.tile(np.arange(64, dtype=np.uint8) * 4, (64, 1))
+        capture = {'frames': [frame], 'metadata': {}, 'fingerprint': fp}
+        with unittest.mock.patch.object(stage1, 'get_fingerprint_index', return_value=self.index), \
+                unittest.mock.patch.object(stage1, 'laplacian_variance', return_value={'value': 500.0}):
+            first = stage1.run_stage1(capture, {'user_id': 'alice', 'audit_id': 'REQ-1'})
+            retry = stage1.run_stage1(capture, {'user_id': 'alice', 'audit_id': 'REQ-2'})
+            replay = stage1.run_stage1(capture, {'user_id': 'mallory', 'audit_id': 'REQ-3'})
+
+        self.assertTrue(first['passed'])
+        self.assertEqual(first['signals']['replay_similarity'], 0.0)
+        self.assertTrue(retry['passed'])
+        self.assertEqual(retry['signals']['replay_of'], 'REQ-1')
+        self.assertFalse(replay['passed'])
+        self.assertTrue(replay['fast_fail'])
+        self.assertEqual(replay['signals']['replay_of'], 'REQ-1')
+
+
 if __name__ == "__main__":
     unittest.main()